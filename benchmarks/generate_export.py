@@ -0,0 +1,225 @@
+"""
+Writes a deterministic, realistic fake Instagram export that InstagramDataRetreiver can read.
+
+Usage:
+    python -m benchmarks.generate_export path/to/fake_export --chats 400 --messages-per-chat 2500
+
+The tree mirrors a real export:
+    personal_information/personal_information/personal_information.json
+    your_instagram_activity/messages/inbox/<username>_<random>/message_1.json ... message_N.json
+    connections/followers_and_following/followers.json, following.json
+    login_and_account_creation/login_activity.json
+
+Like Instagram, message_1.json holds the most recent messages, messages inside a part are ordered from most recent to
+oldest, and non-ASCII text is stored as UTF-8 bytes escaped as Latin-1 characters.
+"""
+import os
+import json
+import random
+import argparse
+import string
+from datetime import datetime, timezone
+from typing import List
+
+OWNER_NAME = "Emre Cenk"
+OWNER_USERNAME = "emre.cenk99"
+START_TIMESTAMP_MS = 1420070400000 # 2015-01-01
+END_TIMESTAMP_MS = 1641772800000 # 2022-01-10
+MESSAGES_PER_PART = 10000 # the number of messages Instagram puts in each message_N.json
+
+WORDS = ["hey", "hi", "lol", "ok", "yeah", "no", "what", "why", "when", "tomorrow", "today", "class", "game",
+         "haha", "sure", "thanks", "see", "you", "later", "did", "watch", "the", "new", "episode", "omg", "wait",
+         "food", "homework", "exam", "party", "weekend", "send", "pic", "call", "me", "café", "naïve", "😂", "❤️",
+         "🔥", "👍", "çok", "güzel", "teşekkürler"]
+FIRST_NAMES = ["Alex", "Sam", "Deniz", "Maria", "Jordan", "Taylor", "Elif", "Chris", "Zoë", "Ahmet", "Noah", "Léa"]
+LAST_NAMES = ["Smith", "Yılmaz", "García", "Brown", "Kaya", "Müller", "Lee", "Martin", "Öztürk", "Wilson"]
+
+
+def instagram_encode(text: str) -> str:
+    """
+    Instagram writes UTF-8 bytes as if they were Latin-1 characters ("café" is stored as "cafÃ©")
+    """
+    return text.encode("utf-8").decode("latin-1")
+
+
+def write_json(file_path: str, data) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as json_file:
+        json.dump(data, json_file)
+
+
+def random_suffix(generator: random.Random, length: int = 10) -> str:
+    return "".join(generator.choice(string.ascii_lowercase + string.digits) for i in range(length))
+
+
+def chat_sizes(generator: random.Random, chats: int, messages_per_chat: int, skew: float) -> List[int]:
+    """
+    Splits chats * messages_per_chat messages between chats. A few chats get most of the messages, like real inboxes.
+    """
+    weights = [generator.paretovariate(skew) for i in range(chats)]
+    total, total_weight = chats * messages_per_chat, sum(weights)
+    sizes = [max(1, int(total * weight / total_weight)) for weight in weights]
+    sizes[0] += total - sum(sizes)
+    return [max(1, size) for size in sizes]
+
+
+def generate_message(generator: random.Random, sender: str, timestamp_ms: int) -> dict:
+    message = {"sender_name": instagram_encode(sender), "timestamp_ms": timestamp_ms, "is_geoblocked_for_viewer": False}
+    kind = generator.random()
+    if kind < 0.80:
+        message["content"] = instagram_encode(" ".join(generator.choice(WORDS) for i in range(int(generator.expovariate(1 / 6)) + 1)))
+        message["type"] = "Generic"
+    elif kind < 0.85:
+        message["content"] = instagram_encode("Reacted ❤️ to your message")
+        message["type"] = "Generic"
+    elif kind < 0.88:
+        message["content"] = instagram_encode(f"@{generator.choice(FIRST_NAMES).lower()} {generator.choice(WORDS)}")
+        message["type"] = "Generic"
+    elif kind < 0.95:
+        message["photos"] = [{"uri": f"messages/inbox/photos/{timestamp_ms}.jpg", "creation_timestamp": timestamp_ms // 1000}]
+        message["type"] = "Generic"
+    elif kind < 0.98:
+        message["share"] = {"link": "https://www.instagram.com/p/" + random_suffix(generator, 11)}
+        message["type"] = "Share"
+    else:
+        message["call_duration"] = generator.randint(0, 3600)
+        message["type"] = "Call"
+    return message
+
+
+def generate_chat(generator: random.Random,
+                  inbox: str,
+                  index: int,
+                  number_of_messages: int,
+                  is_group: bool,
+                  messages_per_part: int = MESSAGES_PER_PART) -> None:
+    if is_group:
+        participants = [f"{generator.choice(FIRST_NAMES)} {generator.choice(LAST_NAMES)}" for i in range(generator.randint(2, 8))]
+        title = f"group chat {index}"
+        username = f"groupchat{index}"
+    else:
+        participants = [f"{generator.choice(FIRST_NAMES)} {generator.choice(LAST_NAMES)}"]
+        title = participants[0]
+        username = f"{participants[0].split(' ')[0].lower()}{index}"
+    senders = [OWNER_NAME] + participants
+    folder = os.path.join(inbox, f"{username}_{random_suffix(generator)}")
+
+    # every chat starts at a random date, and the gaps between messages are exponentially distributed
+    start = generator.randint(START_TIMESTAMP_MS, END_TIMESTAMP_MS - 1)
+    average_gap = max(1, (END_TIMESTAMP_MS - start) // (number_of_messages + 1))
+    timestamps, current = [], start
+    for i in range(number_of_messages):
+        current += int(generator.expovariate(1 / average_gap)) + 1
+        timestamps.append(current)
+
+    # message_1.json holds the most recent messages
+    number_of_parts = (number_of_messages + messages_per_part - 1) // messages_per_part
+    for part in range(number_of_parts):
+        newest = number_of_messages - part * messages_per_part
+        oldest = max(0, newest - messages_per_part)
+        messages = [generate_message(generator, generator.choice(senders), timestamps[i]) for i in range(newest - 1, oldest - 1, -1)]
+        write_json(os.path.join(folder, f"message_{part + 1}.json"),
+                   {"participants": [{"name": instagram_encode(name)} for name in senders],
+                    "messages": messages,
+                    "title": instagram_encode(title),
+                    "is_still_participant": True,
+                    "thread_type": "RegularGroup" if is_group else "Regular",
+                    "thread_path": f"inbox/{os.path.basename(folder)}"})
+
+
+def generate_relationships(generator: random.Random, count: int) -> List[dict]:
+    relationships = []
+    for i in range(count):
+        timestamp = generator.randint(START_TIMESTAMP_MS // 1000, END_TIMESTAMP_MS // 1000)
+        value = f"{generator.choice(FIRST_NAMES).lower()}_{random_suffix(generator, 6)}"
+        relationships.append({"title": "",
+                              "media_list_data": [],
+                              "string_list_data": [{"href": f"https://www.instagram.com/{value}", "value": value, "timestamp": timestamp}]})
+    return relationships
+
+
+def generate_logins(generator: random.Random, count: int) -> List[dict]:
+    logins = []
+    for i in range(count):
+        timestamp = generator.randint(START_TIMESTAMP_MS // 1000, END_TIMESTAMP_MS // 1000)
+        logins.append({"title": datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+                       "media_map_data": {},
+                       "string_map_data": {"Cookie Name": {"href": "", "timestamp": 0, "value": "*" * 25 + random_suffix(generator, 3)},
+                                           "IP Address": {"href": "", "timestamp": 0, "value": f"72.53.{generator.randint(0, 255)}.{generator.randint(0, 255)}"},
+                                           "Language Code": {"href": "", "timestamp": 0, "value": generator.choice(["en", "tr", "fr"])},
+                                           "Time": {"href": "", "timestamp": timestamp, "value": ""},
+                                           "User Agent": {"href": "", "timestamp": 0, "value": generator.choice(["Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36",
+                                                                                                                "Instagram 216.0.0.12.135 (iPhone12,1; iOS 15_1; en_US; en-US; scale=2.00; 828x1792; 338483366)",
+                                                                                                                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.1 Safari/605.1.15"])}}})
+    logins.sort(key=lambda login: login["string_map_data"]["Time"]["timestamp"], reverse=True)
+    return logins
+
+
+def generate_export(root_path: str,
+                    chats: int = 50,
+                    messages_per_chat: int = 200,
+                    group_chat_ratio: float = 0.1,
+                    messages_per_part: int = MESSAGES_PER_PART,
+                    followers: int = 500,
+                    following: int = 400,
+                    logins: int = 1000,
+                    skew: float = 1.2,
+                    seed: int = 0) -> int:
+    """
+    Writes a fake export. The same arguments always produce the same export.
+    :param root_path: directory to write the export to
+    :param chats: number of chats in the inbox
+    :param messages_per_chat: average number of messages per chat
+    :param group_chat_ratio: fraction of chats that are group chats
+    :param messages_per_part: number of messages per message_N.json file
+    :param followers: number of followers
+    :param following: number of followed accounts
+    :param logins: number of login entries
+    :param skew: pareto shape used to spread messages between chats (lower means a few chats get most messages)
+    :param seed: random seed
+    :return: total number of messages written
+    """
+    generator = random.Random(seed)
+
+    write_json(os.path.join(root_path, "personal_information", "personal_information", "personal_information.json"),
+               {"profile_user": [{"media_map_data": {},
+                                  "string_map_data": {"Name": {"href": "", "timestamp": 0, "value": instagram_encode(OWNER_NAME)},
+                                                      "Username": {"href": "", "timestamp": 0, "value": OWNER_USERNAME}},
+                                  "title": "User Information"}]})
+
+    inbox = os.path.join(root_path, "your_instagram_activity", "messages", "inbox")
+    sizes = chat_sizes(generator, chats, messages_per_chat, skew)
+    for index, number_of_messages in enumerate(sizes):
+        generate_chat(generator, inbox, index, number_of_messages, generator.random() < group_chat_ratio, messages_per_part)
+
+    connections = os.path.join(root_path, "connections", "followers_and_following")
+    write_json(os.path.join(connections, "followers.json"), {"relationships_followers": generate_relationships(generator, followers)})
+    write_json(os.path.join(connections, "following.json"), {"relationships_following": generate_relationships(generator, following)})
+    write_json(os.path.join(root_path, "login_and_account_creation", "login_activity.json"),
+               {"account_history_login_history": generate_logins(generator, logins)})
+    return sum(sizes)
+
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser(description="Writes a deterministic fake Instagram export.")
+    argument_parser.add_argument("path", help="directory to write the export to")
+    argument_parser.add_argument("--chats", type=int, default=50)
+    argument_parser.add_argument("--messages-per-chat", type=int, default=200)
+    argument_parser.add_argument("--group-chat-ratio", type=float, default=0.1)
+    argument_parser.add_argument("--messages-per-part", type=int, default=MESSAGES_PER_PART)
+    argument_parser.add_argument("--followers", type=int, default=500)
+    argument_parser.add_argument("--following", type=int, default=400)
+    argument_parser.add_argument("--logins", type=int, default=1000)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    arguments = argument_parser.parse_args()
+
+    total = generate_export(arguments.path,
+                            arguments.chats,
+                            arguments.messages_per_chat,
+                            arguments.group_chat_ratio,
+                            arguments.messages_per_part,
+                            arguments.followers,
+                            arguments.following,
+                            arguments.logins,
+                            seed=arguments.seed)
+    print(f"wrote {total} messages to {arguments.path}")
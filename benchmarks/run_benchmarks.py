@@ -0,0 +1,183 @@
+"""
+Times the analysis pipeline on generated exports and stores the results as JSON.
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes 10k 1m --output benchmarks/results
+    python -m benchmarks.run_benchmarks --sizes 10k --compare benchmarks/results/previous.json
+
+For every size, a fake export is generated once (see benchmarks.generate_export) and reused by later runs. Then the
+following stages are timed:
+    ingest/*      -> loading the MessageStore (sequential, parallel, from a warm analysis cache and from a zip)
+    aggregates    -> building MessageAggregates from a loaded store
+    search/*      -> building the full-text MessageIndex and running term, phrase and prefix queries on it
+    analyzer/*    -> every InstagramDataAnalyzer method, with its memoization cleared
+    render/*      -> rendering every InstagramDataVisualizer graph with the Agg backend
+"""
+import matplotlib
+matplotlib.use("Agg")
+
+import os
+import sys
+import json
+import time
+import shutil
+import inspect
+import argparse
+import platform
+from datetime import datetime
+from typing import Callable, Dict
+from benchmarks.generate_export import generate_export
+from src.Handling_Data import utils
+from src.Handling_Data import Message_Store, Aggregation_Engine
+from src.Handling_Data.Message_Store import MessageStore
+from src.Handling_Data.Aggregation_Engine import MessageAggregates
+from src.Handling_Data.Message_Search import MessageIndex
+from src.Handling_Data.Analyzing_Data import InstagramDataAnalyzer
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data.Visualizing_Data import InstagramDataVisualizer
+from src.Handling_Data.Disk_Cache import get_cache_directory
+from src.Handling_Data.Caching import memoized_functions
+
+# number of chats and average messages per chat for every benchmark size
+SIZES = {"10k": (50, 200),
+         "1m": (400, 2500),
+         "10m": (1000, 10000)}
+
+
+def timed(func: Callable, *args, **kwargs) -> float:
+    """
+    :return: wall time of the call in seconds
+    """
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def forget_loaded_data() -> None:
+    """
+    Clears every in-memory cache so that the next stage starts cold (the on-disk analysis cache is not touched)
+    """
+    Message_Store.memo_message_store.clear()
+    Aggregation_Engine.memo_message_aggregates.clear()
+    for wrapper in memoized_functions.values(): wrapper.cache_clear()
+
+
+def prepare_export(work_directory: str, size: str) -> str:
+    """
+    Generates the export for a size, unless it was already generated by a previous run
+    :return: path to the export
+    """
+    chats, messages_per_chat = SIZES[size]
+    path = os.path.join(work_directory, f"export_{size}")
+    marker = os.path.join(path, "generated.json")
+    if not os.path.exists(marker):
+        shutil.rmtree(path, ignore_errors=True)
+        total = generate_export(path, chats=chats, messages_per_chat=messages_per_chat)
+        with open(marker, "w") as marker_file: json.dump({"messages": total}, marker_file)
+    return path
+
+
+def prepare_zip(path: str) -> str:
+    """
+    Zips a generated export (once), to time reading exports without extracting them
+    :return: path to the zip file
+    """
+    if not os.path.exists(path + ".zip"): shutil.make_archive(path, "zip", path)
+    return path + ".zip"
+
+
+def arguments_for(func: Callable, path: str, chat_name: str) -> Dict:
+    """
+    Fills in the arguments of an analyzer or visualizer, using the defaults whenever there is one
+    """
+    arguments = {}
+    for name, parameter in inspect.signature(func).parameters.items():
+        if name == "path": arguments[name] = path
+        elif name == "chat_name": arguments[name] = chat_name
+        elif parameter.default is inspect.Parameter.empty: arguments[name] = 2 # interval, method and time_specification
+    return arguments
+
+
+def benchmark_size(work_directory: str, size: str, render: bool) -> Dict:
+    path = prepare_export(work_directory, size)
+    with open(os.path.join(path, "generated.json")) as marker_file: messages = json.load(marker_file)["messages"]
+    shutil.rmtree(get_cache_directory(path), ignore_errors=True)
+    timings = {}
+
+    forget_loaded_data()
+    timings["ingest/sequential"] = timed(MessageStore.load, path, use_cache=False, workers=1)
+    timings["ingest/parallel"] = timed(MessageStore.load, path, use_cache=False)
+    timings["ingest/cold_cache"] = timed(MessageStore.load, path)
+    timings["ingest/warm_cache"] = timed(MessageStore.load, path)
+    timings["ingest/zip"] = timed(MessageStore.load, prepare_zip(path), use_cache=False)
+
+    store = MessageStore.load(path, use_cache=False)
+    timings["aggregates"] = timed(MessageAggregates, store)
+
+    start = time.perf_counter()
+    index = MessageIndex.build(store)
+    timings["search/build"] = time.perf_counter() - start
+    index.store = store
+    for stage, query in [("term", "tomorrow"), ("phrase", '"see you later"'), ("prefix", "home*")]:
+        timings[f"search/{stage}"] = timed(index.search, query)
+
+    # the biggest chat is used for the per-chat functions
+    chat_name = max(InstagramDataRetreiver.list_chats(path), key=lambda name: InstagramDataRetreiver.get_chat_size(path, name))
+    functions, names = utils.get_all_user_created_static_methods(InstagramDataAnalyzer)
+    for func, name in zip(functions, names):
+        forget_loaded_data()
+        Message_Store.memo_message_store[path] = store # ingest is timed separately
+        timings[f"analyzer/{name}"] = timed(func, **arguments_for(func, path, chat_name))
+
+    if render:
+        import io, contextlib, warnings
+        import matplotlib.pyplot as plt
+        functions, names = utils.get_all_user_created_static_methods(InstagramDataVisualizer)
+        for func, name in zip(functions, names):
+            with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+                warnings.simplefilter("ignore")
+                timings[f"render/{name}"] = timed(func, **arguments_for(func, path, chat_name))
+            plt.close("all")
+
+    forget_loaded_data()
+    return {"messages": messages, "chats": SIZES[size][0], "timings": timings}
+
+
+def compare(results: Dict, previous: Dict) -> None:
+    """
+    Prints how every timing changed compared to a previous results file
+    """
+    for size, current in results["sizes"].items():
+        if size not in previous["sizes"]: continue
+        print(f"\n{size}:")
+        for stage, seconds in current["timings"].items():
+            before = previous["sizes"][size]["timings"].get(stage)
+            if before is None: continue
+            print(f"{stage:<90} {before:>10.4f}s -> {seconds:>10.4f}s ({before / max(seconds, 1e-9):.2f}x)")
+
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser(description="Benchmarks the analysis pipeline on generated exports.")
+    argument_parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["10k"])
+    argument_parser.add_argument("--work-directory", default=os.path.join("benchmarks", "exports"), help="where generated exports are kept")
+    argument_parser.add_argument("--output", default=os.path.join("benchmarks", "results"), help="directory for the results json")
+    argument_parser.add_argument("--compare", default=None, help="previous results json to compare against")
+    argument_parser.add_argument("--no-render", action="store_true", help="skip timing the visualizers")
+    arguments = argument_parser.parse_args()
+
+    results = {"created": datetime.now().isoformat(timespec="seconds"),
+               "python": sys.version.split(" ")[0],
+               "platform": platform.platform(),
+               "cpu_count": os.cpu_count(),
+               "sizes": {}}
+    for size in arguments.sizes:
+        results["sizes"][size] = benchmark_size(arguments.work_directory, size, not arguments.no_render)
+        for stage, seconds in results["sizes"][size]["timings"].items(): print(f"{size:>4} {stage:<90} {seconds:.4f}s")
+
+    os.makedirs(arguments.output, exist_ok=True)
+    output_path = os.path.join(arguments.output, datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    with open(output_path, "w") as output_file: json.dump(results, output_file, indent=2)
+    print(f"results saved to {output_path}")
+
+    if arguments.compare is not None:
+        with open(arguments.compare) as previous_file: compare(results, json.load(previous_file))
@@ -0,0 +1,180 @@
+"""
+Renders every graph of InstagramDataVisualizer (or a chosen subset) to image files without a display.
+
+Usage:
+    python render_report.py path/to/export [path/to/another_export ...] --output reports --formats png svg
+    python render_report.py path/to/export --graphs visualize_active_chats visualize_unique_words --chats friend1 friend2
+
+Every export is loaded once (with --incremental, each export is merged into the one before it instead, see
+MessageAggregates.get_merged), and the results that several graphs share (aggregates, chat rankings, activity pyramids
+and ranges) are built once. They are then shared with a pool of worker processes that render the graphs in parallel.
+Graphs that take a chat_name are rendered once per chat.
+"""
+import matplotlib
+matplotlib.use("Agg") # has to be set before pyplot is imported anywhere
+
+import os
+import io
+import argparse
+import inspect
+import warnings
+import contextlib
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from src.Handling_Data.Visualizing_Data import InstagramDataVisualizer
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data.Message_Store import MessageStore, memo_message_store
+from src.Handling_Data.Aggregation_Engine import MessageAggregates, memo_message_aggregates
+from src.Handling_Data.Friendship_Rankings import ChatRankings, memo_chat_rankings
+from src.Handling_Data.Activity_Pyramid import ActivityPyramid, memo_message_pyramids
+from src.Handling_Data.Activity_Ranges import ActivityRanges, memo_activity_ranges
+from src.Handling_Data import Message_Store
+from src.Handling_Data import utils
+from src.Handling_Data import Profiling
+
+
+def _install_shared_results(aggregates: MessageAggregates,
+                            rankings: ChatRankings,
+                            pyramids: Tuple[ActivityPyramid, ActivityPyramid],
+                            ranges: ActivityRanges,
+                            profile: bool) -> None:
+    # runs once in every worker process, so the export is never parsed (or aggregated) again by the workers
+    path = aggregates.store.path
+    memo_message_store[path] = aggregates.store
+    memo_message_aggregates[path] = aggregates
+    memo_chat_rankings[path] = rankings
+    memo_message_pyramids[path] = (aggregates.store, *pyramids)
+    memo_activity_ranges[path] = ranges
+    Message_Store.DEFAULT_INGEST_WORKERS = 1 # the workers already run in parallel, so they never start pools of their own
+    Profiling.clear() # spans copied from the parent when the worker was forked
+    if profile: Profiling.enable()
+
+
+def list_jobs(path: str, graph_names: List[str], chat_names: List[str], interval: int) -> List[Tuple[str, Dict, str]]:
+    """
+    :param path: path to export root
+    :param graph_names: names of the InstagramDataVisualizer methods to render
+    :param chat_names: chats to render the chat_name-parameterized graphs for
+    :param interval: interval used by graphs whose interval parameter has no default value
+    :return: list of (graph name, keyword arguments, output path without extension)
+    """
+    jobs = []
+    for graph_name in graph_names:
+        parameters = inspect.signature(getattr(InstagramDataVisualizer, graph_name)).parameters
+        arguments = {"path": path}
+        if "interval" in parameters and parameters["interval"].default is inspect.Parameter.empty:
+            arguments["interval"] = interval
+
+        if "chat_name" not in parameters:
+            jobs.append((graph_name, arguments, graph_name))
+            continue
+        for chat_name in chat_names:
+            jobs.append((graph_name, dict(arguments, chat_name=chat_name), os.path.join(graph_name, chat_name)))
+    return jobs
+
+
+def render_graph(graph_name: str, arguments: Dict, output_stem: str, formats: List[str]) -> List[str]:
+    """
+    Calls a visualizer and saves the figures it drew. Text that the visualizer prints (for instance show_traitors) is
+    saved to a .txt file.
+    :param graph_name: name of the InstagramDataVisualizer method
+    :param arguments: keyword arguments for the method
+    :param output_stem: output path without an extension
+    :param formats: list of image formats, for instance ["png", "svg"]
+    :return: list of written files
+    """
+    os.makedirs(os.path.dirname(output_stem) or ".", exist_ok=True)
+    printed = io.StringIO()
+    with warnings.catch_warnings(), contextlib.redirect_stdout(printed):
+        warnings.simplefilter("ignore") # plt.show() warns that the Agg backend is non-interactive
+        with Profiling.span("draw graph", graph=graph_name):
+            getattr(InstagramDataVisualizer, graph_name)(**arguments)
+
+    written = []
+    figure_numbers = plt.get_fignums()
+    for i, figure_number in enumerate(figure_numbers):
+        suffix = "" if len(figure_numbers) == 1 else f"_{i + 1}"
+        for image_format in formats:
+            file_path = f"{output_stem}{suffix}.{image_format}"
+            with Profiling.span("save figure", file=file_path):
+                plt.figure(figure_number).savefig(file_path, format=image_format, bbox_inches="tight")
+            written.append(file_path)
+    plt.close("all")
+
+    if len(figure_numbers) == 0 and printed.getvalue() != "":
+        with open(output_stem + ".txt", "w", encoding="utf-8") as text_file: text_file.write(printed.getvalue())
+        written.append(output_stem + ".txt")
+    return written
+
+
+def _render_job(graph_name: str, arguments: Dict, output_stem: str, formats: List[str]) -> Tuple[str, List[str], str, List[Dict]]:
+    # the profiling spans of the worker are sent back with the result (see Profiling.take_events)
+    try:
+        return output_stem, render_graph(graph_name, arguments, output_stem, formats), "", Profiling.take_events()
+    except Exception as error: # a single broken graph shouldn't stop the rest of the report
+        return output_stem, [], f"{type(error).__name__}: {error}", Profiling.take_events()
+
+
+def render_report(path: str,
+                  output_directory: str,
+                  graph_names: List[str] = None,
+                  chat_names: List[str] = None,
+                  formats: List[str] = None,
+                  interval: int = 2,
+                  workers: int = None) -> List[str]:
+    """
+    Renders a report for one export
+    :param path: path to export root
+    :param output_directory: directory the files are written to
+    :param graph_names: names of InstagramDataVisualizer methods to render. None renders every graph
+    :param chat_names: chats to render the chat_name-parameterized graphs for. None renders every chat
+    :param formats: list of image formats. Defaults to ["png"]
+    :param interval: interval used by graphs whose interval parameter has no default value
+    :param workers: number of rendering processes. Defaults to the number of CPUs
+    :return: list of written files
+    """
+    if graph_names is None: graph_names = utils.get_all_user_created_static_methods(InstagramDataVisualizer)[1]
+    if chat_names is None: chat_names = InstagramDataRetreiver.list_chats(path)
+    if formats is None: formats = ["png"]
+
+    aggregates = MessageAggregates.get(path) # the export is loaded once, here
+    shared_results = (aggregates, ChatRankings.get(path), ActivityPyramid.messages(path), ActivityRanges.get(path))
+    jobs = [(graph_name, arguments, os.path.join(output_directory, output_stem), formats)
+            for graph_name, arguments, output_stem in list_jobs(path, graph_names, chat_names, interval)]
+
+    written = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_install_shared_results, initargs=(*shared_results, Profiling.is_enabled())) as executor:
+        for output_stem, files, error, events in executor.map(_render_job, *zip(*jobs)):
+            if error != "": print(f"Could not render {output_stem}: {error}")
+            written += files
+            Profiling.add_events(events)
+    return written
+
+
+if __name__ == '__main__':
+    all_graphs = utils.get_all_user_created_static_methods(InstagramDataVisualizer)[1]
+
+    argument_parser = argparse.ArgumentParser(description="Renders the graphs of one or more Instagram exports to files.")
+    argument_parser.add_argument("paths", nargs="+", help="paths to export roots")
+    argument_parser.add_argument("--output", default="reports", help="output directory (one sub directory per export)")
+    argument_parser.add_argument("--graphs", nargs="+", choices=all_graphs, default=all_graphs, metavar="GRAPH", help="graphs to render (default: every graph)")
+    argument_parser.add_argument("--chats", nargs="+", default=None, help="chats to render the per-chat graphs for (default: every chat)")
+    argument_parser.add_argument("--formats", nargs="+", choices=["png", "svg"], default=["png"])
+    argument_parser.add_argument("--interval", type=int, default=2, choices=range(5), help="see utils.get_time_string")
+    argument_parser.add_argument("--workers", type=int, default=None, help="number of rendering processes")
+    argument_parser.add_argument("--incremental", action="store_true", help="treat the exports as consecutive exports of the same account (oldest first) "
+                                                                            "and merge each one into the previous one instead of loading it from scratch")
+    arguments = argument_parser.parse_args()
+
+    for i, export_path in enumerate(arguments.paths):
+        if arguments.incremental and i > 0: MessageAggregates.get_merged(export_path, arguments.paths[i - 1])
+        export_output = os.path.join(arguments.output, os.path.basename(os.path.normpath(export_path)))
+        files = render_report(export_path,
+                              export_output,
+                              arguments.graphs,
+                              arguments.chats,
+                              arguments.formats,
+                              arguments.interval,
+                              arguments.workers)
+        print(f"{export_path}: wrote {len(files)} files to {export_output}")
@@ -4,6 +4,7 @@ from tkinter import ttk, filedialog, messagebox
 from src.Handling_Data.Visualizing_Data import InstagramDataVisualizer
 from src.Handling_Data import utils
 from src.GUI.run_func import run_func_via_gui
+from src.GUI.search_window import open_search_window
 class fake_event:
     # Every time the screen is resized (aka the user changes the size of the window), the GUI executes the function
     # named "resize_all_text". By default, tkinter passes in an event object as an argument. Sometimes,
@@ -159,6 +160,18 @@ class GUI():
         self.generate_graph.place(relx = 0.5,rely = 0.7,relwidth=0.2, relheight=0.1, anchor="n")
         self.generate_graph.scale=0.8
 
+    def place_search_button(self):
+        #places the button that opens the message search window under the generate graph button
+        self.search_button = ttk.Button(
+            self.main_frame,
+            text="Search Messages",
+
+            command=lambda: open_search_window(self.path_to_data)
+
+        )
+        self.search_button.place(relx = 0.5,rely = 0.82,relwidth=0.2, relheight=0.1, anchor="n")
+        self.search_button.scale=0.8
+
     def clear_widgets_with_text_list(self, things_to_avoid=None):
         if things_to_avoid is None:
             things_to_avoid=[]
@@ -226,9 +239,18 @@ class GUI():
         self.prompt.configure(anchor="center")
         self.place_method_options()
         self.place_generate_graph_button()
+        self.place_search_button()
 
 
     def select_file(self):
+        #Opens the file explorer to select an extracted export folder
+        self.select_export(filedialog.askdirectory)
+
+    def select_zip(self):
+        #Opens the file explorer to select the zip file of an export. Zip files are read without being extracted
+        self.select_export(lambda: filedialog.askopenfilename(filetypes=[("Instagram export", "*.zip")]))
+
+    def select_export(self, ask_for_path):
 
         #This function opens the file explorer
 
@@ -236,8 +258,8 @@ class GUI():
         self.file_button.scale=0.8
 
 
-        #the following line opens the file explorer and saves the path of the folder selected:
-        self.folder_selected = filedialog.askdirectory()
+        #the following line opens the file explorer and saves the path of the folder (or zip file) selected:
+        self.folder_selected = ask_for_path()
 
 
 
@@ -282,6 +304,15 @@ class GUI():
         self.widgets_with_text.append(self.file_button)
         self.all_widgets.append(self.file_button)
 
+        #Places zip selection button under the file selection button
+        self.zip_button = ttk.Button(self.main_frame,
+                            text="Select Export ZIP",
+                            command=self.select_zip)
+        self.zip_button.place(relx=0.5, rely=0.52, relwidth=0.4, relheight=0.1, anchor="n")
+        self.zip_button.scale=1
+        self.widgets_with_text.append(self.zip_button)
+        self.all_widgets.append(self.zip_button)
+
     def start(self,start_mainloop = True):
         #We read the default.txt file:
         try:
@@ -2,6 +2,8 @@
 import tkinter as tk
 import tkinter.scrolledtext as st
 
+PAGE_SIZE = 500 # lines of a paged popup that are formatted and shown at a time
+
 def create_popup_message(message: str, title_in_popup: str = "", window_title: str = "") -> None:
     """
     Creates a resizable popup with a given message
@@ -39,5 +41,52 @@ def create_popup_message(message: str, title_in_popup: str = "", window_title: s
     text_area.configure(state='disabled')
     win.mainloop()
 
+def create_paged_popup(lines, title_in_popup: str = "", window_title: str = "", page_size: int = PAGE_SIZE) -> None:
+    """
+    Same as create_popup_message, for lists that are too long to format at once: only the shown page is formatted
+    :param lines: anything with a length and a lines(start, stop) method, like Pick_Index.PickedPoints
+    :param title_in_popup: title to display inside of the window
+    :param window_title: name of title for window
+    :param page_size: number of lines in a page
+    :return: None
+    """
+
+    def show_page(page: int):
+        start = page * page_size
+        stop = min(start + page_size, len(lines))
+        text_area.configure(state='normal')
+        text_area.delete("1.0", tk.END)
+        text_area.insert(tk.INSERT, "\n".join(lines.lines(start, stop)) + "\n")
+        text_area.configure(state='disabled')
+        page_label["text"] = f"{start + 1}-{stop} of {len(lines)}" if stop > 0 else ""
+        previous_button.configure(state=tk.NORMAL if page > 0 else tk.DISABLED, command=lambda: show_page(page - 1))
+        next_button.configure(state=tk.NORMAL if stop < len(lines) else tk.DISABLED, command=lambda: show_page(page + 1))
+
+    win = tk.Tk()
+    win.title(window_title)
+    win.geometry("300x300")
+    a = tk.Label(win,
+             text=title_in_popup,
+             font=("Times New Roman", 15),
+             )
+    a.place(relx=0.5, rely=0, relwidth=1, relheight=0.2, anchor="n")
+
+    previous_button = tk.Button(win, text="<")
+    previous_button.place(relx=0.2, rely=0.2, relwidth=0.1, relheight=0.08, anchor="n")
+    page_label = tk.Label(win)
+    page_label.place(relx=0.5, rely=0.2, relwidth=0.5, relheight=0.08, anchor="n")
+    next_button = tk.Button(win, text=">")
+    next_button.place(relx=0.8, rely=0.2, relwidth=0.1, relheight=0.08, anchor="n")
+
+    text_area = st.ScrolledText(win,
+                                width=30,
+                                height=8,
+                                font=("Times New Roman",
+                                      15))
+    text_area.place(relx=0.5, rely=0.3, relwidth=0.6, relheight=0.7, anchor="n")
+
+    show_page(0)
+    win.mainloop()
+
 if __name__ == '__main__':
     create_popup_message("alpha\n" * 100, "beta", "particles")
\ No newline at end of file
@@ -1,9 +1,37 @@
 
 import tkinter as tk
 from tkinter import ttk
-from typing import Callable
+from typing import Callable, Dict
+from concurrent.futures import ThreadPoolExecutor, Future
 import inspect
+from datetime import datetime
 from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data.Analyzing_Data import InstagramDataAnalyzer
+from src.Handling_Data.Message_Store import MessageStore
+from src.Handling_Data.Aggregation_Engine import MessageAggregates
+from src.Handling_Data.Friendship_Rankings import ChatRankings
+from src.Handling_Data.Login_Analytics import LoginActivity
+from src.Handling_Data.Activity_Ranges import ActivityRanges
+from src.Handling_Data.Activity_Pyramid import ActivityPyramid
+from src.Handling_Data.Follower_Timeline import RelationshipTimeline
+from src.Handling_Data.Data_Viz_Utils import TREND_WINDOWS
+from src.Handling_Data.Progress import ScanProgress, ScanCancelled
+from src.Handling_Data import Profiling
+
+# Analyses run on this thread so that the tk windows stay responsive. Only the final drawing runs on the tk thread.
+analysis_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+POLL_INTERVAL_MS = 100
+PROFILE_TRACE_FILE = "profile_trace.json" # written after drawing when "Save profile" is ticked (see Profiling)
+DATE_FORMAT = "%Y-%m-%d" # format of the datetime parameters (start, end ...)
+
+# graphs that don't read any messages, so there is nothing to prepare in the background
+GRAPHS_WITHOUT_MESSAGES = {"visualize_logins",
+                           "visualize_logins_by_source",
+                           "show_traitors"}
+# graphs of followers or followed accounts, mapped to the function that reads their accounts
+RELATIONSHIP_GRAPHS = {"visualize_follower_gain_over_time": InstagramDataRetreiver.get_followers,
+                       "visualize_following_gain_over_time": InstagramDataRetreiver.get_following}
+
 class TrueFalseComboBox(ttk.Combobox):
     def __init__(self, *args):
         super().__init__(*args, values = ["True", "False"], state = "readonly")
@@ -15,6 +43,55 @@ class ChatNameComboBox(ttk.Combobox):
     def __init__(self, *args, path: str):
         super().__init__(*args, values = InstagramDataRetreiver.list_chats(path), state = "readonly")
 
+def prepare_graph_data(func_to_run: Callable, arguments: Dict, progress: ScanProgress) -> None:
+    """
+    Runs the expensive part of a graph (reading and aggregating the export, bucketing it for the chosen interval and
+    building the pyramids and trends it draws). Every step is memoized, so calling func_to_run afterwards only has to
+    draw.
+    :param func_to_run: visualizer function that will be called afterwards
+    :param arguments: arguments that func_to_run will be called with, mapped by parameter name
+    :param progress: progress of the scan, advanced once per chat
+    :return: None
+    """
+    path = arguments.get("path")
+    graph = func_to_run.__name__
+    interval, start, end = arguments.get("interval"), arguments.get("start"), arguments.get("end")
+    if path is not None and "login" in graph: LoginActivity.get(path)
+    if path is not None and graph in RELATIONSHIP_GRAPHS:
+        timeline = RelationshipTimeline.get(path, RELATIONSHIP_GRAPHS[graph])
+        timeline.buckets(interval)
+        timeline.pick_index(interval)
+        return
+    if path is None or graph in GRAPHS_WITHOUT_MESSAGES: return
+    with Profiling.span("prepare graph data", graph=graph):
+        if "chat_name" not in arguments and "word" in graph:
+            MessageStore.get(path, progress) # words are counted from the text in the store
+            InstagramDataAnalyzer.get_word_distribution_in_every_chat(path)
+            return
+        if start is not None or end is not None: ActivityRanges.get(path, progress)
+        if "friendship" in graph:
+            ChatRankings.get(path, progress)
+            return
+        if "chat_name" not in arguments:
+            MessageAggregates.get(path, progress)
+            if graph == "visualize_active_chats":
+                InstagramDataAnalyzer.get_active_chats_per_bucket(path, interval, start, end)
+                if arguments.get("trends"):
+                    for window in TREND_WINDOWS: InstagramDataAnalyzer.count_active_dms_over_window(path, window)
+            elif graph == "visualize_total_messages_sent_and_received_over_time_counting_every_chat":
+                ActivityPyramid.messages(path, progress)
+                if arguments.get("trends"):
+                    for window in TREND_WINDOWS: InstagramDataAnalyzer.count_messages_per_day_over_window(path, window)
+            return
+
+        if "word" in graph or "mention" in graph: MessageStore.get(path, progress)
+        progress.start(1, "Reading chat")
+        if "word" in graph or "mention" in graph:
+            InstagramDataAnalyzer.get_word_distribution(path, arguments["chat_name"])
+        else:
+            InstagramDataAnalyzer.get_message_pyramids_in_chat(path, arguments["chat_name"])
+        progress.advance()
+
 def run_func_via_gui(func_to_run: Callable, ready_inputs=None) -> None:
 
     if ready_inputs is None: ready_inputs = {}
@@ -22,9 +99,9 @@ def run_func_via_gui(func_to_run: Callable, ready_inputs=None) -> None:
 
     def execute():
         args = []
-        for result in entries:
+        for i, result in enumerate(entries):
             cur = result.get()
-            if len(cur) == 0:
+            if len(cur) == 0 and not optional[i]:
                 warning["text"] = "Please fill out every parameter"
                 return
             args.append(cur)
@@ -32,12 +109,51 @@ def run_func_via_gui(func_to_run: Callable, ready_inputs=None) -> None:
         warning.update()
         real_args = []
         for i in range(len(args)):
-            if types[i] == bool: real_args.append(args[i] == "True")
+            if len(args[i]) == 0: real_args.append(None) # optional parameters that were left empty
+            elif types[i] == bool: real_args.append(args[i] == "True")
+            elif types[i] == datetime:
+                try: real_args.append(datetime.strptime(args[i], DATE_FORMAT))
+                except ValueError: warning["text"] = f"Please make sure {params[i]} looks like 2022-01-31.";warning.update(); return
             else:
                 try: real_args.append(types[i](args[i]))
                 except ValueError: warning["text"] = f"Please make sure {params[i]} is an integer.";warning.update(); return
-        print(func_to_run, real_args)
-        func_to_run(*real_args)
+        if profile_toggle.get():
+            Profiling.clear()
+            Profiling.enable()
+        elif Profiling.TRACE_PATH_FROM_ENVIRONMENT == "": Profiling.disable()
+
+        progress = ScanProgress()
+        future = analysis_executor.submit(prepare_graph_data, func_to_run, dict(zip(params, real_args)), progress)
+        generate_button.configure(state=tk.DISABLED)
+        cancel_button.configure(state=tk.NORMAL, command=progress.cancel)
+        window.after(POLL_INTERVAL_MS, poll, future, progress, real_args)
+
+    def poll(future: Future, progress: ScanProgress, real_args: list):
+        progress_bar["value"] = 100 * progress.fraction()
+        if not future.done():
+            if progress.cancelled: warning["text"] = "Cancelling..."
+            elif progress.total > 0: warning["text"] = f"{progress.stage}: {progress.done}/{progress.total}"
+            window.after(POLL_INTERVAL_MS, poll, future, progress, real_args)
+            return
+
+        generate_button.configure(state=tk.NORMAL)
+        cancel_button.configure(state=tk.DISABLED)
+        try: future.result()
+        except ScanCancelled:
+            warning["text"] = "Cancelled"
+            progress_bar["value"] = 0
+            return
+        except Exception as error:
+            warning["text"] = f"Could not generate graph: {error}"
+            return
+
+        warning["text"] = "Drawing graph!"
+        warning.update()
+        with Profiling.span("draw graph", graph=func_to_run.__name__):
+            func_to_run(*real_args)
+        if profile_toggle.get():
+            Profiling.export_chrome_trace(PROFILE_TRACE_FILE)
+            warning["text"] = f"Profile saved to {PROFILE_TRACE_FILE}"
     window = tk.Tk()
     window.title("Tweak Options For Graph")
     window.geometry('400x400')
@@ -45,21 +161,25 @@ def run_func_via_gui(func_to_run: Callable, ready_inputs=None) -> None:
 
     params = []
     types = []
+    optional = [] # parameters that default to None can be left empty
     things = inspect.signature(func_to_run)
     for arg in things.parameters:
         types.append(things.parameters[arg].annotation)
         params.append(arg)
+        optional.append(things.parameters[arg].default is None)
 
-    offset = 0.1
+    offset = min(0.1, 1 / (len(params) + 5))
     width = 0.5
     labels = []
     entries = []
     type_to_widg = {int: tk.Entry,
                     bool: TrueFalseComboBox,
-                    str: tk.Entry}
+                    str: tk.Entry,
+                    datetime: tk.Entry}
 
     for i in range(len(params)):
-        labels.append(tk.Label(window, text=params[i]).place(relx=0, rely=offset*i, relwidth=width, relheight=offset, anchor="nw"))
+        label = params[i] if types[i] != datetime else f"{params[i]} (like 2022-01-31, optional)"
+        labels.append(tk.Label(window, text=label).place(relx=0, rely=offset*i, relwidth=width, relheight=offset, anchor="nw"))
         type_of_widget = type_to_widg[types[i]]
 
         if params[i] == "interval": current = IntervalComboBox(window)
@@ -74,10 +194,18 @@ def run_func_via_gui(func_to_run: Callable, ready_inputs=None) -> None:
         entries.append(current)
     try: i
     except: return
-    tk.Button(window, text = "Generate Graph", command = execute).place(relx=0.5, rely=offset*(i+1), relwidth=0.4, relheight=offset, anchor="n")
+    generate_button = tk.Button(window, text = "Generate Graph", command = execute)
+    generate_button.place(relx=0.35, rely=offset*(i+1), relwidth=0.4, relheight=offset, anchor="n")
+    cancel_button = tk.Button(window, text = "Cancel", state = tk.DISABLED)
+    cancel_button.place(relx=0.75, rely=offset*(i+1), relwidth=0.3, relheight=offset, anchor="n")
     warning = tk.Label(window, text = "")
     warning.place(relx=0.5, rely=offset * (i + 2), relwidth=1,
                                                              relheight=offset, anchor="n")
+    progress_bar = ttk.Progressbar(window, orient = "horizontal", mode = "determinate", maximum = 100)
+    progress_bar.place(relx=0.5, rely=offset * (i + 3), relwidth=0.8, relheight=offset / 2, anchor="n")
+    profile_toggle = tk.BooleanVar(window, value=Profiling.is_enabled())
+    profile_checkbox = tk.Checkbutton(window, text = "Save profile", variable = profile_toggle)
+    profile_checkbox.place(relx=0.5, rely=offset * (i + 4), relwidth=0.4, relheight=offset / 2, anchor="n")
     window.mainloop()
 
 if __name__ == '__main__':
@@ -0,0 +1,110 @@
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime
+from concurrent.futures import Future
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data.Message_Search import MessageIndex
+from src.Handling_Data.Progress import ScanProgress, ScanCancelled
+from src.GUI.run_func import analysis_executor, POLL_INTERVAL_MS
+
+MAX_RESULTS = 200 # only the most recent results are listed
+DATE_FORMAT = "%Y-%m-%d"
+ANY_CHAT = "(every chat)"
+
+
+def run_search(path: str, query: str, filters: dict, progress: ScanProgress):
+    """
+    Runs on the analysis thread. The index is built (or read from the analysis cache) the first time.
+    :return: (search results, text of every result)
+    """
+    index = MessageIndex.get(path, progress)
+    results = index.search(query, limit=MAX_RESULTS, **filters)
+    return results, [index.store.text(result.row) for result in results]
+
+
+def open_search_window(path: str) -> None:
+    """
+    Opens a window to search the text of every message in the export
+    :param path: path to root folder
+    :return: None
+    """
+
+    def search():
+        filters = {}
+        if chat_box.get() not in ("", ANY_CHAT): filters["chat_name"] = chat_box.get()
+        if sender_entry.get().strip() != "": filters["sender"] = sender_entry.get().strip()
+        try:
+            if start_entry.get().strip() != "": filters["start"] = datetime.strptime(start_entry.get().strip(), DATE_FORMAT)
+            if end_entry.get().strip() != "": filters["end"] = datetime.strptime(end_entry.get().strip(), DATE_FORMAT)
+        except ValueError:
+            status["text"] = "Dates have to look like 2022-01-31"
+            return
+
+        progress = ScanProgress()
+        future = analysis_executor.submit(run_search, path, query_entry.get(), filters, progress)
+        search_button.configure(state=tk.DISABLED)
+        cancel_button.configure(state=tk.NORMAL, command=progress.cancel)
+        window.after(POLL_INTERVAL_MS, poll, future, progress)
+
+    def poll(future: Future, progress: ScanProgress):
+        if not future.done():
+            if progress.cancelled: status["text"] = "Cancelling..."
+            elif progress.total > 0: status["text"] = f"{progress.stage}: {progress.done}/{progress.total}"
+            else: status["text"] = "Searching..."
+            window.after(POLL_INTERVAL_MS, poll, future, progress)
+            return
+
+        search_button.configure(state=tk.NORMAL)
+        cancel_button.configure(state=tk.DISABLED)
+        try: results, texts = future.result()
+        except ScanCancelled:
+            status["text"] = "Cancelled"
+            return
+        except Exception as error:
+            status["text"] = f"Could not search: {error}"
+            return
+
+        result_list.delete(*result_list.get_children())
+        for result, text in zip(results, texts):
+            sent = datetime.fromtimestamp(result.timestamp_ms / 1000).strftime("%Y-%m-%d %H:%M")
+            result_list.insert("", tk.END, values=(sent, result.chat_name, result.sender, text))
+        status["text"] = f"{len(results)} results" + (f" (showing the {MAX_RESULTS} most recent)" if len(results) == MAX_RESULTS else "")
+
+    window = tk.Tk()
+    window.title("Search Messages")
+    window.geometry("800x500")
+
+    form = tk.Frame(window)
+    form.pack(fill=tk.X, padx=5, pady=5)
+    labels = ["Search", "Chat", "Sender", f"From ({DATE_FORMAT})", f"To ({DATE_FORMAT})"]
+    for i, label in enumerate(labels): tk.Label(form, text=label).grid(row=i, column=0, sticky="w")
+    query_entry = tk.Entry(form)
+    chat_box = ttk.Combobox(form, values=[ANY_CHAT] + InstagramDataRetreiver.list_chats(path), state="readonly")
+    chat_box.set(ANY_CHAT)
+    sender_entry = tk.Entry(form)
+    start_entry = tk.Entry(form)
+    end_entry = tk.Entry(form)
+    for i, widget in enumerate([query_entry, chat_box, sender_entry, start_entry, end_entry]):
+        widget.grid(row=i, column=1, sticky="we")
+    form.columnconfigure(1, weight=1)
+    query_entry.bind("<Return>", lambda event: search())
+
+    buttons = tk.Frame(window)
+    buttons.pack(fill=tk.X, padx=5)
+    search_button = tk.Button(buttons, text="Search", command=search)
+    search_button.pack(side=tk.LEFT)
+    cancel_button = tk.Button(buttons, text="Cancel", state=tk.DISABLED)
+    cancel_button.pack(side=tk.LEFT)
+    status = tk.Label(buttons, text='Words, "quoted phrases" and prefixes like tomor*')
+    status.pack(side=tk.LEFT, padx=10)
+
+    columns = ("sent", "chat", "sender", "message")
+    result_list = ttk.Treeview(window, columns=columns, show="headings")
+    for column, width in zip(columns, (110, 150, 120, 400)):
+        result_list.heading(column, text=column.capitalize())
+        result_list.column(column, width=width, stretch=column == "message")
+    scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=result_list.yview)
+    result_list.configure(yscrollcommand=scrollbar.set)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    result_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+    window.mainloop()
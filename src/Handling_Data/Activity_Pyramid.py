@@ -0,0 +1,96 @@
+import numpy as np
+from typing import Dict, Tuple
+from src.Handling_Data.Aggregation_Engine import MessageAggregates
+from src.Handling_Data.Progress import ScanProgress
+from src.Handling_Data import Time_Bucketing
+from src.Handling_Data import Profiling
+
+memo_message_pyramids = {} # dict used to memoize ActivityPyramid.messages (maps export path -> (MessageStore, received pyramid, sent pyramid))
+
+
+class ActivityPyramid():
+    """
+    Sums of a series (message counts, message lengths...) for every interval of utils.get_time_string, from minutes up
+    to years. Only buckets with at least one message are stored:
+
+    keys[interval]   -> sorted bucket keys (see Time_Bucketing.bucket_keys)
+    sums[interval]   -> sum of the series in every bucket
+    prefix[interval] -> prefix sums of sums[interval], with a leading 0
+
+    Minutes are grouped with a bincount, then every level is built from the level under it: the buckets of a level are
+    contiguous runs of the finer buckets, so their sums are differences of the finer prefix sums. Switching between
+    levels (for instance when zooming into a graph, see UtilsForDataViz.plot_activity_pyramids) never looks at the
+    messages again.
+    """
+
+    def __init__(self, local_seconds: np.ndarray, weights: np.ndarray = None):
+        """
+        :param local_seconds: timestamps of the messages, as returned by Time_Bucketing.to_local_seconds
+        :param weights: value of every message. If None, every message counts as 1
+        """
+        self.keys: Dict[int, np.ndarray] = {}
+        self.sums: Dict[int, np.ndarray] = {}
+        self.prefix: Dict[int, np.ndarray] = {}
+        keys, sums = Time_Bucketing.sum_by_key(Time_Bucketing.bucket_keys_from_local_seconds(np.asarray(local_seconds, dtype=np.int64), 4), weights)
+        self._add_level(4, keys, sums.astype(np.int64))
+        for interval in (3, 2, 1, 0):
+            finer_keys = self.keys[interval + 1]
+            # start of every finer bucket in seconds, then the key of the bucket of this level that contains it
+            finer_seconds = finer_keys.astype(f"datetime64[{Time_Bucketing.INTERVAL_UNITS[interval + 1]}]").astype("datetime64[s]").astype(np.int64)
+            keys = Time_Bucketing.bucket_keys_from_local_seconds(finer_seconds, interval)
+            starts = np.flatnonzero(np.diff(keys, prepend=keys[:1] - 1)) if len(keys) > 0 else np.zeros(0, dtype=np.int64)
+            prefix = self.prefix[interval + 1]
+            self._add_level(interval, keys[starts], np.diff(prefix[np.append(starts, len(keys))]))
+
+    def _add_level(self, interval: int, keys: np.ndarray, sums: np.ndarray) -> None:
+        self.keys[interval] = keys
+        self.sums[interval] = sums
+        self.prefix[interval] = np.concatenate(([0], np.cumsum(sums))).astype(np.int64)
+
+    @staticmethod
+    def messages(path: str, progress: ScanProgress = None) -> Tuple["ActivityPyramid", "ActivityPyramid"]:
+        """
+        Returns the pyramids of the number of messages of an export, building them the first time they are requested.
+        :param path: path to root folder
+        :param progress: progress of loading the MessageStore, if it has to be loaded (see MessageStore.load)
+        :return: (messages received, messages sent)
+        """
+        aggregates = MessageAggregates.get(path, progress)
+        store, *pyramids = memo_message_pyramids.get(path, (None,))
+        if store is not aggregates.store:
+            is_owner = aggregates.store.is_owner
+            with Profiling.span("build activity pyramids", messages=len(aggregates.store)):
+                pyramids = [ActivityPyramid(aggregates.local_seconds[~is_owner]), ActivityPyramid(aggregates.local_seconds[is_owner])]
+            memo_message_pyramids[path] = (aggregates.store, *pyramids)
+        return pyramids[0], pyramids[1]
+
+    def _key_range(self, interval: int, start_s: int, end_s: int) -> Tuple[int, int]:
+        # rows of the buckets of the level that overlap [start_s, end_s)
+        first_key, last_key = Time_Bucketing.bucket_keys_from_local_seconds(np.array([start_s, max(end_s - 1, start_s)], dtype=np.int64), interval).tolist()
+        keys = self.keys[interval]
+        return int(np.searchsorted(keys, first_key)), int(np.searchsorted(keys, last_key, side="right"))
+
+    def visible(self, interval: int, start_s: int, end_s: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param interval: see utils.get_time_string
+        :param start_s: first second of the visible range, in local time (like Time_Bucketing.to_local_seconds)
+        :param end_s: second after the visible range
+        :return: (bucket keys, sums) of the buckets that overlap the range, plus the bucket before and the bucket after it
+        so that the line leaves the plot instead of stopping at its edges
+        """
+        first, stop = self._key_range(interval, start_s, end_s)
+        first, stop = max(first - 1, 0), min(stop + 1, len(self.keys[interval]))
+        return self.keys[interval][first:stop], self.sums[interval][first:stop]
+
+    def finest_interval(self, start_s: int, end_s: int, max_points: int, coarsest: int = 0) -> int:
+        """
+        :param start_s: first second of the visible range, in local time
+        :param end_s: second after the visible range
+        :param max_points: maximum number of buckets to show in the range
+        :param coarsest: interval to return when no finer interval fits
+        :return: finest interval (see utils.get_time_string) with at most max_points buckets in the range
+        """
+        for interval in range(4, coarsest, -1):
+            first, stop = self._key_range(interval, start_s, end_s)
+            if stop - first <= max_points: return interval
+        return coarsest
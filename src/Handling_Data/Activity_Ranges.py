@@ -0,0 +1,208 @@
+import numpy as np
+from datetime import datetime
+from typing import Dict, Tuple
+from src.Handling_Data.Aggregation_Engine import MessageAggregates
+from src.Handling_Data.Progress import ScanProgress
+from src.Handling_Data import Time_Bucketing
+from src.Handling_Data import Profiling
+
+memo_activity_ranges = {} # dict used to memoize ActivityRanges.get (maps export path -> ActivityRanges)
+
+# every series summed by ActivityRanges is split into messages received ("<series>_received") and sent ("<series>_sent")
+SERIES = ("messages",      # every message
+          "text_messages", # messages with text (the ones counted by MessageAggregates.cycle_counts)
+          "characters")    # characters of the messages with text
+
+# values of every chat that ActivityRanges.per_chat can compute for a range (named like Friendship_Rankings.METRICS)
+CHAT_METRICS = ("messages", "messages_received", "messages_sent", "characters_received", "characters_sent", "active_days")
+
+
+class ActivityRanges():
+    """
+    Answers "how much activity was there between two dates" from prefix sums, without looking at the messages again.
+
+    first_hour        -> first hour of the grid, in hours since 1970 (local time). The grid has an entry for every hour
+                         from the first message to the last one.
+    hourly[name]      -> prefix sums over the hours of the grid (with a leading 0) for every "<series>_received" and
+                         "<series>_sent" of SERIES. Any range is the difference of two entries.
+    chat_hours        -> sorted chat_id * number of hours + hour, for every hour in which a chat has messages
+    chat_hourly[name] -> prefix sums over chat_hours for messages_received, messages_sent, characters_received and
+                         characters_sent. The hours of a chat are contiguous, so a chat and a range are found with two
+                         binary searches
+    chat_days         -> sorted chat_id * number of days + day, for every day in which a chat has messages
+    hour_chats        -> sorted hour * number of chats + chat_id, the pairs of chat_hours ordered by hour so that the
+                         chats of a range of hours are a contiguous slice
+
+    Ranges are rounded down to whole hours: the hour of 'start' is included and the hour of 'end' isn't. Active days are
+    counted for whole days. Series over time (message_counts, chats_by_bucket) keep the buckets that start in the range,
+    like Time_Bucketing.range_mask.
+    """
+
+    def __init__(self, aggregates: MessageAggregates):
+        store = aggregates.store
+        self.aggregates = aggregates
+        self.store = store
+        self.number_of_chats = len(store.chat_names)
+        local_seconds = aggregates.local_seconds
+        hours = local_seconds // 3600
+        self.first_hour = int(hours.min()) if len(hours) > 0 else 0
+        self.number_of_hours = int(hours.max()) - self.first_hour + 1 if len(hours) > 0 else 0
+        hours = hours - self.first_hour
+
+        def prefix(counts: np.ndarray) -> np.ndarray:
+            return np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+        with_text = store.has_content
+        self.hourly: Dict[str, np.ndarray] = {}
+        self.chat_hours, chat_hour_index = np.unique(store.chat_id.astype(np.int64) * self.number_of_hours + hours, return_inverse=True)
+        chat_hour_index = chat_hour_index.reshape(-1)
+        self.hour_chats = np.sort(self.chat_hours % max(self.number_of_hours, 1) * self.number_of_chats + self.chat_hours // max(self.number_of_hours, 1))
+        self.chat_hourly: Dict[str, np.ndarray] = {}
+        for direction, selected in (("received", ~store.is_owner), ("sent", store.is_owner)):
+            texts = selected & with_text
+            self.hourly[f"messages_{direction}"] = prefix(np.bincount(hours[selected], minlength=self.number_of_hours))
+            self.hourly[f"text_messages_{direction}"] = prefix(np.bincount(hours[texts], minlength=self.number_of_hours))
+            self.hourly[f"characters_{direction}"] = prefix(np.bincount(hours[texts], weights=store.content_length[texts], minlength=self.number_of_hours))
+            self.chat_hourly[f"messages_{direction}"] = prefix(np.bincount(chat_hour_index[selected], minlength=len(self.chat_hours)))
+            self.chat_hourly[f"characters_{direction}"] = prefix(np.bincount(chat_hour_index[texts], weights=store.content_length[texts], minlength=len(self.chat_hours)))
+
+        # active_chats holds every distinct (day, chat) pair once
+        day_keys, chat_ids = aggregates.active_chats(2)
+        self.first_day = self.first_hour * 3600 // 86400
+        self.number_of_days = int(day_keys.max()) - self.first_day + 1 if len(day_keys) > 0 else 0
+        self.chat_days = np.sort(chat_ids.astype(np.int64) * self.number_of_days + (day_keys - self.first_day))
+
+    @staticmethod
+    def get(path: str, progress: ScanProgress = None) -> "ActivityRanges":
+        """
+        Returns the prefix sums of an export, computing them the first time they are requested.
+        :param path: path to root folder
+        :param progress: progress of loading the MessageStore, if it has to be loaded (see MessageStore.load)
+        :return: ActivityRanges
+        """
+        aggregates = MessageAggregates.get(path, progress)
+        ranges = memo_activity_ranges.get(path)
+        if ranges is None or ranges.store is not aggregates.store:
+            with Profiling.span("build activity ranges", messages=len(aggregates.store)):
+                ranges = ActivityRanges(aggregates)
+            memo_activity_ranges[path] = ranges
+        return ranges
+
+    def _hour_range(self, start: datetime = None, end: datetime = None) -> Tuple[int, int]:
+        # [first, stop) hours of the grid covered by [start, end)
+        first = 0 if start is None else min(max(Time_Bucketing.to_local_second(start) // 3600 - self.first_hour, 0), self.number_of_hours)
+        stop = self.number_of_hours if end is None else min(max(Time_Bucketing.to_local_second(end) // 3600 - self.first_hour, 0), self.number_of_hours)
+        return first, max(first, stop)
+
+    def _bucket_hours(self, interval: int, start: datetime = None, end: datetime = None) -> Tuple[np.ndarray, np.ndarray]:
+        # keys of the buckets of the grid that start in [start, end), and the hour of the grid where every one of them
+        # starts followed by the hour after the last one. Buckets of intervals 0 to 3 are whole hours
+        first_key, stop_key = Time_Bucketing.key_bounds(interval, start, end)
+        grid_keys = Time_Bucketing.bucket_keys_from_local_seconds(np.array([self.first_hour, self.first_hour + max(self.number_of_hours - 1, 0)], dtype=np.int64) * 3600, interval)
+        keys = np.arange(max(first_key, int(grid_keys[0])), min(stop_key, int(grid_keys[1]) + 1) if self.number_of_hours > 0 else 0, dtype=np.int64)
+        if len(keys) == 0: return keys, np.zeros(1, dtype=np.int64)
+        hours = Time_Bucketing.key_starts(np.append(keys, keys[-1] + 1), interval) // 3600 - self.first_hour
+        return keys, np.clip(hours, 0, self.number_of_hours)
+
+    def message_counts(self, interval: int, start: datetime = None, end: datetime = None) -> Tuple[np.ndarray, ...]:
+        """
+        Same as MessageAggregates.message_counts, for the buckets that start in a range. Every bucket is the difference of
+        two hourly prefix sums, so the cost depends on the number of buckets in the range only. Minutes are finer than
+        the grid, so they are filtered from MessageAggregates.message_counts instead.
+        :param interval: see utils.get_time_string
+        :param start: first moment of the range (local time), None to start at the first message
+        :param end: moment right after the range (local time), None to end after the last message
+        :return: (received bucket keys, received counts, sent bucket keys, sent counts), for the buckets with messages
+        """
+        if interval == 4:
+            counts = self.aggregates.message_counts(interval)
+            received, sent = Time_Bucketing.range_mask(counts[0], interval, start, end), Time_Bucketing.range_mask(counts[2], interval, start, end)
+            return counts[0][received], counts[1][received], counts[2][sent], counts[3][sent]
+        keys, hours = self._bucket_hours(interval, start, end)
+        counts = []
+        for direction in ("received", "sent"):
+            sums = np.diff(self.hourly[f"messages_{direction}"][hours])
+            counts += [keys[sums > 0], sums[sums > 0]]
+        return tuple(counts)
+
+    def chats_by_bucket(self, interval: int, start: datetime = None, end: datetime = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Same as MessageAggregates.active_chats, for the buckets that start in a range. The (hour, chat) pairs of the range
+        are sliced from hour_chats with two binary searches. Minutes are filtered from MessageAggregates.active_chats.
+        :param interval: see utils.get_time_string
+        :param start: first moment of the range (local time), None to start at the first message
+        :param end: moment right after the range (local time), None to end after the last message
+        :return: (bucket keys, chat ids). Every (bucket, chat) pair appears once, sorted by bucket.
+        """
+        if interval == 4:
+            keys, chat_ids = self.aggregates.active_chats(interval)
+            in_range = Time_Bucketing.range_mask(keys, interval, start, end)
+            return keys[in_range], chat_ids[in_range]
+        keys, hours = self._bucket_hours(interval, start, end)
+        first, stop = np.searchsorted(self.hour_chats, hours[[0, -1]] * self.number_of_chats)
+        pairs = self.hour_chats[first:stop]
+        buckets = np.searchsorted(hours, pairs // self.number_of_chats, side="right") - 1
+        bucket_chats = np.unique(buckets * self.number_of_chats + pairs % self.number_of_chats)
+        return keys[bucket_chats // self.number_of_chats], bucket_chats % self.number_of_chats
+
+    def total(self, series: str, start: datetime = None, end: datetime = None) -> int:
+        """
+        :param series: "<series>_received" or "<series>_sent", for a series of SERIES
+        :param start: first moment of the range (local time), None to start at the first message
+        :param end: moment right after the range (local time), None to end after the last message
+        :return: sum of the series in the range, in constant time
+        """
+        if series not in self.hourly: raise ValueError(f"series must be one of {', '.join(self.hourly)}. '{series}' is not a valid series")
+        first, stop = self._hour_range(start, end)
+        return int(self.hourly[series][stop] - self.hourly[series][first])
+
+    def cycle_counts(self, time_specification: int, start: datetime = None, end: datetime = None) -> Tuple[np.ndarray, ...]:
+        """
+        Same as MessageAggregates.cycle_counts, for the messages in a range. Every hour of the range is read once.
+        :param time_specification: see InstagramDataAnalyzer.count_msgs
+        :param start: first moment of the range (local time), None to start at the first message
+        :param end: moment right after the range (local time), None to end after the last message
+        :return: (sent positions, sent character counts, sent message counts,
+                  received positions, received character counts, received message counts)
+        """
+        if not(0 <= time_specification <= 3): raise ValueError(f"time_specification must be between 0 and 3. {time_specification} is not a valid value")
+        first, stop = self._hour_range(start, end)
+        hour_seconds = (np.arange(first, stop, dtype=np.int64) + self.first_hour) * 3600
+        counts = []
+        for direction in ("sent", "received"):
+            characters = np.diff(self.hourly[f"characters_{direction}"][first:stop + 1])
+            messages = np.diff(self.hourly[f"text_messages_{direction}"][first:stop + 1])
+            with_messages = messages > 0
+            hour_positions = Time_Bucketing.cycle_values_from_local_seconds(hour_seconds[with_messages], time_specification)
+            positions, character_counts = Time_Bucketing.sum_by_key(hour_positions, characters[with_messages])
+            counts += [positions, character_counts, Time_Bucketing.sum_by_key(hour_positions, messages[with_messages])[1]]
+        return tuple(counts)
+
+    def per_chat(self, metric: str, start: datetime = None, end: datetime = None) -> np.ndarray:
+        """
+        :param metric: one of CHAT_METRICS
+        :param start: first moment of the range (local time), None to start at the first message
+        :param end: moment right after the range (local time), None to end after the last message
+        :return: value of the metric in the range for every chat, indexed by chat id. Every chat costs two binary
+        searches, done together for every chat
+        """
+        if metric not in CHAT_METRICS: raise ValueError(f"metric must be one of {', '.join(CHAT_METRICS)}. '{metric}' can't be computed for a date range")
+        if metric == "messages": return self.per_chat("messages_received", start, end) + self.per_chat("messages_sent", start, end)
+        chats = np.arange(self.number_of_chats, dtype=np.int64)
+        if metric == "active_days":
+            first, stop = self._hour_range(start, end)
+            first_day = (first + self.first_hour) * 3600 // 86400 - self.first_day
+            stop_day = min(-(-(stop + self.first_hour) * 3600 // 86400) - self.first_day, self.number_of_days) # a partial last day counts as active
+            return (np.searchsorted(self.chat_days, chats * self.number_of_days + stop_day)
+                    - np.searchsorted(self.chat_days, chats * self.number_of_days + first_day)).astype(np.int64)
+        first, stop = self._hour_range(start, end)
+        prefix = self.chat_hourly[metric]
+        return prefix[np.searchsorted(self.chat_hours, chats * self.number_of_hours + stop)] - prefix[np.searchsorted(self.chat_hours, chats * self.number_of_hours + first)]
+
+    def active_chats(self, start: datetime = None, end: datetime = None) -> int:
+        """
+        :param start: first moment of the range (local time), None to start at the first message
+        :param end: moment right after the range (local time), None to end after the last message
+        :return: number of chats with at least one message in the range
+        """
+        return int(np.count_nonzero(self.per_chat("messages", start, end)))
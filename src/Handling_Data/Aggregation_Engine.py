@@ -0,0 +1,197 @@
+import time
+import numpy as np
+from typing import Dict, Tuple
+from src.Handling_Data.Message_Store import MessageStore, memo_message_store
+from src.Handling_Data import Time_Bucketing
+from src.Handling_Data.Progress import ScanProgress
+from src.Handling_Data import Profiling
+
+memo_message_aggregates = {} # dict used to memoize MessageAggregates.get (maps export path -> MessageAggregates)
+
+
+class MessageAggregates():
+    """
+    Computes every aggregate the analyzers need from a single pass over a MessageStore.
+
+    The timezone conversion is done once, then:
+    - sent/received character and message counts are computed for all four cycles (year, month, day of week, hour)
+    - sent/received message counts and active chats are computed for daily buckets
+    Other bucket intervals are computed on first request, reusing the converted timestamps.
+    Results are saved to the on-disk analysis cache of the store, so relaunching on an unchanged export skips the pass.
+    The converted timestamps are as big as the store, so they aren't cached: after a cached load they are only converted
+    again when something needs them (see MessageAggregates.local_seconds).
+    """
+
+    def __init__(self, store: MessageStore):
+        self.store = store
+        self._local_seconds = None
+        if self._load_from_cache(): return
+
+        self.cycles: Dict[int, Tuple[np.ndarray, ...]] = {}
+        self.messages_per_bucket: Dict[int, Tuple[np.ndarray, ...]] = {}
+        self.active_chats_per_bucket: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+        for time_specification in range(4):
+            self.cycles[time_specification] = self._cycle_counts_of_rows(self.local_seconds, slice(None), time_specification)
+
+        self._bucket(2)
+
+    @property
+    def local_seconds(self) -> np.ndarray:
+        """
+        :return: timestamp of every message of the store as "local epoch" seconds (see Time_Bucketing.to_local_seconds)
+        """
+        if self._local_seconds is None: self._local_seconds = Time_Bucketing.to_local_seconds(self.store.timestamp_ms)
+        return self._local_seconds
+
+    def _cycle_counts_of_rows(self, local_seconds: np.ndarray, rows: slice, time_specification: int) -> Tuple[np.ndarray, ...]:
+        with_text = self.store.has_content[rows] # messages without text are not counted in the cycles
+        cycle = Time_Bucketing.cycle_values_from_local_seconds(local_seconds[with_text], time_specification)
+        lengths = self.store.content_length[rows][with_text]
+        is_owner = self.store.is_owner[rows][with_text]
+        return (*self._group(cycle[is_owner], lengths[is_owner]),
+                *self._group(cycle[~is_owner], lengths[~is_owner]))
+
+    def _load_from_cache(self) -> bool:
+        """
+        :return: True if the aggregates were read from the on-disk analysis cache of the store
+        """
+        if self.store.cache is None: return False
+        cached = self.store.cache.load_result("message_aggregates", self._cache_key())
+        if cached is None: return False
+        self.cycles, self.messages_per_bucket, self.active_chats_per_bucket = cached
+        return True
+
+    def _cache_key(self) -> str:
+        # buckets are in local time, so the results are only valid for the timezone they were computed in
+        return self.store.fingerprint + "|" + "/".join(time.tzname)
+
+    def _save_to_cache(self) -> None:
+        if self.store.cache is None: return
+        self.store.cache.save_result("message_aggregates",
+                                     self._cache_key(),
+                                     (self.cycles, self.messages_per_bucket, self.active_chats_per_bucket))
+
+    @staticmethod
+    def _group(cycle: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        positions, total_lengths = Time_Bucketing.sum_by_key(cycle, lengths)
+        positions, counts = Time_Bucketing.sum_by_key(cycle)
+        return positions, total_lengths, counts
+
+    def _bucket(self, interval: int) -> None:
+        with Profiling.span("aggregate buckets", interval=interval):
+            self.messages_per_bucket[interval], self.active_chats_per_bucket[interval] = self._bucket_rows(self.local_seconds, slice(None), interval)
+        self._save_to_cache()
+
+    def _bucket_rows(self, local_seconds: np.ndarray, rows: slice, interval: int) -> Tuple[Tuple[np.ndarray, ...], Tuple[np.ndarray, np.ndarray]]:
+        keys = Time_Bucketing.bucket_keys_from_local_seconds(local_seconds, interval)
+        is_owner = self.store.is_owner[rows]
+        messages = (*Time_Bucketing.sum_by_key(keys[~is_owner]), *Time_Bucketing.sum_by_key(keys[is_owner]))
+
+        # each distinct (bucket, chat) pair only needs to be kept once:
+        pairs = np.unique(np.stack([keys, self.store.chat_id[rows].astype(np.int64)], axis=1), axis=0)
+        return messages, (pairs[:, 0], pairs[:, 1])
+
+    @staticmethod
+    def _merge_sums(*groups: Tuple[np.ndarray, ...]) -> Tuple[np.ndarray, ...]:
+        # groups are (keys, sums 1, sums 2 ...) tuples, as returned by _group and Time_Bucketing.sum_by_key
+        keys = np.concatenate([group[0] for group in groups])
+        merged = [None]
+        for i in range(1, len(groups[0])):
+            merged[0], sums = Time_Bucketing.sum_by_key(keys, np.concatenate([group[i] for group in groups]))
+            merged.append(sums)
+        return tuple(merged)
+
+    def merge_rows(self, store: MessageStore, first_new_row: int) -> None:
+        """
+        Updates the aggregates in place after rows were appended to the store (see MessageStore.merge_export).
+        Only the new rows are bucketed, then their counts are added to the existing ones, so the cost depends on the
+        number of new messages and the number of buckets rather than on the whole history.
+        :param store: store made of the rows the aggregates were computed from, followed by new rows
+        :param first_new_row: index of the first new row
+        """
+        self.store = store
+        new_rows = slice(first_new_row, None)
+        with Profiling.span("merge aggregates", messages=len(store) - first_new_row):
+            new_local_seconds = Time_Bucketing.to_local_seconds(store.timestamp_ms[new_rows])
+            for time_specification, (sent_positions, sent_lengths, sent_counts, received_positions, received_lengths, received_counts) in self.cycles.items():
+                new_cycle = self._cycle_counts_of_rows(new_local_seconds, new_rows, time_specification)
+                self.cycles[time_specification] = (*self._merge_sums((sent_positions, sent_lengths, sent_counts), new_cycle[:3]),
+                                                   *self._merge_sums((received_positions, received_lengths, received_counts), new_cycle[3:]))
+
+            for interval in self.messages_per_bucket:
+                new_messages, (new_keys, new_chat_ids) = self._bucket_rows(new_local_seconds, new_rows, interval)
+                received_keys, received_counts, sent_keys, sent_counts = self.messages_per_bucket[interval]
+                self.messages_per_bucket[interval] = (*self._merge_sums((received_keys, received_counts), new_messages[:2]),
+                                                      *self._merge_sums((sent_keys, sent_counts), new_messages[2:]))
+                keys, chat_ids = self.active_chats_per_bucket[interval]
+                pairs = np.unique(np.stack([np.concatenate([keys, new_keys]), np.concatenate([chat_ids, new_chat_ids])], axis=1), axis=0)
+                self.active_chats_per_bucket[interval] = (pairs[:, 0], pairs[:, 1])
+            if self._local_seconds is not None: self._local_seconds = np.concatenate([self._local_seconds, new_local_seconds])
+        self._save_to_cache()
+
+    @staticmethod
+    def get(path: str, progress: ScanProgress = None) -> "MessageAggregates":
+        """
+        Returns the aggregates for an export, computing them the first time they are requested.
+        :param path: path to root folder
+        :param progress: progress of loading the MessageStore, if it has to be loaded (see MessageStore.load)
+        :return: MessageAggregates
+        """
+        if path not in memo_message_aggregates:
+            store = MessageStore.get(path, progress)
+            with Profiling.span("aggregate messages", messages=len(store)):
+                memo_message_aggregates[path] = MessageAggregates(store)
+        return memo_message_aggregates[path]
+
+    @staticmethod
+    def get_merged(path: str, previous_path: str, progress: ScanProgress = None) -> "MessageAggregates":
+        """
+        Returns the aggregates for a newer export of the same account as 'previous_path', merging the new messages into
+        the store and aggregates of the previous export instead of computing everything again
+        (see MessageStore.merge_export and MessageAggregates.merge_rows).
+        The previous export is forgotten by MessageStore.get and MessageAggregates.get, since its aggregates are updated
+        in place.
+        :param path: path to root folder of the newer export
+        :param previous_path: path to root folder of the older export
+        :param progress: progress of loading the previous export (if it isn't loaded yet) and of the merge
+        :return: MessageAggregates
+        """
+        if path in memo_message_aggregates: return memo_message_aggregates[path]
+        previous = MessageAggregates.get(previous_path, progress)
+        store, first_new_row = MessageStore.merge_export(previous.store, path, progress)
+        memo_message_store[path] = store
+        if first_new_row is None:
+            memo_message_aggregates[path] = MessageAggregates(store)
+            return memo_message_aggregates[path]
+
+        previous.merge_rows(store, first_new_row)
+        memo_message_store.pop(previous_path, None)
+        memo_message_aggregates.pop(previous_path, None)
+        memo_message_aggregates[path] = previous
+        return previous
+
+    def cycle_counts(self, time_specification: int) -> Tuple[np.ndarray, ...]:
+        """
+        :param time_specification: see InstagramDataAnalyzer.count_msgs
+        :return: (sent positions, sent character counts, sent message counts,
+                  received positions, received character counts, received message counts)
+        """
+        if not(0 <= time_specification <= 3): raise ValueError(f"time_specification must be between 0 and 3. {time_specification} is not a valid value")
+        return self.cycles[time_specification]
+
+    def message_counts(self, interval: int) -> Tuple[np.ndarray, ...]:
+        """
+        :param interval: see utils.get_time_string
+        :return: (received bucket keys, received counts, sent bucket keys, sent counts)
+        """
+        if interval not in self.messages_per_bucket: self._bucket(interval)
+        return self.messages_per_bucket[interval]
+
+    def active_chats(self, interval: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param interval: see utils.get_time_string
+        :return: (bucket keys, chat ids). Every (bucket, chat) pair appears once, sorted by bucket.
+        """
+        if interval not in self.active_chats_per_bucket: self._bucket(interval)
+        return self.active_chats_per_bucket[interval]
@@ -1,40 +1,65 @@
 import datetime
 import os
+import numpy as np
 from typing import *
 from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
-from dateutil import parser
+from src.Handling_Data.Message_Store import MessageStore, memo_message_store
+from src.Handling_Data import Message_Store
+from src.Handling_Data.Aggregation_Engine import MessageAggregates
+from src.Handling_Data.Friendship_Rankings import ChatRankings, METRICS, top_chats
+from src.Handling_Data.Activity_Ranges import ActivityRanges
+from src.Handling_Data.Activity_Pyramid import ActivityPyramid
+from src.Handling_Data.Login_Analytics import LoginActivity, FIELDS
 from src.Handling_Data import utils
+from src.Handling_Data import Time_Bucketing
+from src.Handling_Data.Caching import lru_memoize
+from src.Handling_Data import Profiling
+from src.Handling_Data import Word_Counting
+from src.Handling_Data import Rolling_Statistics
 from datetime import datetime
 from collections import defaultdict
 from warnings import warn
 
-memo_count_msgs = {} # dict used to memoize the InstagramDataAnalyzer.count_msgs function
-memo_count_number_of_active_dms = {}
-memo_count_number_of_messages_per_day = {}
+# memoization limits for the analyzers (see Caching.lru_memoize). Results that hold a python object for every date or
+# word are bounded by size, since a minute-interval result for a long history can take up hundreds of megabytes.
+MEMO_MAX_BYTES = 256 * 1024 * 1024
 
 class InstagramDataAnalyzer():
 
     @staticmethod
-    def count_year_and_months_for_login_activity(path: str):
+    def count_year_and_months_for_login_activity(path: str, start: datetime = None, end: datetime = None):
         """
         :param path: root to export download
-        :return: a dictionary that maps year-month of the activity to how many logins that year/month.
+        :param start: only keep the months that start at or after this moment (UTC). None to start at the first login
+        :param end: only keep the months that start before this moment (UTC). None to end after the last login
+        :return: a dictionary that maps year-month of the activity (in UTC) to how many logins that year/month, most
+        recent month first.
         Dictionary format:
-        {'2022-1': 420,
-         '2021-11': 69,
-          '2021-10': 96 ...}
-        """
-        dates = InstagramDataRetreiver.get_login(path)
-        counts = {}
-        for login_activity in dates:
-            date_of_login = login_activity["title"]
-            date = parser.parse(date_of_login)
-            date = date.replace(minute=1, hour=1, second=1, day=1)
-            if date not in counts: counts[date] = 1
-            else: counts[date] += 1
-        return counts
+        {datetime(2022, 1, 1, 1, 1, 1, tzinfo=timezone.utc): 420,
+         datetime(2021, 11, 1, 1, 1, 1, tzinfo=timezone.utc): 69,
+         datetime(2021, 10, 1, 1, 1, 1, tzinfo=timezone.utc): 96 ...}
+        """
+        months, counts = LoginActivity.get(path).monthly_counts()
+        in_range = [(start is None or month.replace(tzinfo=None) >= start) and (end is None or month.replace(tzinfo=None) < end) for month in months]
+        return {month.replace(minute=1, hour=1, second=1): count for month, count, selected in zip(reversed(months), reversed(counts.tolist()), reversed(in_range)) if selected}
+
+    @staticmethod
+    def count_logins_by(path: str, field: int = 0, start: datetime = None, end: datetime = None) -> List[Tuple[str, int]]:
+        """
+        :param path: root to export download
+        :param field: which field of the logins to group by
+        0 -> IP address
+        1 -> user agent (browser or app)
+        2 -> language code
+        :param start: only count logins from this moment on (UTC). None to start at the first login
+        :param end: only count logins before this moment (UTC). None to end after the last login
+        :return: [(value, number of logins), ...] for every distinct value of the field, most logins first
+        """
+        if not(0 <= field < len(FIELDS)): raise ValueError(f"field must be between 0 and {len(FIELDS) - 1}. {field} is not a valid field")
+        return LoginActivity.get(path).counts_by(FIELDS[field], start, end)
 
     @staticmethod
+    @lru_memoize(max_entries=16, max_bytes=MEMO_MAX_BYTES)
     def get_message_length_over_time(path: str, chat_name: str) -> Dict[str, List[List[int]]]:
         """
         :param path: root to download export
@@ -44,16 +69,18 @@ class InstagramDataAnalyzer():
         {"Name1": [ [message1, message2 ... messageN], [timestamp1, timestamp2 ... timestampN] ],
          "Name2": ...}
         """
-        messages = InstagramDataRetreiver.get_messages(path, chat_name)
+        #if the whole export is already loaded (for instance by a batch report), the chat doesn't have to be read again
+        if path in memo_message_store:
+            return memo_message_store[path].message_lengths_by_sender(InstagramDataRetreiver.get_chat_folder(path, chat_name))
 
         senders = {} # senders = {"Name": [ [message1, message2 ... messageN], [timestamp1, timestamp2 ... timestampN] ] }
 
-        #we loop in reverse because the messages are ordered from most recent to oldest
-        for i in range(len(messages) - 1, -1, -1):
-            if "content" not in messages[i]: continue #it's a message that contains an image
-            sender = messages[i]["sender_name"]
-            timestamp = messages[i]["timestamp_ms"]
-            value = messages[i]["content"]
+        #messages are streamed from oldest to most recent
+        for message in InstagramDataRetreiver.iter_messages(path, chat_name):
+            if "content" not in message: continue #it's a message that contains an image
+            sender = message["sender_name"]
+            timestamp = message["timestamp_ms"]
+            value = message["content"]
 
             if sender not in senders: senders[sender] = [[len(value)], [timestamp]]
             else:
@@ -62,89 +89,163 @@ class InstagramDataAnalyzer():
         return senders
 
     @staticmethod
+    @lru_memoize(max_entries=16)
+    def get_message_pyramids_in_chat(path: str, chat_name: str) -> Dict[str, Tuple[ActivityPyramid, ActivityPyramid]]:
+        """
+        Builds the activity pyramids (see Activity_Pyramid.ActivityPyramid) of every sender of a chat, so that the per-chat
+        graphs can zoom between intervals without going back to the messages
+        :param path: root to download export
+        :param chat_name: name of chat history to count
+        :return: {"Name1": (pyramid of the number of messages, pyramid of the length of the messages), "Name2": ...}
+        Senders are in the same order as InstagramDataAnalyzer.get_message_length_over_time. Senders without messages are
+        left out.
+        """
+        pyramids = {}
+        for sender, (lengths, timestamps) in InstagramDataAnalyzer.get_message_length_over_time(path, chat_name).items():
+            if len(timestamps) == 0: continue # a sender without messages has no line
+            local_seconds = Time_Bucketing.to_local_seconds(np.array(timestamps, dtype=np.int64))
+            pyramids[sender] = (ActivityPyramid(local_seconds), ActivityPyramid(local_seconds, np.array(lengths, dtype=np.int64)))
+        return pyramids
+
+    @staticmethod
+    @lru_memoize(max_entries=16, max_bytes=MEMO_MAX_BYTES)
     def get_word_distribution(path: str, chat_name: str) -> Dict[str, int]:
         """
         :param path: root to download export
         :param chat_name: name of chat history to count
         :return:
-        A dictionary that maps words to how many times they were used in the chat.
-        {"Word1": value, "word2": 123 ...}
-        """
-        counting = {}
-        messages = InstagramDataRetreiver.get_messages(path, chat_name)
-        for i in range(len(messages) - 1, -1, -1):
-            if "content" not in messages[i]: continue #it's a message that contains an image
-            value = messages[i]["content"].lower().replace(",", "")
-            if "reacted â¤ï¸ to your message" in value: continue #Reacting to messages contaminate the word count
-            for word in value.split(" "):
-                if word == "": continue
-                if word not in counting: counting[word] = 1
-                else: counting[word] += 1
-        return counting
+        A dictionary that maps words to how many times they were used in the chat. Words are lowercase and the
+        punctuation around them is removed (see Word_Counting.tokenize).
+        {"word1": value, "word2": 123 ...}
+        """
+        return Word_Counting.count_words_in_chat(path, chat_name)
 
     @staticmethod
-    def count_number_of_messages_per_day(path: str, interval: int = 2) -> Tuple[Dict[datetime.date, str], Dict[datetime.date, str]]:
+    @lru_memoize(max_entries=4, max_bytes=MEMO_MAX_BYTES)
+    def get_word_distribution_in_every_chat(path: str, workers: int = None) -> Dict[str, int]:
+        """
+        Same as InstagramDataAnalyzer.get_word_distribution, but counts the words of every chat combined
+        :param path: root to download export
+        :param workers: number of processes used to count the chats. Defaults to Message_Store.DEFAULT_INGEST_WORKERS
+        :return: A dictionary that maps words to how many times they were used in every chat
+        """
+        if workers is None: workers = Message_Store.DEFAULT_INGEST_WORKERS
+        return Word_Counting.count_words_in_chats(path, InstagramDataRetreiver.list_chats(path), workers)
+
+    @staticmethod
+    @lru_memoize(max_entries=None, max_bytes=MEMO_MAX_BYTES)
+    def count_number_of_messages_per_day(path: str, interval: int = 2, start: datetime = None, end: datetime = None) -> Tuple[Dict[datetime.date, str], Dict[datetime.date, str]]:
         """
         counts number of active chats per day
         :param path: path to root folder
+        :param start: only keep the dates (buckets) that start at or after this moment (local time)
+        :param end: only keep the dates (buckets) that start before this moment (local time)
+        A range is answered from the prefix sums of Activity_Ranges.ActivityRanges
         :return: (received messages per day, sent messages per day)
         2 dictionaries that map dates to how many active chats are on that day.
         The first dictionary -> how many messages were received on each date
         Second Dictionary -> how many messages 'name_of_owner' sent on each date
         """
-        if (path, interval) in memo_count_number_of_messages_per_day: return memo_count_number_of_messages_per_day[(path, interval)]
-
-        time_string = utils.get_time_string(interval)
-        name_of_owner = InstagramDataRetreiver.get_name(path)
-        received = defaultdict(utils.zero)
-        sent = defaultdict(utils.zero)
-        for message, name in utils.loop_through_every_message(path):
-            #the following could be a single line, but I think it's more readable this way
-            message_date = message["timestamp_ms"]
-            message_date = datetime.fromtimestamp(int(message_date / 1000))
-            message_date = parser.parse(message_date.strftime(time_string))
+        aggregates = MessageAggregates.get(path)
+        name_of_owner = aggregates.store.name_of_owner
+        if start is None and end is None: received_dates, received_counts, sent_dates, sent_counts = aggregates.message_counts(interval)
+        else: received_dates, received_counts, sent_dates, sent_counts = ActivityRanges.get(path).message_counts(interval, start, end)
 
-            if message["sender_name"] == name_of_owner: sent[message_date] += 1
-            else: received[message_date] += 1
+        #datetime objects are only created once per distinct date:
+        received = defaultdict(utils.zero, zip(Time_Bucketing.keys_to_datetimes(received_dates, interval), received_counts.tolist()))
+        sent = defaultdict(utils.zero, zip(Time_Bucketing.keys_to_datetimes(sent_dates, interval), sent_counts.tolist()))
 
-        if len(sent) == 0 and name_of_owner != "":
+        if len(sent) == 0 and name_of_owner != "" and start is None and end is None:
             warn(f"\nIt appears {name_of_owner} has sent 0 messages in the entire history of your account. This is probably due to a mistake in the 'name_of_owner' variable specified.\nPlease make sure '{name_of_owner}' is the correct name.")
 
-        memo_count_number_of_messages_per_day[(path, interval)] = (received, sent)
         return received, sent
 
     @staticmethod
-    def count_number_of_active_dms(path: str, interval: int = 2) -> Dict[datetime.date, set]:
+    @lru_memoize(max_entries=None, max_bytes=MEMO_MAX_BYTES)
+    def count_number_of_active_dms(path: str, interval: int = 2, start: datetime = None, end: datetime = None) -> Dict[datetime.date, set]:
         """
         counts number of active chats per day. Very similar structure to InstagramDataAnalyzer.count_active_chats_per_date
 
         :param path: path to root folder
         :interval: see utils.get_time_string for more info
+        :param start: only keep the dates (buckets) that start at or after this moment (local time)
+        :param end: only keep the dates (buckets) that start before this moment (local time)
+        A range is answered from Activity_Ranges.ActivityRanges
         :return: {
         date1: {"name1", "name2"},
         date2: {"name3", "name4"}
         }
 
         """
-        if (path, interval) in memo_count_number_of_active_dms: return memo_count_number_of_active_dms[(path, interval)]
-        time_string = utils.get_time_string(interval)
+        bucket_keys, chat_ids = InstagramDataAnalyzer.get_active_chats_per_bucket(path, interval, start, end)
+
+        distinct_dates, date_index = np.unique(bucket_keys, return_inverse=True)
+        dates = Time_Bucketing.keys_to_datetimes(distinct_dates, interval)
+        chat_names = MessageAggregates.get(path).store.chat_names
         mapped = defaultdict(set)
-        for message, convo_name in utils.loop_through_every_message(path):
-            #the following could be a single line, but I think it's more readable this way
-            message_date = message["timestamp_ms"]
-            message_date = datetime.fromtimestamp(int(message_date / 1000))
-            message_date = parser.parse(message_date.strftime(time_string))
+        for i, chat_id in zip(date_index.reshape(-1).tolist(), chat_ids.tolist()):
+            mapped[dates[i]].add(chat_names[chat_id])
+        # todo: implement function that counts "number of people exposed to"
+        # this function would add store.sender_id instead of store.chat_id
+        return mapped
 
-            mapped[message_date].add(convo_name)
-            # todo: implement function that counts "number of people exposed to"
-            # this function would add message["sender_name"] instead of convo_name
+    @staticmethod
+    @lru_memoize(max_entries=16)
+    def get_active_chats_per_bucket(path: str, interval: int = 2, start: datetime = None, end: datetime = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param path: path to root folder
+        :param interval: see utils.get_time_string for more info
+        :param start: only keep the dates (buckets) that start at or after this moment (local time)
+        :param end: only keep the dates (buckets) that start before this moment (local time)
+        A range is answered from Activity_Ranges.ActivityRanges
+        :return: (bucket keys, chat ids). Every (bucket, chat) pair appears once, sorted by bucket (see
+        MessageAggregates.active_chats)
+        """
+        if start is None and end is None: return MessageAggregates.get(path).active_chats(interval)
+        return ActivityRanges.get(path).chats_by_bucket(interval, start, end)
 
-        memo_count_number_of_active_dms[(path, interval)] = mapped
-        return mapped
+    @staticmethod
+    @lru_memoize(max_entries=16, max_bytes=MEMO_MAX_BYTES)
+    def count_messages_per_day_over_window(path: str, window: int = 7, exponential: bool = False) -> Tuple[List[datetime], np.ndarray, np.ndarray]:
+        """
+        Smooths the daily counts of InstagramDataAnalyzer.count_number_of_messages_per_day (see Rolling_Statistics)
+        :param path: path to root folder
+        :param window: number of days to average over
+        :param exponential: if true, an exponentially weighted average that spans 'window' days is used instead of the
+        mean of the last 'window' days
+        :return: (every day from the first message to the last one, average number of messages received per day,
+        average number of messages sent per day)
+        """
+        received_days, received_counts, sent_days, sent_counts = MessageAggregates.get(path).message_counts(2)
+        first_day, last_day = Rolling_Statistics.daily_range(received_days, sent_days)
+        smooth = Rolling_Statistics.exponential_average if exponential else Rolling_Statistics.rolling_mean
+        received = smooth(Rolling_Statistics.dense_series(received_days, received_counts, first_day, last_day), window)
+        sent = smooth(Rolling_Statistics.dense_series(sent_days, sent_counts, first_day, last_day), window)
+        return Time_Bucketing.keys_to_datetimes(np.arange(first_day, last_day + 1), 2), received, sent
+
+    @staticmethod
+    @lru_memoize(max_entries=16, max_bytes=MEMO_MAX_BYTES)
+    def count_active_dms_over_window(path: str, window: int = 7) -> Tuple[List[datetime], np.ndarray]:
+        """
+        Counts the chats that were active during the last 'window' days, for every day. Unlike averaging the daily
+        counts of InstagramDataAnalyzer.count_number_of_active_dms, a chat that is active on several days of the window
+        is only counted once.
+        :param path: path to root folder
+        :param window: number of days in the window
+        :return: (every day from the first message to the last one, number of chats with a message in the 'window' days
+        that end on that day)
+        """
+        day_keys, chat_ids = MessageAggregates.get(path).active_chats(2)
+        first_day, last_day = Rolling_Statistics.daily_range(day_keys)
+        active = Rolling_Statistics.rolling_distinct(day_keys - first_day, chat_ids, last_day - first_day + 1, window)
+        return Time_Bucketing.keys_to_datetimes(np.arange(first_day, last_day + 1), 2), active
 
     @staticmethod
+    @lru_memoize(max_entries=32)
     def count_msgs(path: str,
                    time_specification: int = 2,
+                   start: datetime = None,
+                   end: datetime = None
                    ) -> Tuple[Dict[int, int], Dict[int, int], Tuple[Dict[int, int], Dict[int, int]]]:
 
         """
@@ -156,77 +257,52 @@ class InstagramDataAnalyzer():
         1 -> most active month (1, 2 ... 12)
         2 -> most active day of week (0, 1, 2, 3 ... 6)
         3 -> most active hour of day (1, 2, ... 24)
+        :param start: only count activity from this moment on (local time). None to start at the first message
+        :param end: only count activity before this moment (local time). None to end after the last message
+        Ranges are rounded down to whole hours (see Activity_Ranges.ActivityRanges)
 
         :return: A dictionary that maps days/months/years to messages sent
         Note: Every entry in the dictionary is an integer. For instance, instead of monday, tuesday etc., the entries are 0, 1, 2 (where each integer corresponds to an index in the week).
         NOTE: DAYS ARE INDEXED FROM 0-6, HOWEVER MONTHS ARE INDEXED FROM 1 TO 12.
 
         """
-        name_of_owner = InstagramDataRetreiver.get_name(path)
-        if (path, time_specification, name_of_owner) in memo_count_msgs: return memo_count_msgs[((path, time_specification, name_of_owner))]
-        print(path, time_specification, name_of_owner)
-
-
-        if not(0 <= time_specification <= 3): raise ValueError(f"time_specification must be between 0 and 3. {time_specification} is not a valid value")
-
-        time_string = utils.get_time_string(4) # we need most detailed time string
-
-        #wrapper functions for attributes that can't be accessed via functions:
-        def get_year(date_object: datetime): return date_object.year
-        def get_month(date_object: datetime): return date_object.month
-        def get_hour(date_object: datetime): return date_object.hour
-
-        function_to_call = [
-            get_year,
-            get_month,
-            datetime.weekday,
-            get_hour,
-        ]
-        getter_function = function_to_call[time_specification]
-
+        aggregates = MessageAggregates.get(path)
 
-        sent_lengths = defaultdict(utils.zero)
-        number_of_sent_messages = defaultdict(utils.zero)
+        with Profiling.span("count_msgs", time_specification=time_specification, messages=len(aggregates.store)):
+            # every cycle is computed in the same pass by MessageAggregates, so the wrapper functions share one scan
+            if start is None and end is None: cycle_counts = aggregates.cycle_counts(time_specification)
+            else: cycle_counts = ActivityRanges.get(path).cycle_counts(time_specification, start, end)
+            sent_positions, sent_character_counts, sent_counts, received_positions, received_character_counts, received_counts = cycle_counts
+            sent_positions, received_positions = sent_positions.tolist(), received_positions.tolist()
 
-        received_lengths = defaultdict(utils.zero)
-        number_of_received_messages = defaultdict(utils.zero)
-        for message, convo_name in utils.loop_through_every_message(path):
-            if "content" not in message: continue #no text
+            sent_lengths = defaultdict(utils.zero, zip(sent_positions, sent_character_counts.tolist()))
+            number_of_sent_messages = defaultdict(utils.zero, zip(sent_positions, sent_counts.tolist()))
+            received_lengths = defaultdict(utils.zero, zip(received_positions, received_character_counts.tolist()))
+            number_of_received_messages = defaultdict(utils.zero, zip(received_positions, received_counts.tolist()))
 
-            message_date = message["timestamp_ms"]
-            message_date = datetime.fromtimestamp(int(message_date / 1000))
-            message_date = parser.parse(message_date.strftime(time_string))
-            current_ = getter_function(message_date)
-
-            if message["sender_name"] == name_of_owner:
-                sent_lengths[current_] += len(message["content"])
-                number_of_sent_messages[current_] += 1
-            else:
-                received_lengths[current_] += len(message["content"])
-                number_of_received_messages[current_] += 1
-
-        memo_count_msgs[((path, time_specification, name_of_owner))] = (sent_lengths, number_of_sent_messages, received_lengths, number_of_received_messages)
         return sent_lengths, number_of_sent_messages, received_lengths, number_of_received_messages
 
     @staticmethod
-    def most_active_years(path: str) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int], Dict[int, int]]:
+    def most_active_years(path: str, start: datetime = None, end: datetime = None) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int], Dict[int, int]]:
         """
         Everything is the same as InstagramDataAnalyzer.most_active_day_of_week except this function checks most active years
         """
-        return InstagramDataAnalyzer.count_msgs(path, 0)
+        return InstagramDataAnalyzer.count_msgs(path, 0, start, end)
 
     @staticmethod
-    def most_active_months(path: str) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int], Dict[int, int]]:
+    def most_active_months(path: str, start: datetime = None, end: datetime = None) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int], Dict[int, int]]:
         """
         Everything is the same as InstagramDataAnalyzer.most_active_day_of_week except this function checks most active months of the year
         """
-        return InstagramDataAnalyzer.count_msgs(path, 1)
+        return InstagramDataAnalyzer.count_msgs(path, 1, start, end)
 
 
     @staticmethod
-    def most_active_days_of_week(path: str,) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int], Dict[int, int]]:
+    def most_active_days_of_week(path: str, start: datetime = None, end: datetime = None) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int], Dict[int, int]]:
         """
         :param path: path to root
+        :param start: only count activity from this moment on (local time). None to start at the first message
+        :param end: only count activity before this moment (local time). None to end after the last message
         :return: 4 dicts that maps days to integers
         dict1 -> how many characters in total were SENT on each day
         dict2 -> number of SENT messages on each day
@@ -239,22 +315,24 @@ class InstagramDataAnalyzer():
             {0: 123, 1: 22, ... 6: 58},
             )
         """
-        return InstagramDataAnalyzer.count_msgs(path, 2)
+        return InstagramDataAnalyzer.count_msgs(path, 2, start, end)
 
 
 
     @staticmethod
-    def most_active_hours(path: str) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int], Dict[int, int]]:
+    def most_active_hours(path: str, start: datetime = None, end: datetime = None) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int], Dict[int, int]]:
         """
         Everything is the same as InstagramDataAnalyzer.most_active_day_of_week except this function checks most active hours of the day
         """
-        return InstagramDataAnalyzer.count_msgs(path, 3)
+        return InstagramDataAnalyzer.count_msgs(path, 3, start, end)
 
     #todo: find rankings between friends. Who did you exchange most chats with? Who sent you most messages? Who did you send most messages to? Who did you interact with most days? etc.
 
     @staticmethod
     def friendship_rankings_by_messages_sent_to_user(path: str,
                                                      method: int = 0,
+                                                     start: datetime = None,
+                                                     end: datetime = None
                                                      ) -> Tuple[List, Dict[str, int]]:
         """
         Ranks people by looking at messages they sent to user
@@ -262,22 +340,52 @@ class InstagramDataAnalyzer():
         :param method: which method to rank people by.
         0 -> rank by number of messages sent
         1 -> rank by length of messages sent
+        :param start: only count activity from this moment on (local time). None to start at the first message
+        :param end: only count activity before this moment (local time). None to end after the last message
         :return: (List_of_people_in_descending_order, Dictionary_that_maps_usernames_to_points_gathered)
         Note: "points gathered" depends on which method is used. for method 0, "points gathered" will refer to how many messages, for method 1, "points gathered" will refer to total characters.
         """
         if not(method in {0, 1}): raise ValueError(f"method value must be either 0 or 1. Here are the meanings:\n0 -> rank by number of messages sent\n1 -> rank by length of messages sent\n{method} is not a valid method value")
-        name_of_owner = InstagramDataRetreiver.get_name(path)
-        chats_that_sent_user_messages = defaultdict(utils.zero)
-        for message, convo_name in utils.loop_through_every_message(path):
-            if message["sender_name"] == name_of_owner: continue
-            if method == 0: chats_that_sent_user_messages[convo_name] += 1
-            elif method == 1:
-                if "content" not in message: continue
-                chats_that_sent_user_messages[convo_name] += len(message["content"])
-
-        sorted_people = sorted(chats_that_sent_user_messages, key = lambda x: chats_that_sent_user_messages[x], reverse = True)
+        ranked = InstagramDataAnalyzer.friendship_rankings(path, 1 if method == 0 else 3, None, start, end)
+        chats_that_sent_user_messages = defaultdict(utils.zero, ranked)
+        sorted_people = [chat_name for chat_name, points in ranked]
         return sorted_people, chats_that_sent_user_messages
 
+    @staticmethod
+    def friendship_rankings(path: str, metric: int = 0, how_many: int = 20, start: datetime = None, end: datetime = None) -> List[Tuple[str, int]]:
+        """
+        Ranks chats by one of the metrics computed by Friendship_Rankings.ChatRankings
+        :param path: path to root
+        :param metric: index of the metric in Friendship_Rankings.METRICS
+        0 -> messages, 1 -> messages received, 2 -> messages sent, 3 -> characters received, 4 -> characters sent,
+        5 -> active days, 6 -> replies received, 7 -> replies sent, 8 -> time of the last message
+        :param how_many: number of chats to return
+        :param start: only count activity from this moment on (local time). None to start at the first message
+        :param end: only count activity before this moment (local time). None to end after the last message
+        Only metrics 0 to 5 can be computed for a range (see Activity_Ranges.CHAT_METRICS)
+        :return: [(chat name, value), ...] for the top chats, from highest to lowest value
+        """
+        if not(0 <= metric < len(METRICS)): raise ValueError(f"metric must be between 0 and {len(METRICS) - 1}. {metric} is not a valid metric")
+        if start is None and end is None: return ChatRankings.get(path).top(METRICS[metric], how_many)
+        ranges = ActivityRanges.get(path)
+        return top_chats(ranges.store.chat_names, ranges.per_chat(METRICS[metric], start, end), how_many)
+
+    @staticmethod
+    def count_activity_between(path: str, start: datetime = None, end: datetime = None) -> Dict[str, int]:
+        """
+        Counts the activity of every chat combined between two dates, in constant time once the export is loaded
+        (see Activity_Ranges.ActivityRanges)
+        :param path: path to root
+        :param start: only count activity from this moment on (local time). None to start at the first message
+        :param end: only count activity before this moment (local time). None to end after the last message
+        :return: {"messages_received": 123, "messages_sent": 45, "characters_received": 6789, "characters_sent": 1011,
+                  "active_chats": 12}
+        """
+        ranges = ActivityRanges.get(path)
+        counts = {series: ranges.total(series, start, end) for series in ("messages_received", "messages_sent", "characters_received", "characters_sent")}
+        counts["active_chats"] = ranges.active_chats(start, end)
+        return counts
+
 
 if __name__ == '__main__':
     from dotenv import load_dotenv
@@ -0,0 +1,90 @@
+import sys
+import threading
+import functools
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+memoized_functions = {} # maps qualified function names to their wrappers, see get_cache_stats
+
+
+def estimate_size(value: Any, _seen: set = None) -> int:
+    """
+    Roughly estimates how many bytes an object (and everything it contains) takes up in memory
+    :param value: object to measure
+    :return: size in bytes
+    """
+    if _seen is None: _seen = set()
+    if id(value) in _seen: return 0
+    _seen.add(id(value))
+
+    if isinstance(value, np.ndarray): return sys.getsizeof(value) + (value.nbytes if value.base is None else 0)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items(): size += estimate_size(key, _seen) + estimate_size(item, _seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value: size += estimate_size(item, _seen)
+    return size
+
+
+def lru_memoize(max_entries: int = 32, max_bytes: int = None) -> Callable:
+    """
+    Decorator that memoizes a function in a bounded, thread-safe LRU cache.
+    The least recently used results are evicted once there are more than 'max_entries' results, or once the results
+    take up more than 'max_bytes' bytes (see estimate_size).
+    The decorated function gains the following attributes:
+    cache_stats() -> dictionary of hits, misses, evictions, entries and bytes
+    cache_clear() -> empties the cache
+    :param max_entries: maximum number of results to keep, None for no limit
+    :param max_bytes: maximum total size of the kept results, None for no limit
+    :return: decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        cache = OrderedDict() # maps arguments to (result, size of result)
+        lock = threading.RLock()
+        stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    stats["hits"] += 1
+                    return cache[key][0]
+                stats["misses"] += 1
+
+            # the result is computed outside of the lock so that other arguments aren't blocked in the meantime
+            result = func(*args, **kwargs)
+            size = estimate_size(result) if max_bytes is not None else 0
+
+            with lock:
+                if key in cache: stats["bytes"] -= cache.pop(key)[1]
+                cache[key] = (result, size)
+                stats["bytes"] += size
+                while len(cache) > 1 and ((max_entries is not None and len(cache) > max_entries) or
+                                          (max_bytes is not None and stats["bytes"] > max_bytes)):
+                    stats["bytes"] -= cache.popitem(last=False)[1][1]
+                    stats["evictions"] += 1
+            return result
+
+        def cache_stats() -> Dict[str, int]:
+            with lock: return dict(stats, entries=len(cache))
+
+        def cache_clear() -> None:
+            with lock:
+                cache.clear()
+                stats["bytes"] = 0
+
+        wrapper.cache_stats = cache_stats
+        wrapper.cache_clear = cache_clear
+        memoized_functions[func.__qualname__] = wrapper
+        return wrapper
+    return decorator
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """
+    :return: a dictionary that maps the name of every memoized function to its cache statistics
+    """
+    return {name: wrapper.cache_stats() for name, wrapper in memoized_functions.items()}
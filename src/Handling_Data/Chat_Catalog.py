@@ -0,0 +1,104 @@
+import os
+import json
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from src.Handling_Data.Export_Storage import get_storage
+from src.Handling_Data.Text_Normalization import repair_name
+
+INBOX_LAYERS = ("your_instagram_activity", "messages", "inbox")
+TITLE_TAIL_BYTES = 64 * 1024 # how much of the end of message_1.json is read to find the title of a chat
+
+memo_chat_catalog = {} # dict used to memoize ChatCatalog.get (maps inbox path -> ChatCatalog)
+
+
+class ChatCatalog():
+    """
+    Index of the chat folders in an export's inbox, built with a single directory listing.
+
+    Chats can be looked up by folder name ("thesimpsons_457uupaoka"), by username ("thesimpsons") or by the display
+    title stored inside the chat's json file. Exact lookups go through a dict and prefix lookups use bisect on sorted
+    keys, so both are O(log n) or better.
+    """
+
+    def __init__(self, root_path: str, mtime_ns: int):
+        self.root_path = root_path
+        self.mtime_ns = mtime_ns
+
+        self.folders: List[str] = sorted(get_storage(root_path).list_directories(*INBOX_LAYERS))
+
+        # Instagram adds a "_" and random characters to the end of every folder name
+        self.exact: Dict[str, str] = {}
+        for folder_name in self.folders: self.exact[folder_name] = folder_name
+        for folder_name in self.folders: self.exact.setdefault(folder_name.rsplit("_", 1)[0], folder_name)
+
+        self._titles: Optional[Dict[str, str]] = None
+        self._sorted_titles: Optional[List[str]] = None
+
+    @staticmethod
+    def get(root_path: str) -> "ChatCatalog":
+        """
+        Returns the catalog for an export. The catalog is rebuilt whenever the inbox directory is modified.
+        :param root_path: path to export root, or to the zip file of the export
+        :return: ChatCatalog
+        """
+        inbox_path = os.path.join(root_path, *INBOX_LAYERS)
+        mtime_ns = get_storage(root_path).stat(*INBOX_LAYERS).mtime_ns
+        catalog = memo_chat_catalog.get(inbox_path)
+        if catalog is None or catalog.mtime_ns != mtime_ns:
+            catalog = ChatCatalog(root_path, mtime_ns)
+            memo_chat_catalog[inbox_path] = catalog
+        return catalog
+
+    @staticmethod
+    def _prefix_search(sorted_keys: List[str], prefix: str) -> Optional[str]:
+        i = bisect_left(sorted_keys, prefix)
+        if i < len(sorted_keys) and sorted_keys[i].startswith(prefix): return sorted_keys[i]
+        return None
+
+    def _read_title(self, folder_name: str) -> str:
+        """
+        Instagram writes the title of a chat after its list of messages, so only the end of message_1.json is read: the
+        members from the last "title" key to the end of the file are parsed on their own. Files laid out differently (or
+        with a title in a message near the end) are parsed completely.
+        :param folder_name: name of the chat folder
+        :return: display title of the chat, "" if it has none
+        """
+        storage = get_storage(self.root_path)
+        layers = (*INBOX_LAYERS, folder_name, "message_1.json")
+        with storage.open(*layers) as file:
+            file.seek(max(storage.stat(*layers).size - TITLE_TAIL_BYTES, 0))
+            tail = file.read()
+        title_start = tail.rfind(b'"title"')
+        if title_start != -1:
+            try: return json.loads(b"{" + tail[title_start:]).get("title", "")
+            except ValueError: pass # the last "title" isn't a member of the chat object
+        return json.loads(storage.read_bytes(*layers)).get("title", "")
+
+    def _load_titles(self) -> None:
+        """
+        Reads the display title of every chat. This requires opening a json file per chat, so it is only done the first
+        time a lookup can't be resolved by folder name or username.
+        """
+        self._titles = {}
+        for folder_name in self.folders:
+            try:
+                title = self._read_title(folder_name)
+            except (OSError, ValueError):
+                continue
+            if title != "": self._titles.setdefault(repair_name(title), folder_name)
+        self._sorted_titles = sorted(self._titles)
+
+    def find(self, name: str) -> Optional[str]:
+        """
+        :param name: folder name, username or display title of a chat (or the beginning of one)
+        :return: name of the chat folder, or None if there is no matching chat
+        """
+        if name in self.exact: return self.exact[name]
+        folder_name = ChatCatalog._prefix_search(self.folders, name)
+        if folder_name is not None: return folder_name
+
+        if self._titles is None: self._load_titles()
+        if name in self._titles: return self._titles[name]
+        title = ChatCatalog._prefix_search(self._sorted_titles, name)
+        if title is not None: return self._titles[title]
+        return None
@@ -1,13 +1,24 @@
 from src.Handling_Data.Analyzing_Data import InstagramDataAnalyzer
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
-from typing import Dict, List, Callable
+import matplotlib.axes
+import matplotlib.dates
+import matplotlib.figure
+from typing import Dict, List, Callable, Tuple
 from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
 from collections import defaultdict
 from src.Handling_Data import utils
-from src.GUI.popups import create_popup_message
+from src.GUI.popups import create_paged_popup
+from src.Handling_Data.Follower_Timeline import RelationshipTimeline
+from src.Handling_Data.Pick_Index import PickedPoints
+from src.Handling_Data.Activity_Pyramid import ActivityPyramid
+from src.Handling_Data import Time_Bucketing
+from src.Handling_Data import Downsampling
 from datetime import datetime
-from dateutil import parser
+
+TREND_WINDOWS = (7, 30) # days of the trends that the time series graphs can overlay
+TREND_STYLES = ("--", ":") # line style of every trend window
 
 class UtilsForDataViz():
 
@@ -28,6 +39,93 @@ class UtilsForDataViz():
         a[4] = "(Minute Intervals)"
         return "date \n" + a[interval]
     @staticmethod
+    def get_plot_width(fig: matplotlib.figure.Figure = None) -> int:
+        """
+        Gets the width of a figure in pixels. Drawing more points than that doesn't show more detail, so dense
+        series are downsampled to this many points (see Downsampling.lttb_indexes)
+        :param fig: figure to measure, the current figure by default
+        :return: width of the figure in pixels
+        """
+        if fig is None: fig = plt.gcf()
+        return int(fig.get_figwidth() * fig.dpi)
+
+    @staticmethod
+    def plot_activity_pyramids(ax: matplotlib.axes.Axes,
+                               pyramids: List[ActivityPyramid],
+                               line_options: List[Dict],
+                               interval: int,
+                               downsample: bool = True,
+                               start: datetime = None,
+                               end: datetime = None) -> None:
+        """
+        Plots one line per pyramid, and plots them again from the pyramids whenever the x axis is zoomed or panned.
+        Zoomed in, the finest interval with at most one bucket per pixel is shown, but never an interval coarser than
+        'interval'. The whole history (or the range from 'start' to 'end', if one is given) is always shown with
+        'interval'.
+        :param ax: axes to plot in
+        :param pyramids: ActivityPyramid of every line
+        :param line_options: keyword arguments of ax.plot for every line (label, color...)
+        :param interval: interval of the whole graph, see utils.get_time_string
+        :param downsample: if true, every line is downsampled to the width of the plot (see Downsampling.lttb_indexes)
+        :param start: first date of the graph (local time), None to start at the first bucket
+        :param end: date after the end of the graph (local time), None to end at the last bucket
+        The x axis is limited to the range, just like zooming into it, but the range keeps 'interval'
+        :return: None
+        """
+
+        def line_data(keys: np.ndarray, sums: np.ndarray, level: int):
+            if downsample:
+                kept = Downsampling.lttb_indexes(keys, sums, UtilsForDataViz.get_plot_width(ax.figure))
+                keys, sums = keys[kept], sums[kept]
+            return Time_Bucketing.keys_to_datetimes(keys, level), sums
+
+        if not pyramids: return # nothing to plot (for instance when neither sent nor received messages are plotted)
+        lines = [ax.plot(*line_data(pyramid.keys[interval], pyramid.sums[interval], interval), **options)[0]
+                 for pyramid, options in zip(pyramids, line_options)]
+        minutes = np.concatenate([pyramid.keys[4] for pyramid in pyramids])
+        if len(minutes) == 0: return
+        first_s, end_of_history_s = int(minutes.min()) * 60, int(minutes.max() + 1) * 60
+        if start is not None: first_s = Time_Bucketing.to_local_second(start)
+        if end is not None: end_of_history_s = Time_Bucketing.to_local_second(end)
+
+        def on_xlim_changed(changed_ax):
+            start_s, end_s = (int(np.datetime64(matplotlib.dates.num2date(limit).replace(tzinfo=None), "s").astype(np.int64)) for limit in changed_ax.get_xlim())
+            if start_s <= first_s and end_s >= end_of_history_s: level = interval
+            else: level = min(pyramid.finest_interval(start_s, end_s, UtilsForDataViz.get_plot_width(ax.figure), interval) for pyramid in pyramids)
+            for pyramid, line in zip(pyramids, lines):
+                line.set_data(*line_data(*pyramid.visible(level, start_s, end_s), level))
+            changed_ax.set_xlabel(UtilsForDataViz.get_x_axis_label(level))
+            changed_ax.figure.canvas.draw_idle()
+
+        ax.callbacks.connect("xlim_changed", on_xlim_changed)
+        if start is not None or end is not None: ax.set_xlim(left=start, right=end)
+    @staticmethod
+    def plot_trends(ax: matplotlib.axes.Axes,
+                    interval: int,
+                    trends: List[Tuple[str, List[datetime], np.ndarray, str]],
+                    unit: str,
+                    start: datetime = None,
+                    end: datetime = None) -> None:
+        """
+        Overlays daily trends (see Rolling_Statistics) on a time series graph. Trends are per day, so unless the graph has
+        daily intervals they are drawn against a second y axis.
+        :param ax: axes of the graph
+        :param interval: interval of the graph, see utils.get_time_string
+        :param trends: (label, days, value on every day, line style) of every trend
+        :param unit: label of the y axis of the trends
+        :param start: only draw the days from this date on. None to start at the first day
+        :param end: only draw the days before this date. None to end at the last day
+        :return: None
+        """
+        trend_ax = ax if interval == 2 else ax.twinx()
+        for label, days, values, style in trends:
+            in_range = [(start is None or day >= start) and (end is None or day < end) for day in days]
+            trend_ax.plot([day for day, selected in zip(days, in_range) if selected], values[np.array(in_range, dtype=bool)], linestyle=style, label=label)
+        if trend_ax is not ax:
+            trend_ax.set_ylabel(unit)
+            trend_ax.legend(loc="upper left")
+
+    @staticmethod
     def get_time_string(interval: int = 3) -> str:
         """
         Wrapper function for utils.get_time_string
@@ -82,6 +180,8 @@ class UtilsForDataViz():
                                             ylabels: List[str],
                                             graph_type: int = 0,
                                             interval: int = 0,
+                                            start: datetime = None,
+                                            end: datetime = None
                                             ):
 
         """
@@ -99,6 +199,8 @@ class UtilsForDataViz():
         1 -> most active month
         2 -> most active day of week
         3 -> hour
+        :param start: only count the messages from this date on (local time). None to start at the first message
+        :param end: only count the messages before this date (local time). None to end after the last message
         :return:
         """
         if not (0 <= interval <= 3): raise ValueError(f"Interval value must be between 0 and 3. {interval} is not a valid value")
@@ -118,7 +220,7 @@ class UtilsForDataViz():
         fig1, ax1 = plt.subplots(2, 2)
 
         location = ((0,0), (0,1), (1,0), (1,1))
-        data = data_func(path)
+        data = data_func(path, start, end)
         for index in range(4):
             labels, sizes = [], []
             for d in sorted(data[index]):
@@ -150,6 +252,8 @@ class UtilsForDataViz():
                         func_to_get_data: Callable,
                         interval: int = 1,
                         what_gained: str = "followers",
+                        start: datetime = None,
+                        end: datetime = None
                         ):
         """
         Visualizes follower or following gain over time
@@ -162,66 +266,37 @@ class UtilsForDataViz():
         2 -> daily intervals
         3 -> hourly interval
         4 -> Minute intervals (may misrepresent data since a long message will create extreme spikes)
+        :param start: only show the dates from this date on (local time). None to start at the first account
+        :param end: only show the dates before this date (local time). None to end at the last account
+        The totals still count every account added before the range
         :return: None
         """
         time_string = UtilsForDataViz.get_time_string(interval)
-        followers = func_to_get_data(path)
-
-        followers = sorted(followers, key = lambda person: person["string_list_data"][0]["timestamp"])
-
-        categorized_by_date = {}
-        for person in followers:
-            # timestamps[i] = datetime.fromtimestamp(int(timestamps[i]) / 1000)
-            # cache = parser.parse(timestamps[i].strftime(time_string))
-            follow_date = datetime.fromtimestamp(int(person["string_list_data"][0]["timestamp"]))
-            follow_date = parser.parse(follow_date.strftime(time_string))
-            if follow_date in categorized_by_date: categorized_by_date[follow_date].append(person)
-            else: categorized_by_date[follow_date] = [person]
-
+        timeline = RelationshipTimeline.get(path, func_to_get_data)
+        buckets = timeline.buckets(interval)
+        first, stop = timeline.bucket_range(interval, start, end)
 
         #plotting data:
-        xs, ys = [], []
-        names = []
         fig, ax = plt.subplots()
-        prev_total = 0
-        for date in categorized_by_date:
-            xs.append(date)
-            prev_total += len(categorized_by_date[date])
-            ys.append(prev_total)
-            names.append("")
-            for person in categorized_by_date[date]:
-
-                names[-1] += person["string_list_data"][0]["value"] + "\n"
-
-        ax.plot_date(xs, ys, picker=5)
-        plt.plot(xs, ys)
-
-
+        ax.plot_date(buckets.dates[first:stop], buckets.cumulative[first:stop], picker=5)
+        plt.plot(buckets.dates[first:stop], buckets.cumulative[first:stop])
 
+        pick_index = timeline.pick_index(interval)
 
         def on_pick(event):
-            line = event.artist
-            xdata, ydata = line.get_data()
-            ind = event.ind
-            how_many = ydata[ind]
-            dates = xdata[ind]
-            for i in range(len(how_many)):
-                if ind == 0: current_follower_num = ydata[ind]
-                else: current_follower_num = ydata[ind] - ydata[ind - 1]
-                current_followers = ""
-
-                for person in categorized_by_date[dates[i]]:
-                    date_followed = datetime.fromtimestamp(person['string_list_data'][0]['timestamp'])
-
-                    current_followers += f"{person['string_list_data'][0]['value']}\t\t\t\t[{date_followed}]\n"
+            # points that coincide on screen are picked together and shown in the same popup
+            points = [timeline.bucket_of(interval, event.artist.get_xdata()[ind]) for ind in event.ind]
+            titles = []
+            for bucket in points:
+                current_follower_num = pick_index.count(bucket)
                 popup_title = f"{current_follower_num} {what_gained}"
                 if current_follower_num > 1: popup_title += "s"
-                popup_title += f" in the {['year', 'month', 'day', 'hour', 'minute'][interval]} of {dates[i].strftime(time_string)}:"
-                create_popup_message(
-                    message = current_followers,
-                    title_in_popup = popup_title,
-                    window_title = f"{what_gained} information")
-                break #todo: implement threads to create multiple windows when data points coincide
+                popup_title += f" in the {['year', 'month', 'day', 'hour', 'minute'][interval]} of {buckets.dates[bucket].strftime(time_string)}:"
+                titles.append(popup_title)
+            create_paged_popup(
+                lines = PickedPoints(pick_index, points, titles if len(points) > 1 else None),
+                title_in_popup = titles[0] if len(points) == 1 else f"{len(points)} dates:",
+                window_title = f"{what_gained} information")
 
         fig.canvas.mpl_connect('pick_event', on_pick)
 
@@ -0,0 +1,220 @@
+import os
+import json
+import pickle
+import shutil
+import hashlib
+import numpy as np
+from warnings import warn
+from typing import Any, BinaryIO, Dict, List, Optional
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data.Export_Storage import get_storage
+
+CACHE_VERSION = 3 # 2: chat columns hold the repaired text of messages, 3: message aggregates don't hold local_seconds
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def get_cache_directory(root_path: str) -> str:
+    """
+    The cache is stored next to the export, so "C:/Downloads/emre.cenk99_20220110" is cached in
+    "C:/Downloads/emre.cenk99_20220110_analysis_cache". The zip "C:/Downloads/emre.cenk99_20220110.zip" shares the same
+    cache directory as its extracted folder.
+    :param root_path: path to export root, or to the zip file of the export
+    :return: path to the cache directory of the export
+    """
+    root_path = os.path.normpath(os.path.abspath(root_path))
+    if root_path.lower().endswith(".zip"): root_path = root_path[:-len(".zip")]
+    return root_path + "_analysis_cache"
+
+
+def hash_file(file: BinaryIO) -> str:
+    """
+    :param file: file opened in binary mode
+    :return: hex digest of the contents of the file
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomically(file_path: str, write: callable) -> None:
+    temporary_path = file_path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        write(file)
+    os.replace(temporary_path, file_path)
+
+
+class AnalysisCache():
+    """
+    Persistent cache of parsed chat columns and aggregate results for an export.
+
+    Every source json file is fingerprinted by its size, mtime and content hash. The content hash is only recomputed
+    when the size or mtime of a file changes, so checking an unchanged export only costs a stat per file, and a file
+    that was touched without being modified is not parsed again.
+
+    Layout of the cache directory:
+    manifest.json        -> fingerprint of every source file and of every cached chat
+    chats/<folder>.npz   -> ChatColumns of a chat
+    results/<name>.pkl   -> aggregate results, stored with the key (fingerprint) they were computed for
+    """
+
+    def __init__(self, root_path: str):
+        self.root_path = root_path
+        self.directory = get_cache_directory(root_path)
+        self.enabled = True
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.chats: Dict[str, str] = {}
+        self._seen_files = set()
+        self._seen_chats = set()
+
+        try:
+            with open(os.path.join(self.directory, "manifest.json")) as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get("version") == CACHE_VERSION:
+                self.files = manifest["files"]
+                self.chats = manifest["chats"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _path_in_cache(self, *layers: str) -> str:
+        return os.path.join(self.directory, *layers)
+
+    def _disable(self, error: Exception) -> None:
+        warn(f"\nThe analysis cache at '{self.directory}' can't be written and will not be used ({error}).")
+        self.enabled = False
+
+    def file_fingerprint(self, *layers: str) -> str:
+        """
+        :param layers: path of the file relative to the export root
+        :return: content hash of the file, reusing the stored hash if its size and mtime haven't changed
+        """
+        relative_path = "/".join(layers)
+        storage = get_storage(self.root_path)
+        stats = storage.stat(*layers)
+        previous = self.files.get(relative_path)
+        self._seen_files.add(relative_path)
+        if previous is not None and previous["size"] == stats.size and previous["mtime_ns"] == stats.mtime_ns:
+            return previous["hash"]
+
+        content_hash = hash_file(storage.open(*layers))
+        self.files[relative_path] = {"size": stats.size, "mtime_ns": stats.mtime_ns, "hash": content_hash}
+        return content_hash
+
+    def chat_fingerprint(self, chat_name: str) -> str:
+        """
+        :param chat_name: name of the chat folder
+        :return: fingerprint that changes whenever any message_N.json part of the chat changes
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for file_name in InstagramDataRetreiver.list_message_parts(self.root_path, chat_name):
+            digest.update(file_name.encode())
+            digest.update(self.file_fingerprint("your_instagram_activity", "messages", "inbox", chat_name, file_name).encode())
+        return digest.hexdigest()
+
+    def load_chat_columns(self, chat_name: str, fingerprint: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        :param chat_name: name of the chat folder
+        :param fingerprint: current fingerprint of the chat (see AnalysisCache.chat_fingerprint)
+        :return: the cached column arrays (see ChatColumns.to_arrays), or None if the chat isn't cached or its files changed
+        """
+        self._seen_chats.add(chat_name)
+        if not self.enabled or self.chats.get(chat_name) != fingerprint: return None
+        try:
+            with np.load(self._path_in_cache("chats", chat_name + ".npz")) as columns:
+                return {name: columns[name] for name in columns.files}
+        except (OSError, ValueError):
+            return None
+
+    def save_chat_columns(self, chat_name: str, fingerprint: str, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        :param chat_name: name of the chat folder
+        :param fingerprint: fingerprint of the chat files the columns were parsed from
+        :param arrays: column arrays to store (see ChatColumns.to_arrays)
+        """
+        if not self.enabled: return
+        try:
+            os.makedirs(self._path_in_cache("chats"), exist_ok=True)
+            _write_atomically(self._path_in_cache("chats", chat_name + ".npz"), lambda file: np.savez(file, **arrays))
+            self.chats[chat_name] = fingerprint
+        except OSError as error:
+            self._disable(error)
+
+    def copy_chat_columns(self, source: "AnalysisCache", chat_name: str, fingerprint: str) -> None:
+        """
+        Reuses the cached columns of a chat from the cache of another export (see MessageStore.merge_export)
+        :param source: cache of the export the columns were parsed from
+        :param chat_name: name of the chat folder
+        :param fingerprint: fingerprint of the chat files in this export
+        """
+        self._seen_chats.add(chat_name)
+        source_path = source._path_in_cache("chats", chat_name + ".npz")
+        if not self.enabled or chat_name not in source.chats or not os.path.exists(source_path): return
+
+        def copy(file):
+            with open(source_path, "rb") as source_file: shutil.copyfileobj(source_file, file)
+        try:
+            if source.directory != self.directory: # a zip and its extracted folder share their cache directory
+                os.makedirs(self._path_in_cache("chats"), exist_ok=True)
+                _write_atomically(self._path_in_cache("chats", chat_name + ".npz"), copy)
+            self.chats[chat_name] = fingerprint
+        except OSError as error:
+            self._disable(error)
+
+    def load_result(self, name: str, key: str) -> Optional[Any]:
+        """
+        :param name: name of the result
+        :param key: fingerprint of the data the result has to be computed from
+        :return: the cached result, or None if it wasn't computed for the same key
+        """
+        if not self.enabled: return None
+        try:
+            with open(self._path_in_cache("results", name + ".pkl"), "rb") as result_file:
+                version, stored_key, value = pickle.load(result_file)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            return None
+        return value if version == CACHE_VERSION and stored_key == key else None
+
+    def save_result(self, name: str, key: str, value: Any) -> None:
+        """
+        Stores a result, replacing the previous result with the same name
+        :param name: name of the result
+        :param key: fingerprint of the data the result was computed from
+        :param value: any picklable object
+        """
+        if not self.enabled: return
+        try:
+            os.makedirs(self._path_in_cache("results"), exist_ok=True)
+            _write_atomically(self._path_in_cache("results", name + ".pkl"),
+                              lambda file: pickle.dump((CACHE_VERSION, key, value), file, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as error:
+            self._disable(error)
+
+    def save_manifest(self) -> None:
+        """
+        Writes the manifest, forgetting files and chats that no longer exist in the export
+        """
+        if not self.enabled: return
+        for chat_name in set(self.chats) - self._seen_chats:
+            del self.chats[chat_name]
+            try: os.remove(self._path_in_cache("chats", chat_name + ".npz"))
+            except OSError: pass
+        self.files = {relative_path: self.files[relative_path] for relative_path in self._seen_files if relative_path in self.files}
+
+        manifest = {"version": CACHE_VERSION, "files": self.files, "chats": self.chats}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            _write_atomically(self._path_in_cache("manifest.json"),
+                              lambda file: file.write(json.dumps(manifest).encode()))
+        except OSError as error:
+            self._disable(error)
+
+
+def combine_fingerprints(fingerprints: List[str]) -> str:
+    """
+    :param fingerprints: list of fingerprints
+    :return: a single fingerprint that changes if any of the given fingerprints change
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for fingerprint in fingerprints: digest.update(fingerprint.encode())
+    return digest.hexdigest()
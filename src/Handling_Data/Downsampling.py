@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def lttb_indexes(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Picks the points of a series that keep its shape with the Largest-Triangle-Three-Buckets algorithm. The first and
+    last points are always kept, and the other points are split into threshold - 2 buckets of (almost) the same size.
+    From every bucket, the point that makes the largest triangle with its neighbouring buckets is kept, so spikes
+    survive the downsampling.
+
+    The original algorithm uses the point kept from the previous bucket as the left corner of the triangle, which makes
+    every bucket depend on the one before it. Here the average of the previous bucket is used instead (just like the
+    average of the next bucket is used for the right corner), so that every bucket is computed at once.
+
+    :param x: sorted x values of the series (bucket keys, dates converted to numbers...)
+    :param y: y values of the series
+    :param threshold: maximum number of points to keep. Series with fewer points are kept as they are
+    :return: sorted indexes of the points to keep
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3: return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # bucket b holds the rows edges[b]:edges[b + 1]. Every bucket has at least one row since n - 2 >= threshold - 2
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    bucket = np.repeat(np.arange(threshold - 2), sizes)
+    mean_x = np.add.reduceat(x[1:-1], edges[:-1] - 1) / sizes
+    mean_y = np.add.reduceat(y[1:-1], edges[:-1] - 1) / sizes
+
+    left_x, left_y = np.concatenate(([x[0]], mean_x[:-1]))[bucket], np.concatenate(([y[0]], mean_y[:-1]))[bucket]
+    right_x, right_y = np.concatenate((mean_x[1:], [x[-1]]))[bucket], np.concatenate((mean_y[1:], [y[-1]]))[bucket]
+    # twice the area of the triangle (left corner, point, right corner) for every point but the first and last ones
+    areas = np.abs((left_x - right_x) * (y[1:-1] - left_y) - (left_x - x[1:-1]) * (right_y - left_y))
+
+    # sorting by bucket, then by decreasing area, puts the largest triangle of every bucket at the start of the bucket
+    order = np.lexsort((-areas, bucket))
+    return np.concatenate(([0], order[edges[:-1] - 1] + 1, [n - 1]))
@@ -0,0 +1,162 @@
+import os
+import zipfile
+import threading
+from datetime import datetime
+from typing import BinaryIO, Dict, List, NamedTuple, Set
+
+memo_export_storage = {} # dict used to memoize get_storage (maps export path -> DirectoryStorage or ZipStorage)
+
+# used to find the export root inside of a zip, in case Instagram (or the user) wrapped it in a top level folder
+MARKER_FILE = ("personal_information", "personal_information", "personal_information.json")
+
+
+class FileStats(NamedTuple):
+    size: int
+    mtime_ns: int
+
+
+class DirectoryStorage():
+    """
+    Reads an extracted export from a directory. Every path is given as layers relative to the export root, for
+    instance storage.read_bytes("connections", "followers_and_following", "followers.json")
+    """
+
+    def __init__(self, root_path: str):
+        self.root_path = root_path
+
+    def open(self, *layers: str) -> BinaryIO:
+        return open(os.path.join(self.root_path, *layers), "rb")
+
+    def read_bytes(self, *layers: str) -> bytes:
+        with self.open(*layers) as file: return file.read()
+
+    def list_files(self, *layers: str) -> List[str]:
+        """
+        :return: names of the files directly inside of the given directory
+        """
+        with os.scandir(os.path.join(self.root_path, *layers)) as entries:
+            return [entry.name for entry in entries if entry.is_file()]
+
+    def list_directories(self, *layers: str) -> List[str]:
+        """
+        :return: names of the directories directly inside of the given directory
+        """
+        with os.scandir(os.path.join(self.root_path, *layers)) as entries:
+            return [entry.name for entry in entries if entry.is_dir()]
+
+    def stat(self, *layers: str) -> FileStats:
+        stats = os.stat(os.path.join(self.root_path, *layers))
+        return FileStats(stats.st_size, stats.st_mtime_ns)
+
+
+class ZipStorage():
+    """
+    Reads an export straight from the zip Instagram delivers, without extracting it.
+
+    The member index is built once from the central directory of the zip. Members are decompressed on demand, and every
+    thread reads through its own handle of the zip so that threads can read members concurrently. Worker processes
+    build their own ZipStorage through get_storage.
+    """
+
+    def __init__(self, zip_path: str):
+        self.zip_path = zip_path
+        self.mtime_ns = os.stat(zip_path).st_mtime_ns
+        self._handles = threading.local()
+
+        with zipfile.ZipFile(zip_path) as archive: members = archive.infolist()
+        names = [ZipStorage._decode_name(member) for member in members]
+        prefix = ZipStorage._find_prefix(names)
+
+        self.members: Dict[str, zipfile.ZipInfo] = {}
+        self.children: Dict[str, Set[str]] = {"": set()} # maps directories to the names of the members inside of them
+        self.directories: Set[str] = {""}
+        for member, name in zip(members, names):
+            if not name.startswith(prefix): continue
+            relative_path = name[len(prefix):].rstrip("/")
+            if relative_path == "": continue
+            if not member.is_dir(): self.members[relative_path] = member
+            # zips don't always have entries for directories, so every parent directory of a member is added here
+            parts = relative_path.split("/")
+            for depth in range(len(parts)):
+                parent = "/".join(parts[:depth])
+                self.children.setdefault(parent, set()).add(parts[depth])
+                if depth < len(parts) - 1 or member.is_dir(): self.directories.add("/".join(parts[:depth + 1]))
+
+    @staticmethod
+    def _decode_name(member: zipfile.ZipInfo) -> str:
+        # zipfile decodes names as cp437 unless the utf-8 flag is set, but many zip tools write utf-8 names without it
+        if member.flag_bits & 0x800: return member.filename
+        try: return member.filename.encode("cp437").decode("utf-8")
+        except UnicodeError: return member.filename
+
+    @staticmethod
+    def _find_prefix(names: List[str]) -> str:
+        marker = "/".join(MARKER_FILE)
+        for name in names:
+            if name == marker or name.endswith("/" + marker): return name[:-len(marker)]
+        return ""
+
+    def _archive(self) -> zipfile.ZipFile:
+        # a forked worker process inherits the handles of its parent, which share their file offset with the parent, so
+        # handles are also tied to the process that opened them
+        process_id, archive = getattr(self._handles, "archive", (None, None))
+        if process_id != os.getpid():
+            archive = zipfile.ZipFile(self.zip_path)
+            self._handles.archive = (os.getpid(), archive)
+        return archive
+
+    def _member(self, layers) -> zipfile.ZipInfo:
+        relative_path = "/".join(layers)
+        if relative_path not in self.members:
+            raise FileNotFoundError(f"'{relative_path}' does not exist in '{self.zip_path}'")
+        return self.members[relative_path]
+
+    def _directory(self, layers) -> str:
+        relative_path = "/".join(layers)
+        if relative_path not in self.directories:
+            raise FileNotFoundError(f"Directory '{relative_path}' does not exist in '{self.zip_path}'")
+        return relative_path
+
+    def open(self, *layers: str) -> BinaryIO:
+        return self._archive().open(self._member(layers))
+
+    def read_bytes(self, *layers: str) -> bytes:
+        return self._archive().read(self._member(layers))
+
+    def list_files(self, *layers: str) -> List[str]:
+        directory = self._directory(layers)
+        prefix = directory + "/" if directory != "" else ""
+        return [name for name in self.children.get(directory, ()) if prefix + name in self.members]
+
+    def list_directories(self, *layers: str) -> List[str]:
+        directory = self._directory(layers)
+        prefix = directory + "/" if directory != "" else ""
+        return [name for name in self.children.get(directory, ()) if prefix + name in self.directories]
+
+    def stat(self, *layers: str) -> FileStats:
+        relative_path = "/".join(layers)
+        if relative_path in self.directories and relative_path not in self.members:
+            # directories inside of a zip only change when the zip itself changes
+            return FileStats(0, self.mtime_ns)
+        member = self._member(layers)
+        # zip timestamps only have a 2 second resolution, so the CRC of the member is added to tell apart versions of a
+        # file that were written in the same 2 seconds
+        return FileStats(member.file_size, int(datetime(*member.date_time).timestamp()) * 10 ** 9 + member.CRC)
+
+
+def is_zip_export(root_path: str) -> bool:
+    return os.path.isfile(root_path) and zipfile.is_zipfile(root_path)
+
+
+def get_storage(root_path: str):
+    """
+    :param root_path: path to an extracted export, or to the zip file of an export
+    :return: ZipStorage for zip files, DirectoryStorage otherwise. A zip is indexed again whenever the file changes.
+    """
+    storage = memo_export_storage.get(root_path)
+    if isinstance(storage, ZipStorage) and storage.mtime_ns == os.stat(root_path).st_mtime_ns: return storage
+    if isinstance(storage, DirectoryStorage): return storage
+
+    storage = ZipStorage(root_path) if is_zip_export(root_path) else DirectoryStorage(root_path)
+    memo_export_storage[root_path] = storage
+    return storage
@@ -0,0 +1,98 @@
+import numpy as np
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Tuple
+from src.Handling_Data import Time_Bucketing
+from src.Handling_Data import Profiling
+from src.Handling_Data.Pick_Index import PickIndex, pack_names
+
+memo_relationship_timelines = {} # dict used to memoize RelationshipTimeline.get (maps (export path, name of the getter) -> RelationshipTimeline)
+
+
+class TimelineBuckets(NamedTuple):
+    keys: np.ndarray       # sorted distinct bucket keys (see Time_Bucketing.bucket_keys)
+    dates: List[datetime]  # start of every bucket
+    starts: np.ndarray     # the accounts of bucket i are the sorted rows starts[i]:starts[i + 1]
+    cumulative: np.ndarray # total number of accounts up to and including every bucket
+
+
+class RelationshipTimeline():
+    """
+    Followers (or followed accounts) sorted by the time they were added.
+
+    timestamp_s  -> sorted int64 epoch timestamps in seconds
+    name_index   -> int32, the account added at timestamp_s[i] is username name_index[i]
+    name_data    -> usernames in the order of the export, packed with Pick_Index.pack_names
+    name_offsets
+
+    Since the timestamps are sorted, every bucket of a timeline is a contiguous range of rows, found with searchsorted.
+    """
+
+    def __init__(self, relationships: List[Dict]):
+        self.name_data, self.name_offsets = pack_names([relationship["string_list_data"][0]["value"] for relationship in relationships])
+        timestamps = np.array([relationship["string_list_data"][0]["timestamp"] for relationship in relationships], dtype=np.int64)
+        order = np.argsort(timestamps, kind="stable")
+        self.timestamp_s = timestamps[order]
+        self.name_index = order.astype(np.int32)
+        self._buckets: Dict[int, TimelineBuckets] = {}
+        self._pick_indexes: Dict[int, PickIndex] = {}
+
+    def __len__(self):
+        return len(self.timestamp_s)
+
+    @staticmethod
+    def get(path: str, func_to_get_data: Callable) -> "RelationshipTimeline":
+        """
+        :param path: path to root folder
+        :param func_to_get_data: InstagramDataRetreiver.get_followers or InstagramDataRetreiver.get_following
+        :return: RelationshipTimeline of the accounts returned by func_to_get_data, built the first time it is requested
+        """
+        key = (path, func_to_get_data.__name__)
+        if key not in memo_relationship_timelines:
+            with Profiling.span("build relationship timeline", relationships=func_to_get_data.__name__):
+                memo_relationship_timelines[key] = RelationshipTimeline(func_to_get_data(path))
+        return memo_relationship_timelines[key]
+
+    def buckets(self, interval: int) -> TimelineBuckets:
+        """
+        :param interval: see utils.get_time_string
+        :return: TimelineBuckets of every bucket with at least one account, oldest first
+        """
+        if interval not in self._buckets:
+            keys = Time_Bucketing.bucket_keys(self.timestamp_s * 1000, interval)
+            distinct_keys = np.unique(keys)
+            starts = np.append(np.searchsorted(keys, distinct_keys), len(keys))
+            self._buckets[interval] = TimelineBuckets(distinct_keys,
+                                                      Time_Bucketing.keys_to_datetimes(distinct_keys, interval),
+                                                      starts,
+                                                      np.cumsum(np.diff(starts)))
+        return self._buckets[interval]
+
+    def bucket_of(self, interval: int, date: datetime) -> int:
+        """
+        :param interval: see utils.get_time_string
+        :param date: any moment inside of a bucket (for instance the x value of a plotted point)
+        :return: index of the bucket in TimelineBuckets, found with a binary search
+        """
+        key = np.datetime64(date, "s").astype(f"datetime64[{Time_Bucketing.INTERVAL_UNITS[interval]}]").astype(np.int64)
+        return int(np.searchsorted(self.buckets(interval).keys, key))
+
+    def bucket_range(self, interval: int, start: datetime = None, end: datetime = None) -> Tuple[int, int]:
+        """
+        :param interval: see utils.get_time_string
+        :param start: first moment of the range (local time), None to start at the first bucket
+        :param end: moment right after the range (local time), None to end after the last bucket
+        :return: (first, stop) indexes in TimelineBuckets of the buckets that start in [start, end) (see
+        Time_Bucketing.range_mask), found with two binary searches
+        """
+        first_key, stop_key = Time_Bucketing.key_bounds(interval, start, end)
+        first, stop = np.searchsorted(self.buckets(interval).keys, [first_key, stop_key])
+        return int(first), int(stop)
+
+    def pick_index(self, interval: int) -> PickIndex:
+        """
+        :param interval: see utils.get_time_string
+        :return: PickIndex with the accounts added in every bucket, oldest first. Every interval shares the usernames.
+        """
+        if interval not in self._pick_indexes:
+            self._pick_indexes[interval] = PickIndex(self.name_data, self.name_offsets, self.buckets(interval).starts, self.name_index, self.timestamp_s)
+        return self._pick_indexes[interval]
@@ -0,0 +1,113 @@
+import numpy as np
+from typing import Dict, List, Tuple
+from src.Handling_Data.Aggregation_Engine import MessageAggregates
+from src.Handling_Data.Progress import ScanProgress
+from src.Handling_Data import Profiling
+
+memo_chat_rankings = {} # dict used to memoize ChatRankings.get (maps export path -> ChatRankings)
+
+# every metric ChatRankings computes for every chat, in the order they are numbered by the visualizers
+METRICS = ("messages",            # messages in the chat
+           "messages_received",   # messages sent by other people
+           "messages_sent",       # messages sent by the owner
+           "characters_received", # characters in the messages sent by other people
+           "characters_sent",     # characters in the messages sent by the owner
+           "active_days",         # distinct days (local time) with at least one message
+           "replies_received",    # messages sent by other people right after a message of the owner
+           "replies_sent",        # messages sent by the owner right after a message of someone else
+           "last_contact_ms")     # epoch timestamp in milliseconds of the most recent message
+
+
+class ChatRankings():
+    """
+    Every ranking metric (see METRICS) for every chat of a MessageStore, computed together with bincount group-bys over
+    the store. Reply counts need the messages of every chat in order, so they are the only metric that looks at
+    neighbouring rows.
+    """
+
+    def __init__(self, aggregates: MessageAggregates):
+        store = aggregates.store
+        self.store = store
+        number_of_chats = len(store.chat_names)
+
+        def count(selected: np.ndarray, weights: np.ndarray = None) -> np.ndarray:
+            counts = np.bincount(store.chat_id[selected], weights=None if weights is None else weights[selected], minlength=number_of_chats)
+            return counts.astype(np.int64)
+
+        received = ~store.is_owner
+        self.metrics: Dict[str, np.ndarray] = {"messages": np.bincount(store.chat_id, minlength=number_of_chats).astype(np.int64),
+                                               "messages_received": count(received),
+                                               "messages_sent": count(store.is_owner),
+                                               "characters_received": count(received & store.has_content, store.content_length),
+                                               "characters_sent": count(store.is_owner & store.has_content, store.content_length)}
+
+        # active_chats holds every distinct (day, chat) pair once
+        day_keys, chat_ids = aggregates.active_chats(2)
+        self.metrics["active_days"] = np.bincount(chat_ids, minlength=number_of_chats).astype(np.int64)
+
+        # rows of every chat in order (stores are ordered from oldest to most recent message within a chat)
+        rows = np.argsort(store.chat_id, kind="stable")
+        chat_id, is_owner, timestamp_ms = store.chat_id[rows], store.is_owner[rows], store.timestamp_ms[rows]
+        is_reply = (chat_id[1:] == chat_id[:-1]) & (is_owner[1:] != is_owner[:-1])
+        self.metrics["replies_received"] = np.bincount(chat_id[1:][is_reply & ~is_owner[1:]], minlength=number_of_chats).astype(np.int64)
+        self.metrics["replies_sent"] = np.bincount(chat_id[1:][is_reply & is_owner[1:]], minlength=number_of_chats).astype(np.int64)
+
+        last_contact_ms = np.zeros(number_of_chats, dtype=np.int64)
+        chats_with_messages = np.flatnonzero(self.metrics["messages"])
+        if len(rows) > 0:
+            chat_starts = np.concatenate(([0], np.cumsum(self.metrics["messages"])[:-1]))
+            last_contact_ms[chats_with_messages] = np.maximum.reduceat(timestamp_ms, chat_starts[chats_with_messages])
+        self.metrics["last_contact_ms"] = last_contact_ms
+
+    @staticmethod
+    def get(path: str, progress: ScanProgress = None) -> "ChatRankings":
+        """
+        Returns the rankings of an export, computing them the first time they are requested.
+        :param path: path to root folder
+        :param progress: progress of loading the MessageStore, if it has to be loaded (see MessageStore.load)
+        :return: ChatRankings
+        """
+        aggregates = MessageAggregates.get(path, progress)
+        rankings = memo_chat_rankings.get(path)
+        if rankings is None or rankings.store is not aggregates.store:
+            with Profiling.span("rank chats", messages=len(aggregates.store)):
+                rankings = ChatRankings(aggregates)
+            memo_chat_rankings[path] = rankings
+        return rankings
+
+    def metric(self, metric: str) -> np.ndarray:
+        """
+        :param metric: one of METRICS
+        :return: value of the metric for every chat, indexed by chat id
+        """
+        if metric not in self.metrics: raise ValueError(f"metric must be one of {', '.join(METRICS)}. '{metric}' is not a valid metric")
+        return self.metrics[metric]
+
+    def top(self, metric: str, n: int = None) -> List[Tuple[str, int]]:
+        """
+        :param metric: one of METRICS
+        :param n: number of chats to return, every chat by default
+        :return: see top_chats
+        """
+        return top_chats(self.store.chat_names, self.metric(metric), n)
+
+
+def top_chats(chat_names: List[str], values: np.ndarray, n: int = None) -> List[Tuple[str, int]]:
+    """
+    Only the top n chats are sorted: they are picked with argpartition first, so ranking thousands of chats to show
+    20 of them doesn't sort the other thousands.
+    :param chat_names: MessageStore.chat_names
+    :param values: value of every chat, indexed by chat id
+    :param n: number of chats to return, every chat by default
+    :return: (chat name, value) of the n chats with the highest value, highest first. Chats with a value of 0 are
+    left out and ties are ordered like chat_names.
+    """
+    candidates = np.flatnonzero(values > 0)
+    if n is not None and n < len(candidates):
+        if n <= 0: return []
+        # argpartition picks any of the chats tied with the n-th value, so those are taken in chat_names order instead
+        nth_value = -np.partition(-values[candidates], n - 1)[n - 1]
+        above = candidates[values[candidates] > nth_value]
+        candidates = np.concatenate([above, candidates[values[candidates] == nth_value][:n - len(above)]])
+    candidates = candidates[np.lexsort((candidates, -values[candidates]))]
+    return [(chat_names[chat_id], int(values[chat_id])) for chat_id in candidates.tolist()]
@@ -0,0 +1,91 @@
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data import Time_Bucketing
+from src.Handling_Data import Profiling
+
+memo_login_activity = {} # dict used to memoize LoginActivity.get (maps export path -> LoginActivity)
+
+# string_map_data fields that are grouped by LoginActivity, in the order they are numbered by the analyzers
+FIELDS = ("IP Address", "User Agent", "Language Code")
+
+
+def _login_seconds(login: Dict) -> int:
+    # the "Time" field holds the epoch timestamp of the login. Older exports only have the title, which is always an
+    # ISO 8601 string like "2022-01-10T05:47:01+00:00"
+    timestamp = login.get("string_map_data", {}).get("Time", {}).get("timestamp", 0)
+    if timestamp: return timestamp
+    return int(datetime.fromisoformat(login["title"]).timestamp())
+
+
+class LoginActivity():
+    """
+    Every login of an export held in NumPy columns, like MessageStore does for messages.
+
+    Columns:
+    timestamp_s -> int64 epoch timestamp of the login in seconds
+    field_ids   -> for every name in FIELDS, an int32 index into field_values[name] ("" when the login doesn't have it)
+
+    The logins per month (in UTC, like the titles of the logins) and per value of every field are counted when the
+    logins are read.
+    """
+
+    def __init__(self, logins: List[Dict]):
+        timestamp_s = []
+        field_values: Dict[str, Dict[str, int]] = {name: {} for name in FIELDS}
+        field_ids: Dict[str, List[int]] = {name: [] for name in FIELDS}
+        for login in logins:
+            timestamp_s.append(_login_seconds(login))
+            string_map_data = login.get("string_map_data", {})
+            for name in FIELDS:
+                value = string_map_data.get(name, {}).get("value", "")
+                field_ids[name].append(field_values[name].setdefault(value, len(field_values[name])))
+
+        self.timestamp_s = np.array(timestamp_s, dtype=np.int64)
+        self.field_ids = {name: np.array(ids, dtype=np.int32) for name, ids in field_ids.items()}
+        self.field_values: Dict[str, List[str]] = {name: list(values) for name, values in field_values.items()}
+
+        months = self.timestamp_s.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+        self.months, self.logins_per_month = Time_Bucketing.sum_by_key(months)
+        self.logins_per_value = {name: np.bincount(ids, minlength=len(self.field_values[name])) for name, ids in self.field_ids.items()}
+
+    def __len__(self):
+        return len(self.timestamp_s)
+
+    @staticmethod
+    def get(path: str) -> "LoginActivity":
+        """
+        Returns the logins of an export, reading them the first time they are requested.
+        :param path: path to root folder
+        :return: LoginActivity
+        """
+        if path not in memo_login_activity:
+            with Profiling.span("read logins") as read_span:
+                memo_login_activity[path] = LoginActivity(InstagramDataRetreiver.get_login(path))
+                read_span.add(logins=len(memo_login_activity[path]))
+        return memo_login_activity[path]
+
+    def monthly_counts(self) -> Tuple[List[datetime], np.ndarray]:
+        """
+        :return: (first moment of every month with a login in UTC, number of logins in that month), oldest month first
+        """
+        starts = self.months.astype("datetime64[M]").astype("datetime64[s]").astype(datetime).tolist()
+        return [start.replace(tzinfo=timezone.utc) for start in starts], self.logins_per_month
+
+    def counts_by(self, field: str, start: datetime = None, end: datetime = None) -> List[Tuple[str, int]]:
+        """
+        :param field: one of FIELDS
+        :param start: only count logins from this moment on (naive datetimes are in UTC). None to count every login
+        :param end: only count logins before this moment. None to count every login
+        :return: (value, number of logins) for every distinct value of the field with at least one login, most logins first
+        """
+        if field not in self.field_ids: raise ValueError(f"field must be one of {', '.join(FIELDS)}. '{field}' is not a valid field")
+        counts = self.logins_per_value[field]
+        if start is not None or end is not None:
+            in_range = np.ones(len(self.timestamp_s), dtype=bool)
+            if start is not None: in_range &= self.timestamp_s >= int(start.replace(tzinfo=start.tzinfo or timezone.utc).timestamp())
+            if end is not None: in_range &= self.timestamp_s < int(end.replace(tzinfo=end.tzinfo or timezone.utc).timestamp())
+            counts = np.bincount(self.field_ids[field][in_range], minlength=len(self.field_values[field]))
+        order = np.argsort(-counts, kind="stable")
+        return [(self.field_values[field][i], int(counts[i])) for i in order.tolist() if counts[i] > 0]
@@ -0,0 +1,351 @@
+import re
+import bisect
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from src.Handling_Data.Message_Store import MessageStore, MIN_CHATS_FOR_PARALLEL_INGEST
+from src.Handling_Data import Message_Store
+from src.Handling_Data.Progress import ScanProgress, ScanCancelled
+from src.Handling_Data.Word_Counting import tokenize
+from src.Handling_Data import Profiling
+
+memo_message_index = {} # dict used to memoize MessageIndex.get (maps export path -> MessageIndex)
+
+# a query is a list of clauses that all have to match: words, "quoted phrases" and prefixes ending with "*"
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class SearchResult(NamedTuple):
+    row: int # row of the message in the MessageStore
+    chat_name: str
+    offset: int # position of the message in its chat, oldest message first
+    sender: str
+    timestamp_ms: int
+
+
+def encode_varints(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Variable-byte encoding: every value is written as groups of 7 bits, least significant group first, and every byte
+    except the last one of a value has its high bit set. Small values (like the gaps between sorted positions) only
+    take a single byte.
+    :param values: non-negative integers
+    :return: (encoded bytes as uint8, number of bytes used by every value)
+    """
+    values = values.astype(np.uint64)
+    byte_counts = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7): byte_counts += values >= (np.uint64(1) << np.uint64(shift))
+    starts = np.cumsum(byte_counts) - byte_counts
+
+    encoded = np.empty(int(byte_counts.sum()), dtype=np.uint8)
+    for group in range(int(byte_counts.max()) if len(values) else 0):
+        selected = byte_counts > group
+        bits = (values[selected] >> np.uint64(7 * group)) & np.uint64(0x7F)
+        more = np.where(byte_counts[selected] > group + 1, 0x80, 0).astype(np.uint64)
+        encoded[starts[selected] + group] = (bits | more).astype(np.uint8)
+    return encoded, byte_counts
+
+
+def decode_varints(encoded: np.ndarray) -> np.ndarray:
+    """
+    Inverse of encode_varints (for values below 2 ** 53)
+    :param encoded: uint8 array
+    :return: int64 array of the decoded values
+    """
+    if len(encoded) == 0: return np.zeros(0, dtype=np.int64)
+    last_bytes = encoded < 0x80
+    value_index = np.cumsum(last_bytes) - last_bytes
+    first_bytes = np.concatenate(([0], np.flatnonzero(last_bytes)[:-1] + 1))
+    group = np.arange(len(encoded)) - first_bytes[value_index]
+    weights = (encoded & 0x7F).astype(np.float64) * np.exp2(7 * group)
+    return np.bincount(value_index, weights=weights).astype(np.int64)
+
+
+def _intersect(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    # both arrays are sorted and unique. The smaller one is searched for in the bigger one, so intersecting a rare term
+    # with a common one costs O(rare * log(common))
+    if len(first) > len(second): first, second = second, first
+    if len(first) == 0: return first
+    indexes = np.minimum(np.searchsorted(second, first), len(second) - 1)
+    return first[second[indexes] == first]
+
+
+def _tokenize_chat(texts: List[str]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    # runs in a worker process when the index is built in parallel
+    vocabulary: Dict[str, int] = {}
+    term_ids, token_counts = [], []
+    with Profiling.span("tokenize chat") as tokenize_span:
+        for text in texts:
+            tokens = tokenize(text)
+            term_ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+            token_counts.append(len(tokens))
+        tokenize_span.add(messages=len(token_counts))
+    return list(vocabulary), np.array(term_ids, dtype=np.int64), np.array(token_counts, dtype=np.int64)
+
+
+class MessageIndex():
+    """
+    Inverted index over the text of every message in an export.
+
+    Every token of every message gets a position: the tokens of a message are numbered consecutively, and one position
+    is skipped between messages so that phrases never match across two messages. Messages are numbered chat by chat (in
+    the order of MessageStore.chat_names), oldest message first, so message number m is message
+    m - chat_message_starts[chat] of its chat.
+
+    For every term, the sorted positions it occurs at are stored as gaps encoded with encode_varints, and the posting
+    lists of every term are concatenated in one uint8 array, ordered like the sorted vocabulary:
+    terms              -> sorted list of every distinct token
+    byte_starts        -> postings[byte_starts[t]:byte_starts[t + 1]] holds the positions of terms[t]
+    posting_starts     -> posting_starts[t + 1] - posting_starts[t] is the number of positions of terms[t]
+    message_starts     -> position of the first token of every message, the last value is the end of the last message
+    message_rows       -> row of every message in the MessageStore the index was built for
+    chat_message_starts-> number of the first message of every chat
+
+    Since the vocabulary is sorted, the terms that start with a prefix are contiguous, and so are their postings.
+    """
+
+    def __init__(self,
+                 terms: List[str],
+                 byte_starts: np.ndarray,
+                 posting_starts: np.ndarray,
+                 postings: np.ndarray,
+                 message_starts: np.ndarray,
+                 message_rows: np.ndarray,
+                 chat_message_starts: np.ndarray):
+        self.terms = terms
+        self.byte_starts = byte_starts
+        self.posting_starts = posting_starts
+        self.postings = postings
+        self.message_starts = message_starts
+        self.message_rows = message_rows
+        self.chat_message_starts = chat_message_starts
+        self.store: Optional[MessageStore] = None # set by MessageIndex.get
+
+    def to_arrays(self) -> Dict:
+        return {"terms": self.terms,
+                "byte_starts": self.byte_starts,
+                "posting_starts": self.posting_starts,
+                "postings": self.postings,
+                "message_starts": self.message_starts,
+                "message_rows": self.message_rows,
+                "chat_message_starts": self.chat_message_starts}
+
+    @staticmethod
+    def from_arrays(arrays: Dict) -> "MessageIndex":
+        """
+        Inverse of MessageIndex.to_arrays
+        """
+        return MessageIndex(**arrays)
+
+    @staticmethod
+    def tokenize_chats(store: MessageStore, rows_by_chat: List[np.ndarray], workers: int, progress: ScanProgress = None) -> List[Tuple]:
+        """
+        :param store: MessageStore to read the text of messages from
+        :param rows_by_chat: rows of the messages of every chat
+        :return: the output of _tokenize_chat for every chat, in the same order as rows_by_chat
+        """
+        if progress is not None: progress.start(len(rows_by_chat), "Indexing chats")
+        if workers <= 1 or len(rows_by_chat) < MIN_CHATS_FOR_PARALLEL_INGEST:
+            chats = []
+            for rows in rows_by_chat:
+                chats.append(_tokenize_chat(store.texts(rows)))
+                if progress is not None: progress.advance()
+            return chats
+
+        chats = []
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(rows_by_chat)))
+        try:
+            for chat in executor.map(_tokenize_chat, (store.texts(rows) for rows in rows_by_chat)):
+                chats.append(chat)
+                if progress is not None: progress.advance()
+        except ScanCancelled:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        return chats
+
+    @staticmethod
+    def build(store: MessageStore, workers: int = None, progress: ScanProgress = None) -> "MessageIndex":
+        """
+        Indexes the text of every message in a store
+        :param store: MessageStore of the export
+        :param workers: number of processes used to tokenize chats, defaults to DEFAULT_INGEST_WORKERS
+        :param progress: advanced once per chat. Cancelling it stops the build by raising ScanCancelled
+        :return: MessageIndex
+        """
+        if workers is None: workers = Message_Store.DEFAULT_INGEST_WORKERS
+        # rows of every chat, in store order (which is oldest message first within a chat)
+        message_rows = np.argsort(store.chat_id, kind="stable")
+        chat_sizes = np.bincount(store.chat_id, minlength=len(store.chat_names))
+        chat_message_starts = np.concatenate(([0], np.cumsum(chat_sizes)))
+        chats = MessageIndex.tokenize_chats(store, np.split(message_rows, chat_message_starts[1:-1]), workers, progress)
+
+        with Profiling.span("build message index", chats=len(chats)) as build_span:
+            vocabulary: Dict[str, int] = {}
+            term_parts, count_parts = [], []
+            for chat_terms, term_ids, token_counts in chats:
+                translation = np.array([vocabulary.setdefault(term, len(vocabulary)) for term in chat_terms], dtype=np.int64)
+                term_parts.append(translation[term_ids])
+                count_parts.append(token_counts)
+            token_terms = np.concatenate(term_parts) if term_parts else np.zeros(0, dtype=np.int64)
+            token_counts = np.concatenate(count_parts) if count_parts else np.zeros(0, dtype=np.int64)
+
+            # the position of a token is its index among every token, plus one skipped position per earlier message
+            message_starts = np.concatenate(([0], np.cumsum(token_counts + 1)))
+            positions = np.arange(len(token_terms), dtype=np.int64) + np.repeat(np.arange(len(token_counts)), token_counts)
+
+            # renumbering terms in sorted order, then grouping positions by term (stable, so each group stays sorted)
+            terms = sorted(vocabulary)
+            rank = np.empty(len(terms), dtype=np.int64)
+            rank[[vocabulary[term] for term in terms]] = np.arange(len(terms))
+            token_terms = rank[token_terms]
+            order = np.argsort(token_terms, kind="stable")
+            positions = positions[order]
+            posting_starts = np.concatenate(([0], np.cumsum(np.bincount(token_terms, minlength=len(terms)))))
+
+            gaps = np.diff(positions, prepend=0)
+            first_postings = posting_starts[:-1]
+            gaps[first_postings] = positions[first_postings] # every posting list starts with an absolute position
+            postings, byte_counts = encode_varints(gaps)
+            byte_starts = np.concatenate(([0], np.cumsum(byte_counts)))[posting_starts]
+
+            build_span.add(messages=len(token_counts))
+        return MessageIndex(terms,
+                            byte_starts,
+                            posting_starts,
+                            postings,
+                            message_starts,
+                            message_rows.astype(np.int64),
+                            chat_message_starts)
+
+    @staticmethod
+    def get(path: str, progress: ScanProgress = None) -> "MessageIndex":
+        """
+        Returns the index of an export. It is read from the analysis cache of the export when it was built for the same
+        messages, otherwise it is built and saved there.
+        :param path: path to root folder
+        :param progress: progress of the build, if the index has to be built
+        :return: MessageIndex
+        """
+        store = MessageStore.get(path, progress)
+        index = memo_message_index.get(path)
+        if index is not None and index.store is store: return index
+
+        arrays = store.cache.load_result("message_index", store.fingerprint) if store.cache is not None else None
+        if arrays is not None:
+            index = MessageIndex.from_arrays(arrays)
+        else:
+            index = MessageIndex.build(store, progress=progress)
+            if store.cache is not None: store.cache.save_result("message_index", store.fingerprint, index.to_arrays())
+        index.store = store
+        memo_message_index[path] = index
+        return index
+
+    def _term_range(self, term: str, prefix: bool = False) -> Tuple[int, int]:
+        first = bisect.bisect_left(self.terms, term)
+        if not prefix: return (first, first + 1) if first < len(self.terms) and self.terms[first] == term else (first, first)
+        # every term that starts with the prefix sorts between the prefix and the prefix followed by the last character
+        return first, bisect.bisect_left(self.terms, term + chr(0x10FFFF), lo=first)
+
+    def _positions(self, first_term: int, last_term: int) -> np.ndarray:
+        # positions of the terms first_term ... last_term - 1. They are contiguous, so they are decoded in one go and
+        # the running sum restarts at every term
+        if first_term >= last_term: return np.zeros(0, dtype=np.int64)
+        gaps = decode_varints(self.postings[self.byte_starts[first_term]:self.byte_starts[last_term]])
+        positions = np.cumsum(gaps)
+        if last_term - first_term == 1: return positions
+        counts = np.diff(self.posting_starts[first_term:last_term + 1])
+        counts = counts[counts > 0]
+        ends = np.cumsum(counts)
+        restarts = np.concatenate(([0], positions[ends[:-1] - 1]))
+        return positions - np.repeat(restarts, counts)
+
+    def _messages(self, positions: np.ndarray) -> np.ndarray:
+        # sorted unique numbers of the messages that hold the given positions
+        return np.unique(np.searchsorted(self.message_starts, positions, side="right") - 1)
+
+    def term_messages(self, term: str) -> np.ndarray:
+        """
+        :param term: a lowercase token (see Word_Counting.tokenize)
+        :return: sorted numbers of the messages that contain the term
+        """
+        return self._messages(self._positions(*self._term_range(term)))
+
+    def prefix_messages(self, prefix: str) -> np.ndarray:
+        """
+        :param prefix: start of a lowercase token
+        :return: sorted numbers of the messages that contain a term starting with the prefix
+        """
+        return self._messages(self._positions(*self._term_range(prefix, prefix=True)))
+
+    def phrase_messages(self, terms: List[str]) -> np.ndarray:
+        """
+        :param terms: lowercase tokens
+        :return: sorted numbers of the messages that contain the terms next to each other, in the same order
+        """
+        if len(terms) == 0: return np.zeros(0, dtype=np.int64)
+        # a phrase starts at position p if term i occurs at p + i for every i. The rarest terms are intersected first
+        shifted = sorted((self._positions(*self._term_range(term)) - i for i, term in enumerate(terms)), key=len)
+        starts = shifted[0]
+        for positions in shifted[1:]: starts = _intersect(starts, positions)
+        return self._messages(starts)
+
+    def query_messages(self, query: str) -> np.ndarray:
+        """
+        :param query: words, "quoted phrases" and prefixes like wee* separated by spaces. Every one of them has to match.
+        :return: sorted numbers of the matching messages
+        """
+        clauses = []
+        for phrase, word in QUERY_PATTERN.findall(query):
+            if word.endswith("*") and len(tokenize(word)) == 1:
+                clauses.append(self.prefix_messages(tokenize(word)[0]))
+            else:
+                terms = tokenize(phrase or word)
+                if terms: clauses.append(self.phrase_messages(terms))
+        if not clauses: return np.zeros(0, dtype=np.int64)
+
+        clauses.sort(key=len)
+        messages = clauses[0]
+        for clause in clauses[1:]: messages = _intersect(messages, clause)
+        return messages
+
+    def search(self,
+               query: str,
+               chat_name: str = None,
+               sender: str = None,
+               start: datetime = None,
+               end: datetime = None,
+               limit: int = None) -> List[SearchResult]:
+        """
+        :param query: see MessageIndex.query_messages
+        :param chat_name: only search the given chat
+        :param sender: only search messages sent by the given name
+        :param start: only search messages sent at or after this time
+        :param end: only search messages sent before this time
+        :param limit: maximum number of results
+        :return: matching messages, most recent first
+        """
+        store = self.store
+        with Profiling.span("search messages") as search_span:
+            messages = self.query_messages(query)
+            rows = self.message_rows[messages]
+            selected = np.ones(len(rows), dtype=bool)
+            if chat_name is not None:
+                selected &= store.chat_id[rows] == (store.chat_names.index(chat_name) if chat_name in store.chat_names else -1)
+            if sender is not None:
+                selected &= store.sender_id[rows] == (store.sender_names.index(sender) if sender in store.sender_names else -1)
+            if start is not None: selected &= store.timestamp_ms[rows] >= int(start.timestamp() * 1000)
+            if end is not None: selected &= store.timestamp_ms[rows] < int(end.timestamp() * 1000)
+            messages, rows = messages[selected], rows[selected]
+
+            newest_first = np.argsort(-store.timestamp_ms[rows], kind="stable")[:limit]
+            messages, rows = messages[newest_first], rows[newest_first]
+            chat_ids = np.searchsorted(self.chat_message_starts, messages, side="right") - 1
+            search_span.add(messages=len(rows))
+
+        return [SearchResult(int(row),
+                             store.chat_names[chat_id],
+                             int(message - self.chat_message_starts[chat_id]),
+                             store.sender_names[store.sender_id[row]],
+                             int(store.timestamp_ms[row]))
+                for message, row, chat_id in zip(messages, rows, chat_ids)]
@@ -0,0 +1,607 @@
+import os
+import numpy as np
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data.Disk_Cache import AnalysisCache, combine_fingerprints
+from src.Handling_Data.Progress import ScanProgress, ScanCancelled
+from src.Handling_Data import Profiling
+
+memo_message_store = {} # dict used to memoize MessageStore.get (maps export path -> MessageStore)
+
+# Parallel ingest settings (see MessageStore.parse_chats). The number of workers can be overridden with the
+# "ingest_workers" environment variable, 1 disables the process pool. Worker processes that shouldn't start pools of their
+# own (see render_report) set it to 1, so other modules read Message_Store.DEFAULT_INGEST_WORKERS instead of importing it.
+DEFAULT_INGEST_WORKERS = int(os.environ.get("ingest_workers", os.cpu_count() or 1))
+DEFAULT_INGEST_CHUNKSIZE = 4
+MIN_CHATS_FOR_PARALLEL_INGEST = 16 # below this, starting the worker processes costs more than it saves
+
+# When a newer export is merged into a store (see MessageStore.merge_export), messages sent up to this long before the
+# most recent stored message of a chat are read again and compared against the stored ones, so that messages with
+# equal timestamps or that showed up late in the previous export are neither lost nor counted twice.
+DEDUP_WINDOW_MS = 60 * 60 * 1000
+
+
+class ChatColumns():
+    """
+    Parsed columns for a single chat.
+    Sender and type ids are local to the chat; MessageStore.from_chat_columns interns them across the whole export.
+    The text of message i is text_data[text_offsets[i]:text_offsets[i + 1]] encoded as UTF-8 (see _pack_texts).
+    """
+
+    def __init__(self,
+                 chat_name: str,
+                 timestamp_ms: np.ndarray,
+                 sender_index: np.ndarray,
+                 content_length: np.ndarray,
+                 has_content: np.ndarray,
+                 type_index: np.ndarray,
+                 is_reaction: np.ndarray,
+                 text_data: np.ndarray,
+                 text_offsets: np.ndarray,
+                 sender_names: List[str],
+                 type_names: List[str]):
+        self.chat_name = chat_name
+        self.timestamp_ms = timestamp_ms
+        self.sender_index = sender_index
+        self.content_length = content_length
+        self.has_content = has_content
+        self.type_index = type_index
+        self.is_reaction = is_reaction
+        self.text_data = text_data
+        self.text_offsets = text_offsets
+        self.sender_names = sender_names
+        self.type_names = type_names
+
+    def __len__(self):
+        return len(self.timestamp_ms)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        :return: every column (including the name lists) as a NumPy array, ready to be saved with np.savez
+        """
+        return {"timestamp_ms": self.timestamp_ms,
+                "sender_index": self.sender_index,
+                "content_length": self.content_length,
+                "has_content": self.has_content,
+                "type_index": self.type_index,
+                "is_reaction": self.is_reaction,
+                "text_data": self.text_data,
+                "text_offsets": self.text_offsets,
+                "sender_names": np.array(self.sender_names, dtype=str),
+                "type_names": np.array(self.type_names, dtype=str)}
+
+    @staticmethod
+    def from_arrays(chat_name: str, arrays: Dict[str, np.ndarray]) -> "ChatColumns":
+        """
+        Inverse of ChatColumns.to_arrays
+        """
+        return ChatColumns(chat_name,
+                           arrays["timestamp_ms"],
+                           arrays["sender_index"],
+                           arrays["content_length"],
+                           arrays["has_content"],
+                           arrays["type_index"],
+                           arrays["is_reaction"],
+                           arrays["text_data"],
+                           arrays["text_offsets"],
+                           arrays["sender_names"].tolist(),
+                           arrays["type_names"].tolist())
+
+    @staticmethod
+    def from_messages(chat_name: str, messages: Iterable[Dict]) -> "ChatColumns":
+        """
+        :param chat_name: name of the chat folder
+        :param messages: message dictionaries with repaired text (see InstagramDataRetreiver.get_messages for the format)
+        :return: ChatColumns holding the messages in the order they were given
+        """
+        timestamp_ms, sender_index, content_length, has_content, type_index, is_reaction, texts = [], [], [], [], [], [], []
+
+        senders, types = {}, {}
+        for message in messages:
+            text = message.get("content")
+            timestamp_ms.append(message["timestamp_ms"])
+            sender_index.append(senders.setdefault(message.get("sender_name", ""), len(senders)))
+            type_index.append(types.setdefault(message.get("type", ""), len(types)))
+            has_content.append(text is not None)
+            content_length.append(len(text) if text is not None else 0)
+            is_reaction.append(message.get("is_reaction", False))
+            texts.append(text or "")
+
+        text_data, text_offsets = _pack_texts(texts)
+        return ChatColumns(chat_name,
+                           np.array(timestamp_ms, dtype=np.int64),
+                           np.array(sender_index, dtype=np.int32),
+                           np.array(content_length, dtype=np.int32),
+                           np.array(has_content, dtype=bool),
+                           np.array(type_index, dtype=np.int8),
+                           np.array(is_reaction, dtype=bool),
+                           text_data,
+                           text_offsets,
+                           list(senders),
+                           list(types))
+
+    @staticmethod
+    def parse_chat(path: str, chat_name: str) -> "ChatColumns":
+        """
+        Reads every message of a chat into column arrays
+        :param path: path to root folder
+        :param chat_name: name of the chat folder
+        :return: ChatColumns for the chat, ordered from oldest to most recent message
+        """
+        with Profiling.span("parse chat", chat=chat_name) as parse_span:
+            chat = ChatColumns.from_messages(chat_name, InstagramDataRetreiver.iter_messages(path, chat_name))
+            parse_span.add(messages=len(chat))
+        return chat
+
+    @staticmethod
+    def parse_new_messages(path: str, chat_name: str, since_ms: int) -> "ChatColumns":
+        """
+        Reads the messages of a chat that were sent at or after since_ms. Parts that only hold older messages are not read.
+        :param path: path to root folder
+        :param chat_name: name of the chat folder
+        :param since_ms: epoch timestamp in milliseconds
+        :return: ChatColumns for the new messages, ordered from oldest to most recent message
+        """
+        with Profiling.span("parse new messages", chat=chat_name) as parse_span:
+            newer = []
+            for message in InstagramDataRetreiver.iter_messages(path, chat_name, newest_first=True):
+                if message["timestamp_ms"] < since_ms: break
+                newer.append(message)
+            parse_span.add(messages=len(newer))
+            return ChatColumns.from_messages(chat_name, reversed(newer))
+
+    def _row_keys(self, rows: np.ndarray) -> List[Tuple]:
+        return list(zip(self.timestamp_ms[rows].tolist(),
+                        [self.sender_names[i] for i in self.sender_index[rows].tolist()],
+                        [self.type_names[i] for i in self.type_index[rows].tolist()],
+                        self.content_length[rows].tolist()))
+
+    def without_stored(self, stored: "ChatColumns", since_ms: int) -> "ChatColumns":
+        """
+        Drops the messages that are already in 'stored'. Only the messages of 'stored' sent at or after since_ms are
+        compared, so this is cheap when both hold the overlap of two exports.
+        :param stored: previously parsed columns of the same chat
+        :param since_ms: epoch timestamp in milliseconds where the overlap starts
+        :return: ChatColumns with the messages that 'stored' doesn't have
+        """
+        remaining = Counter(stored._row_keys(np.flatnonzero(stored.timestamp_ms >= since_ms)))
+        keep = np.ones(len(self), dtype=bool)
+        for row, key in enumerate(self._row_keys(np.flatnonzero(self.timestamp_ms >= since_ms))):
+            if remaining[key] > 0:
+                remaining[key] -= 1
+                keep[row] = False
+        return self.select(keep)
+
+    def select(self, rows: np.ndarray) -> "ChatColumns":
+        """
+        :param rows: boolean mask or indexes of the rows to keep
+        :return: ChatColumns with the selected rows
+        """
+        return ChatColumns(self.chat_name,
+                           self.timestamp_ms[rows],
+                           self.sender_index[rows],
+                           self.content_length[rows],
+                           self.has_content[rows],
+                           self.type_index[rows],
+                           self.is_reaction[rows],
+                           *_select_texts(self.text_data, self.text_offsets, rows),
+                           self.sender_names,
+                           self.type_names)
+
+    @staticmethod
+    def concatenate(first: "ChatColumns", second: "ChatColumns") -> "ChatColumns":
+        """
+        :return: ChatColumns with the rows of 'first' followed by the rows of 'second'
+        """
+        sender_ids = {name: i for i, name in enumerate(first.sender_names)}
+        type_ids = {name: i for i, name in enumerate(first.type_names)}
+        sender_index, type_index = _translate_ids(second, sender_ids, type_ids)
+        return ChatColumns(first.chat_name,
+                           np.concatenate([first.timestamp_ms, second.timestamp_ms]),
+                           np.concatenate([first.sender_index, sender_index]).astype(np.int32),
+                           np.concatenate([first.content_length, second.content_length]),
+                           np.concatenate([first.has_content, second.has_content]),
+                           np.concatenate([first.type_index, type_index]).astype(np.int8),
+                           np.concatenate([first.is_reaction, second.is_reaction]),
+                           *_concatenate_texts([first, second]),
+                           list(sender_ids),
+                           list(type_ids))
+
+
+def _translate_ids(chat: ChatColumns, sender_ids: Dict[str, int], type_ids: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    # translates the chat-local sender and type ids to the ids in sender_ids and type_ids, adding names that are missing
+    sender_lookup = np.array([sender_ids.setdefault(name, len(sender_ids)) for name in chat.sender_names], dtype=np.int32)
+    type_lookup = np.array([type_ids.setdefault(name, len(type_ids)) for name in chat.type_names], dtype=np.int8)
+    if len(chat) == 0: return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int8)
+    return sender_lookup[chat.sender_index], type_lookup[chat.type_index]
+
+
+def _pack_texts(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    # every text is encoded as UTF-8 and the bytes are concatenated, so the text of thousands of messages is stored in
+    # two arrays instead of thousands of python strings
+    encoded = [text.encode("utf-8") for text in texts]
+    text_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in encoded], out=text_offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), text_offsets
+
+
+def _select_texts(text_data: np.ndarray, text_offsets: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # packed texts of the selected rows (boolean mask or indexes)
+    starts, lengths = text_offsets[:-1][rows], np.diff(text_offsets)[rows]
+    selected_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=selected_offsets[1:])
+    byte_indexes = np.arange(selected_offsets[-1]) + np.repeat(starts - selected_offsets[:-1], lengths)
+    return text_data[byte_indexes], selected_offsets
+
+
+def _concatenate_texts(chats: List) -> Tuple[np.ndarray, np.ndarray]:
+    # packed texts of every chat (or store) one after the other
+    text_offsets = [np.zeros(1, dtype=np.int64)]
+    for chat in chats: text_offsets.append(chat.text_offsets[1:] + text_offsets[-1][-1])
+    return _concatenate([chat.text_data for chat in chats], np.uint8), np.concatenate(text_offsets)
+
+
+def _parse_chat_to_arrays(path: str, chat_name: str, profile: bool = False) -> Tuple[Dict[str, np.ndarray], List[Dict]]:
+    # runs in a worker process. Only compact column arrays are sent back to the parent, not message dictionaries,
+    # together with the profiling spans recorded while parsing (see Profiling.take_events)
+    if profile:
+        Profiling.enable()
+        Profiling.clear() # the worker process starts with the events that were copied from the parent when it was forked
+    arrays = ChatColumns.parse_chat(path, chat_name).to_arrays()
+    return arrays, Profiling.take_events() if profile else []
+
+
+def _concatenate(parts: List[np.ndarray], dtype) -> np.ndarray:
+    if len(parts) == 0: return np.empty(0, dtype=dtype)
+    return np.concatenate(parts).astype(dtype, copy=False)
+
+
+class MessageStore():
+    """
+    Every message of an export held in NumPy columns.
+    Row i of every column describes the same message. Messages of a chat are ordered from oldest to most recent. They
+    are contiguous, except in stores built by MessageStore.merge_export, where new messages are appended at the end.
+
+    Columns:
+    timestamp_ms   -> int64 epoch timestamp in milliseconds
+    sender_id      -> int32 index into sender_names
+    chat_id        -> int32 index into chat_names
+    content_length -> int32 number of characters in the message (0 if the message has no text)
+    has_content    -> bool, False for messages without text (images, shares, calls ...)
+    type_code      -> int8 index into type_names
+    is_reaction    -> bool, True for the "Reacted ❤️ to your message" notifications
+    text_data      -> uint8, the repaired text of every message encoded as UTF-8 and concatenated (see MessageStore.text)
+    text_offsets   -> int64, the text of row i is text_data[text_offsets[i]:text_offsets[i + 1]]. It has one more value
+                      than the other columns.
+    is_owner       -> bool, True if the message was sent by the owner of the export
+
+    Text, sender names and chat titles are repaired once while the export is read (see Text_Normalization).
+    """
+
+    def __init__(self,
+                 path: str,
+                 name_of_owner: str,
+                 chat_names: List[str],
+                 sender_names: List[str],
+                 type_names: List[str],
+                 timestamp_ms: np.ndarray,
+                 sender_id: np.ndarray,
+                 chat_id: np.ndarray,
+                 content_length: np.ndarray,
+                 has_content: np.ndarray,
+                 type_code: np.ndarray,
+                 is_reaction: np.ndarray,
+                 text_data: np.ndarray,
+                 text_offsets: np.ndarray):
+        self.path = path
+        self.name_of_owner = name_of_owner
+        self.chat_names = chat_names
+        self.sender_names = sender_names
+        self.type_names = type_names
+
+        self.timestamp_ms = timestamp_ms
+        self.sender_id = sender_id
+        self.chat_id = chat_id
+        self.content_length = content_length
+        self.has_content = has_content
+        self.type_code = type_code
+        self.is_reaction = is_reaction
+        self.text_data = text_data
+        self.text_offsets = text_offsets
+
+        # set by MessageStore.load when the store is backed by the on-disk analysis cache:
+        self.cache: Optional[AnalysisCache] = None
+        self.fingerprint: Optional[str] = None
+        # maps chat names to the timestamp of their most recent message, see MessageStore.merge_export:
+        self.watermarks: Dict[str, int] = {}
+
+        owner_id = sender_names.index(name_of_owner) if name_of_owner in sender_names else -1
+        self.is_owner = sender_id == owner_id
+
+    def __len__(self):
+        return len(self.timestamp_ms)
+
+    @staticmethod
+    def from_chat_columns(path: str, name_of_owner: str, chats: List[ChatColumns]) -> "MessageStore":
+        """
+        Concatenates per-chat columns into a single store, interning sender and type names across chats
+        :param path: path to root folder
+        :param name_of_owner: name of the owner of the export (see InstagramDataRetreiver.get_name)
+        :param chats: list of parsed chats
+        :return: MessageStore
+        """
+        sender_ids: Dict[str, int] = {}
+        type_ids: Dict[str, int] = {}
+
+        sender_parts, type_parts, chat_parts = [], [], []
+        for chat_id, chat in enumerate(chats):
+            # translating chat-local ids to store-wide ids:
+            sender_part, type_part = _translate_ids(chat, sender_ids, type_ids)
+            sender_parts.append(sender_part)
+            type_parts.append(type_part)
+            chat_parts.append(np.full(len(chat), chat_id, dtype=np.int32))
+
+        store = MessageStore(path,
+                             name_of_owner,
+                             [chat.chat_name for chat in chats],
+                             list(sender_ids),
+                             list(type_ids),
+                             _concatenate([chat.timestamp_ms for chat in chats], np.int64),
+                             _concatenate(sender_parts, np.int32),
+                             _concatenate(chat_parts, np.int32),
+                             _concatenate([chat.content_length for chat in chats], np.int32),
+                             _concatenate([chat.has_content for chat in chats], bool),
+                             _concatenate(type_parts, np.int8),
+                             _concatenate([chat.is_reaction for chat in chats], bool),
+                             *_concatenate_texts(chats))
+        store.watermarks = {chat.chat_name: int(chat.timestamp_ms.max()) for chat in chats if len(chat)}
+        return store
+
+    @staticmethod
+    def parse_chats(path: str,
+                    chat_names: List[str],
+                    workers: int = None,
+                    chunksize: int = None,
+                    progress: ScanProgress = None) -> List[ChatColumns]:
+        """
+        Parses chats into columns. Chat folders are independent, so they are parsed across a process pool
+        when there are enough of them to be worth starting one.
+        :param path: path to root folder
+        :param chat_names: names of the chat folders to parse
+        :param workers: number of worker processes. 1 parses every chat in this process. Defaults to DEFAULT_INGEST_WORKERS
+        :param chunksize: number of chats sent to a worker at a time. Defaults to DEFAULT_INGEST_CHUNKSIZE
+        :param progress: advanced once per parsed chat. Cancelling it stops the parsing by raising ScanCancelled
+        :return: list of ChatColumns, in the same order as chat_names
+        """
+        if workers is None: workers = DEFAULT_INGEST_WORKERS
+        if chunksize is None: chunksize = DEFAULT_INGEST_CHUNKSIZE
+        if workers <= 1 or len(chat_names) < MIN_CHATS_FOR_PARALLEL_INGEST:
+            chats = []
+            for chat_name in chat_names:
+                chats.append(ChatColumns.parse_chat(path, chat_name))
+                if progress is not None: progress.advance()
+            return chats
+
+        # the biggest chats are sent first so that a single large chat doesn't keep one worker busy after the rest are done
+        order = sorted(range(len(chat_names)),
+                       key=lambda i: InstagramDataRetreiver.get_chat_size(path, chat_names[i]),
+                       reverse=True)
+        chats = [None] * len(chat_names)
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(chat_names)))
+        try:
+            parsed = executor.map(_parse_chat_to_arrays,
+                                  repeat(path),
+                                  [chat_names[i] for i in order],
+                                  repeat(Profiling.is_enabled()),
+                                  chunksize=chunksize)
+            for i, (arrays, events) in zip(order, parsed):
+                chats[i] = ChatColumns.from_arrays(chat_names[i], arrays)
+                Profiling.add_events(events)
+                if progress is not None: progress.advance()
+        except ScanCancelled:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        return chats
+
+    @staticmethod
+    def load(path: str,
+             use_cache: bool = True,
+             workers: int = None,
+             chunksize: int = None,
+             progress: ScanProgress = None) -> "MessageStore":
+        """
+        Parses every chat in the export into a new MessageStore
+        :param path: path to root folder
+        :param use_cache: if True, chats whose files haven't changed since the last run are read from the on-disk
+        analysis cache (see Disk_Cache.AnalysisCache) instead of being parsed again
+        :param workers: number of processes used to parse chats (see MessageStore.parse_chats)
+        :param chunksize: number of chats sent to a worker process at a time (see MessageStore.parse_chats)
+        :param progress: advanced once per chat (whether it was parsed or read from the cache). Cancelling it stops
+        the load by raising ScanCancelled
+        :return: MessageStore
+        """
+        name_of_owner = InstagramDataRetreiver.get_name(path)
+        chat_names = InstagramDataRetreiver.list_chats(path)
+        if progress is not None: progress.start(len(chat_names), "Reading chats")
+        if not use_cache:
+            chats = MessageStore.parse_chats(path, chat_names, workers, chunksize, progress)
+            return MessageStore.from_chat_columns(path, name_of_owner, chats)
+
+        cache = AnalysisCache(path)
+        chats, fingerprints, chats_to_parse = [], [name_of_owner], []
+        for chat_name in chat_names:
+            fingerprint = cache.chat_fingerprint(chat_name)
+            arrays = cache.load_chat_columns(chat_name, fingerprint)
+            if arrays is not None:
+                chats.append(ChatColumns.from_arrays(chat_name, arrays))
+                if progress is not None: progress.advance()
+            else:
+                chats.append(None)
+                chats_to_parse.append((len(chats) - 1, chat_name, fingerprint))
+            fingerprints.append(chat_name + fingerprint)
+
+        parsed = MessageStore.parse_chats(path, [chat_name for i, chat_name, fingerprint in chats_to_parse], workers, chunksize, progress)
+        for (i, chat_name, fingerprint), chat in zip(chats_to_parse, parsed):
+            chats[i] = chat
+            cache.save_chat_columns(chat_name, fingerprint, chat.to_arrays())
+        cache.save_manifest()
+
+        store = MessageStore.from_chat_columns(path, name_of_owner, chats)
+        store.cache = cache
+        store.fingerprint = combine_fingerprints(fingerprints)
+        return store
+
+    @staticmethod
+    def get(path: str, progress: ScanProgress = None) -> "MessageStore":
+        """
+        Returns the MessageStore for an export, loading it the first time it is requested.
+        :param path: path to root folder
+        :param progress: progress of the load, if the store has to be loaded (see MessageStore.load)
+        :return: MessageStore
+        """
+        if path not in memo_message_store:
+            with Profiling.span("load message store") as load_span:
+                memo_message_store[path] = MessageStore.load(path, progress=progress)
+                load_span.add(messages=len(memo_message_store[path]), chats=len(memo_message_store[path].chat_names))
+        return memo_message_store[path]
+
+    @staticmethod
+    def merge_export(previous: "MessageStore", path: str, progress: ScanProgress = None) -> Tuple["MessageStore", Optional[int]]:
+        """
+        Builds the store of a newer export of the same account by reusing a store that was already loaded. For every
+        chat, only the messages sent after its watermark (minus DEDUP_WINDOW_MS) are parsed, and only the parts of the
+        chat that hold them are read. The merged columns of every chat are saved to the analysis cache of the new
+        export, so that loading it later is also fast.
+
+        Chats that are missing from the newer export can't be removed from the appended columns, so if any chat
+        disappeared (or the previous store isn't backed by the analysis cache) the new export is loaded with
+        MessageStore.load instead.
+        :param previous: store of an older export
+        :param path: path to root folder of the newer export
+        :param progress: advanced once per chat. Cancelling it stops the merge by raising ScanCancelled
+        :return: (merged store, index of the first appended row). The rows before that index are the rows of 'previous'
+        in the same order. The index is None if the store was loaded from scratch instead.
+        """
+        chat_names = InstagramDataRetreiver.list_chats(path)
+        if previous.cache is None or not set(previous.chat_names) <= set(chat_names):
+            return MessageStore.load(path, progress=progress), None
+
+        name_of_owner = InstagramDataRetreiver.get_name(path)
+        if progress is not None: progress.start(len(chat_names), "Merging chats")
+        cache = AnalysisCache(path)
+        chat_ids = {chat_name: chat_id for chat_id, chat_name in enumerate(previous.chat_names)}
+        sender_ids = {name: i for i, name in enumerate(previous.sender_names)}
+        type_ids = {name: i for i, name in enumerate(previous.type_names)}
+        merged_chat_names = list(previous.chat_names)
+        watermarks = dict(previous.watermarks)
+
+        fingerprints, new_chats, new_chat_ids = [name_of_owner], [], []
+        for chat_name in chat_names:
+            fingerprint = cache.chat_fingerprint(chat_name)
+            fingerprints.append(chat_name + fingerprint)
+            stored = previous.chat_columns(chat_name) if chat_name in chat_ids else None
+            if stored is None or len(stored) == 0:
+                new_messages = ChatColumns.parse_chat(path, chat_name)
+            else:
+                since_ms = watermarks[chat_name] - DEDUP_WINDOW_MS
+                new_messages = ChatColumns.parse_new_messages(path, chat_name, since_ms).without_stored(stored, since_ms)
+
+            if len(new_messages) == 0 and stored is not None:
+                cache.copy_chat_columns(previous.cache, chat_name, fingerprint)
+            else:
+                merged = new_messages if stored is None else ChatColumns.concatenate(stored, new_messages)
+                cache.save_chat_columns(chat_name, fingerprint, merged.to_arrays())
+            if len(new_messages) > 0:
+                if chat_name not in chat_ids:
+                    chat_ids[chat_name] = len(merged_chat_names)
+                    merged_chat_names.append(chat_name)
+                watermarks[chat_name] = max(watermarks.get(chat_name, 0), int(new_messages.timestamp_ms.max()))
+                new_chats.append(new_messages)
+                new_chat_ids.append(chat_ids[chat_name])
+            if progress is not None: progress.advance()
+        cache.save_manifest()
+
+        sender_parts, type_parts = zip(*[_translate_ids(chat, sender_ids, type_ids) for chat in new_chats]) if new_chats else ((), ())
+        store = MessageStore(path,
+                             name_of_owner,
+                             merged_chat_names,
+                             list(sender_ids),
+                             list(type_ids),
+                             _concatenate([previous.timestamp_ms] + [chat.timestamp_ms for chat in new_chats], np.int64),
+                             _concatenate([previous.sender_id, *sender_parts], np.int32),
+                             _concatenate([previous.chat_id] + [np.full(len(chat), chat_id, dtype=np.int32) for chat, chat_id in zip(new_chats, new_chat_ids)], np.int32),
+                             _concatenate([previous.content_length] + [chat.content_length for chat in new_chats], np.int32),
+                             _concatenate([previous.has_content] + [chat.has_content for chat in new_chats], bool),
+                             _concatenate([previous.type_code, *type_parts], np.int8),
+                             _concatenate([previous.is_reaction] + [chat.is_reaction for chat in new_chats], bool),
+                             *_concatenate_texts([previous] + new_chats))
+        store.watermarks = watermarks
+        store.cache = cache
+        # the rows are ordered differently from a store loaded with MessageStore.load, so results computed from them
+        # (which may depend on the row order) must not be mixed up with results computed from a loaded store
+        store.fingerprint = "merged:" + combine_fingerprints(fingerprints)
+        return store, len(previous)
+
+    def chat_columns(self, chat_name: str) -> ChatColumns:
+        """
+        :param chat_name: name of the chat folder
+        :return: the messages of a chat, read from the analysis cache when possible
+        """
+        if self.cache is not None and chat_name in self.cache.chats:
+            arrays = self.cache.load_chat_columns(chat_name, self.cache.chats[chat_name])
+            if arrays is not None: return ChatColumns.from_arrays(chat_name, arrays)
+        rows = self.chat_mask(chat_name)
+        return ChatColumns(chat_name,
+                           self.timestamp_ms[rows],
+                           self.sender_id[rows],
+                           self.content_length[rows],
+                           self.has_content[rows],
+                           self.type_code[rows],
+                           self.is_reaction[rows],
+                           *_select_texts(self.text_data, self.text_offsets, rows),
+                           self.sender_names,
+                           self.type_names)
+
+    def text(self, row: int) -> str:
+        """
+        :param row: row of a message
+        :return: repaired text of the message ("" if it has no text)
+        """
+        return self.text_data[self.text_offsets[row]:self.text_offsets[row + 1]].tobytes().decode("utf-8")
+
+    def texts(self, rows: np.ndarray) -> List[str]:
+        """
+        :param rows: boolean mask or indexes of messages
+        :return: repaired text of every selected message
+        """
+        data = memoryview(self.text_data)
+        return [data[start:end].tobytes().decode("utf-8") for start, end in zip(self.text_offsets[:-1][rows].tolist(), self.text_offsets[1:][rows].tolist())]
+
+    def chat_mask(self, chat_name: str) -> np.ndarray:
+        """
+        :param chat_name: name of the chat folder
+        :return: boolean mask selecting the messages of the given chat
+        """
+        return self.chat_id == self.chat_names.index(chat_name)
+
+    def message_lengths_by_sender(self, chat_name: str) -> Dict[str, List[List[int]]]:
+        """
+        Same output as InstagramDataAnalyzer.get_message_length_over_time, computed from the store
+        :param chat_name: name of the chat folder
+        :return: {"Name1": [ [length1, length2 ... lengthN], [timestamp1, timestamp2 ... timestampN] ], "Name2": ...}
+        """
+        selected = self.chat_mask(chat_name) & self.has_content
+        senders = {}
+        sender_ids = self.sender_id[selected]
+        lengths = self.content_length[selected]
+        timestamps = self.timestamp_ms[selected]
+        # senders are listed in the order of their first message, like the streaming version
+        distinct_senders, first_indexes = np.unique(sender_ids, return_index=True)
+        for sender_id in distinct_senders[np.argsort(first_indexes)].tolist():
+            of_sender = sender_ids == sender_id
+            senders[self.sender_names[sender_id]] = [lengths[of_sender].tolist(), timestamps[of_sender].tolist()]
+        return senders
@@ -0,0 +1,102 @@
+import numpy as np
+from datetime import datetime
+from typing import List, Sequence, Tuple
+
+
+def pack_names(names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encodes names as UTF-8 into one shared buffer
+    :param names: names to pack
+    :return: (name_data, name_offsets). Name i is name_data[name_offsets[i]:name_offsets[i + 1]]
+    """
+    encoded = [name.encode("utf-8") for name in names]
+    name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in encoded], out=name_offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), name_offsets
+
+
+class PickIndex():
+    """
+    Members of every point of a clickable graph (the followers gained in a month, the chats active on a day...), stored
+    as offsets so that clicking a point only formats the lines of the popup that are shown.
+
+    name_data, name_offsets -> every name packed with pack_names, shared by every point (and every PickIndex built on it)
+    member_starts           -> int64, the members of point i are member_names[member_starts[i]:member_starts[i + 1]]
+    member_names            -> int32 index into the name buffer of every member
+    member_timestamps_s     -> epoch timestamp in seconds of every member, or None if the members don't have one
+    """
+
+    def __init__(self, name_data: np.ndarray, name_offsets: np.ndarray, member_starts: np.ndarray, member_names: np.ndarray,
+                 member_timestamps_s: np.ndarray = None):
+        self.name_data = name_data
+        self.name_offsets = name_offsets
+        self.member_starts = np.asarray(member_starts, dtype=np.int64)
+        self.member_names = np.asarray(member_names, dtype=np.int32)
+        self.member_timestamps_s = member_timestamps_s
+
+    def __len__(self):
+        return len(self.member_starts) - 1
+
+    def count(self, point: int) -> int:
+        """
+        :param point: index of a plotted point
+        :return: number of members of the point
+        """
+        return int(self.member_starts[point + 1] - self.member_starts[point])
+
+    def lines(self, point: int, start: int, stop: int) -> List[str]:
+        """
+        :param point: index of a plotted point
+        :param start: first member to format
+        :param stop: member after the last one to format
+        :return: "name" (or "name\t\t\t\t[date added]" when the members have timestamps) for the members start:stop of
+        the point
+        """
+        first = self.member_starts[point]
+        rows = np.arange(first + max(start, 0), first + min(stop, self.count(point)))
+        data = memoryview(self.name_data)
+        name_ids = self.member_names[rows]
+        names = [data[begin:end].tobytes().decode("utf-8") for begin, end in zip(self.name_offsets[name_ids].tolist(), self.name_offsets[name_ids + 1].tolist())]
+        if self.member_timestamps_s is None: return names
+        return [f"{name}\t\t\t\t[{datetime.fromtimestamp(timestamp)}]" for name, timestamp in zip(names, self.member_timestamps_s[rows].tolist())]
+
+
+class PickedPoints():
+    """
+    The members of one or more points that were clicked together, as a single list of lines that can be shown one page
+    at a time (see popups.create_paged_popup). When several points were clicked, the members of every point come after
+    a header line.
+    """
+
+    def __init__(self, index: PickIndex, points: Sequence[int], headers: Sequence[str] = None):
+        """
+        :param index: PickIndex of the graph
+        :param points: indexes of the clicked points
+        :param headers: line shown before the members of every point, None to show the members only
+        """
+        self.index = index
+        self.points = list(points)
+        self.headers = None if headers is None else list(headers)
+        header_lines = 0 if headers is None else 1
+        self.section_starts = np.zeros(len(self.points) + 1, dtype=np.int64)
+        np.cumsum([index.count(point) + header_lines for point in self.points], out=self.section_starts[1:])
+
+    def __len__(self):
+        return int(self.section_starts[-1])
+
+    def lines(self, start: int, stop: int) -> List[str]:
+        """
+        :param start: first line to format
+        :param stop: line after the last one to format
+        :return: lines start:stop
+        """
+        lines = []
+        section = max(int(np.searchsorted(self.section_starts, start, side="right")) - 1, 0)
+        while section < len(self.points) and self.section_starts[section] < stop:
+            offset = int(self.section_starts[section])
+            if self.headers is not None:
+                if start <= offset: lines.append(self.headers[section])
+                offset += 1
+            lines += self.index.lines(self.points[section], start - offset, stop - offset)
+            section += 1
+        return lines
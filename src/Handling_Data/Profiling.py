@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import atexit
+import threading
+import multiprocessing
+from typing import Dict, List
+
+# Profiling is off by default. Setting the "profile_trace" environment variable to a file path turns it on and writes a
+# Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev) to that path when the program exits.
+# The GUI can also turn it on with enable().
+TRACE_PATH_FROM_ENVIRONMENT = os.environ.get("profile_trace", "")
+
+# span arguments that are added up by summary(). Other arguments (file names, intervals ...) only describe the span.
+COUNTERS = {"bytes_read", "messages", "chats"}
+
+_enabled = TRACE_PATH_FROM_ENVIRONMENT != ""
+_events: List[Dict] = []
+_lock = threading.Lock()
+
+
+class Span():
+    """
+    Times a named stage. Use it through span():
+        with span("decode json", file=file_name) as current:
+            ...
+            current.add(messages=len(messages))
+    Wall time and the CPU time of the current thread are recorded, together with the arguments and counters.
+    """
+    __slots__ = ("name", "args", "_start_ns", "_start_cpu_ns")
+
+    def __init__(self, name: str, args: Dict):
+        self.name = name
+        self.args = args
+
+    def add(self, **counters) -> None:
+        """
+        Adds to the counters of the span (for instance bytes_read or messages)
+        """
+        for counter, value in counters.items(): self.args[counter] = self.args.get(counter, 0) + value
+
+    def __enter__(self) -> "Span":
+        self._start_ns = time.perf_counter_ns()
+        self._start_cpu_ns = time.thread_time_ns()
+        return self
+
+    def __exit__(self, *exception) -> bool:
+        duration_ns = time.perf_counter_ns() - self._start_ns
+        cpu_ns = time.thread_time_ns() - self._start_cpu_ns
+        event = {"name": self.name,
+                 "ph": "X",
+                 "ts": self._start_ns / 1000,
+                 "dur": duration_ns / 1000,
+                 "tdur": cpu_ns / 1000,
+                 "pid": os.getpid(),
+                 "tid": threading.get_ident(),
+                 "args": self.args}
+        with _lock: _events.append(event)
+        return False
+
+
+class _DisabledSpan():
+    # returned by span() while profiling is off, so an instrumented stage only costs a function call and a bool check
+    __slots__ = ()
+
+    def add(self, **counters) -> None:
+        pass
+
+    def __enter__(self) -> "_DisabledSpan":
+        return self
+
+    def __exit__(self, *exception) -> bool:
+        return False
+
+
+_DISABLED_SPAN = _DisabledSpan()
+
+
+def span(name: str, **args):
+    """
+    :param name: name of the stage, spans with the same name are summed up by summary()
+    :param args: extra information saved with the span (shown by the trace viewer)
+    :return: context manager that times the stage while profiling is enabled
+    """
+    if not _enabled: return _DISABLED_SPAN
+    return Span(name, args)
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def clear() -> None:
+    with _lock: _events.clear()
+
+
+def take_events() -> List[Dict]:
+    """
+    Removes and returns every recorded span. Used to send the spans of worker processes back to the parent.
+    """
+    with _lock:
+        events = list(_events)
+        _events.clear()
+    return events
+
+
+def add_events(events: List[Dict]) -> None:
+    """
+    Adds spans recorded somewhere else, for instance in a worker process (see take_events)
+    """
+    with _lock: _events.extend(events)
+
+
+def summary() -> Dict[str, Dict[str, float]]:
+    """
+    :return: maps every span name to its number of calls, total wall time, total CPU time and summed COUNTERS.
+    {"read file": {"calls": 12, "wall_ms": 40.2, "cpu_ms": 38.9, "bytes_read": 48213311}, ...}
+    """
+    with _lock: events = list(_events)
+    totals = {}
+    for event in events:
+        total = totals.setdefault(event["name"], {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0})
+        total["calls"] += 1
+        total["wall_ms"] += event["dur"] / 1000
+        total["cpu_ms"] += event["tdur"] / 1000
+        for counter, value in event["args"].items():
+            if counter in COUNTERS: total[counter] = total.get(counter, 0) + value
+    return totals
+
+
+def export_chrome_trace(file_path: str) -> None:
+    """
+    Writes every recorded span as a Chrome trace-event JSON file
+    :param file_path: path of the file to write
+    """
+    with _lock: events = list(_events)
+    with open(file_path, "w") as trace_file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file, default=str)
+
+
+# worker processes send their spans to the parent instead of writing the file themselves
+if TRACE_PATH_FROM_ENVIRONMENT != "" and multiprocessing.parent_process() is None:
+    atexit.register(lambda: export_chrome_trace(TRACE_PATH_FROM_ENVIRONMENT))
@@ -0,0 +1,53 @@
+import threading
+
+
+class ScanCancelled(Exception):
+    """Raised inside a scan once ScanProgress.cancel has been called"""
+
+
+class ScanProgress():
+    """
+    Thread-safe progress counter for long scans (for instance loading every chat of an export).
+    The scan calls start() and advance(). Another thread (usually the GUI) reads fraction() and may call cancel(), which
+    makes the next call to advance() raise ScanCancelled so the scan stops cooperatively.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.done = 0
+        self.stage = ""
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    def start(self, total: int, stage: str = "") -> None:
+        """
+        :param total: number of steps in the scan
+        :param stage: short description of what is being scanned
+        """
+        with self._lock:
+            self.total = total
+            self.done = 0
+            self.stage = stage
+        self.check_cancelled()
+
+    def advance(self, steps: int = 1) -> None:
+        with self._lock: self.done += steps
+        self.check_cancelled()
+
+    def fraction(self) -> float:
+        """
+        :return: a number between 0 and 1
+        """
+        with self._lock:
+            if self.total == 0: return 0.0
+            return min(1.0, self.done / self.total)
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancelled.is_set(): raise ScanCancelled()
@@ -1,6 +1,10 @@
 import os
 import json
-from typing import List, Dict
+from typing import List, Dict, Iterator
+from src.Handling_Data.Chat_Catalog import ChatCatalog
+from src.Handling_Data.Export_Storage import get_storage
+from src.Handling_Data.Text_Normalization import normalize_message, repair_name
+from src.Handling_Data import Profiling
 
 class InstagramDataRetreiver():
 
@@ -8,14 +12,16 @@ class InstagramDataRetreiver():
     def get_json_for_certain_path(root_path: str, layers: List[str], file_name: str):
         """
         Exports the json values from a given path as dictionaries
-        :param root_path: path to root of the downloaded export
+        :param root_path: path to root of the downloaded export, or to the zip file of the export (see Export_Storage)
         :param layers: list of the directories you need to travel to in order to access file_name
         :param file_name: Name of file to open
         :return:
         """
-        path_to_ads = os.path.join(root_path, *layers, file_name)
-        with open(path_to_ads) as ad_file:
-            data = json.load(ad_file)
+        with Profiling.span("read file", file=file_name) as read_span:
+            raw = get_storage(root_path).read_bytes(*layers, file_name)
+            read_span.add(bytes_read=len(raw))
+        with Profiling.span("decode json", file=file_name):
+            data = json.loads(raw)
         return data
 
     @staticmethod
@@ -55,10 +61,9 @@ class InstagramDataRetreiver():
         """
         returns the name of the user as saved in the instagram export file.
         :param root_path: path to root file
-        :return: instagram name of user
+        :return: instagram name of user, repaired like the sender names of messages (see Text_Normalization)
         """
-        return InstagramDataRetreiver.get_personal_information(root_path)["string_map_data"]["Name"]["value" \
-                                                                                                     ""]
+        return repair_name(InstagramDataRetreiver.get_personal_information(root_path)["string_map_data"]["Name"]["value"])
     @staticmethod
     def get_marketing_list(path: str) -> List[Dict]:
         """
@@ -114,37 +119,102 @@ class InstagramDataRetreiver():
         :param root_path: path to export root
         :return: list of chat names
         """
-        return os.listdir(os.path.join(root_path, "your_instagram_activity", "messages", "inbox"))
+        return list(ChatCatalog.get(root_path).folders)
+    @staticmethod
+    def get_chat_folder(path: str, username: str) -> str:
+        """
+        :param path: root path
+        :param username: username of person you want to extract chats with. The folder name or the display title of the
+        chat also work (see ChatCatalog.find)
+        :return: name of the folder that stores the chat history with 'username'
+        """
+        username_folder = ChatCatalog.get(path).find(username)
+        if username_folder is not None: return username_folder
+
+        raise FileNotFoundError(f"Username '{username}' was not found.\nPlease not that Instagram sometimes exports the "
+                                f"name instead of the username, so make sure to try both. "
+                                f"At the moment, there is no chat history with '{username}'")
+
+    @staticmethod
+    def list_message_parts(path: str, username: str) -> List[str]:
+        """
+        Instagram splits long chat histories into message_1.json, message_2.json ... message_N.json
+        message_1.json holds the most recent messages and message_N.json holds the oldest ones.
+        :param path: root path
+        :param username: username of person you want to extract chats with
+        :return: file names of every part of the chat, sorted from message_1.json to message_N.json
+        """
+        return InstagramDataRetreiver._message_part_names(path, InstagramDataRetreiver.get_chat_folder(path, username))
+
+    @staticmethod
+    def _message_part_names(path: str, username_folder: str) -> List[str]:
+        parts = []
+        for file_name in get_storage(path).list_files("your_instagram_activity", "messages", "inbox", username_folder):
+            number = file_name[len("message_"):-len(".json")]
+            if file_name.startswith("message_") and file_name.endswith(".json") and number.isdigit():
+                parts.append((int(number), file_name))
+        return [file_name for number, file_name in sorted(parts)]
+
+    @staticmethod
+    def get_chat_size(path: str, username: str) -> int:
+        """
+        :param path: root path
+        :param username: username of person you want to extract chats with
+        :return: total size in bytes of every message_N.json part of the chat
+        """
+        username_folder = InstagramDataRetreiver.get_chat_folder(path, username)
+        storage = get_storage(path)
+        return sum(storage.stat("your_instagram_activity", "messages", "inbox", username_folder, file_name).size
+                   for file_name in InstagramDataRetreiver._message_part_names(path, username_folder))
+
+    @staticmethod
+    def iter_messages(path: str, username: str, newest_first: bool = False) -> Iterator[Dict]:
+        """
+        Lazily yields every message of a chat from oldest to most recent.
+        Only one message_N.json part is held in memory at a time.
+        :param path: root path
+        :param username: username of person you want to extract chats with
+        :param newest_first: if True, messages are yielded from most recent to oldest instead. Parts are only read
+        once the messages before them have been consumed, so stopping early skips the older parts entirely.
+        :return: generator of message dictionaries (see InstagramDataRetreiver.get_messages for the format). Their text
+        is repaired with Text_Normalization.normalize_message
+        """
+        username_folder = InstagramDataRetreiver.get_chat_folder(path, username)
+        # parts and the messages inside of them are ordered from most recent to oldest, so both are read in reverse
+        part_names = InstagramDataRetreiver._message_part_names(path, username_folder)
+        for file_name in (part_names if newest_first else reversed(part_names)):
+            messages = InstagramDataRetreiver.get_json_for_certain_path(path,
+                                                                       ["your_instagram_activity", "messages", "inbox", username_folder],
+                                                                       file_name
+                                                                       )["messages"]
+            yield from map(normalize_message, messages if newest_first else reversed(messages))
+            del messages
+
     @staticmethod
     def get_messages(path: str, username: str) -> List[Dict]:
         """
         :param path: root path
         :param username: username of person you want to extract chats with
-        :return: List of dictionaries. Each index is a separate message stored as a dictionary.
+        :return: List of dictionaries, ordered from most recent to oldest. Each index is a separate message stored as a dictionary.
+        Every message_N.json part of the chat is included.
         Each entry in the list has the following format:
         {'sender_name': 'Emre Cenk',
          'timestamp_ms': 1641678929234,
          'content': "message content",
          'type': 'Generic',
-         'is_unsent': False}
-
+         'is_unsent': False,
+         'is_reaction': False}
+        The text of every message is repaired with Text_Normalization.normalize_message, and messages with content get
+        an 'is_reaction' flag.
         """
-        username_folder = None
-        for folder_name in InstagramDataRetreiver.list_chats(path):
-
-            if len(folder_name) < len(username): continue
-            if folder_name[:len(username)] == username:
-                username_folder = folder_name
-                break
-        if username_folder is None:
-            raise FileNotFoundError(f"Username '{username}' was not found.\nPlease not that Instagram sometimes exports the "
-                                    f"name instead of the username, so make sure to try both. "
-                                    f"At the moment, there is no chat history with '{username}'")
-
-        return InstagramDataRetreiver.get_json_for_certain_path(path,
-                                                               ["your_instagram_activity", "messages", "inbox", username_folder],
-                                                               "message_1.json"
-                                                               )["messages"]
+        username_folder = InstagramDataRetreiver.get_chat_folder(path, username)
+        messages = []
+        for file_name in InstagramDataRetreiver._message_part_names(path, username_folder):
+            messages += InstagramDataRetreiver.get_json_for_certain_path(path,
+                                                                        ["your_instagram_activity", "messages", "inbox", username_folder],
+                                                                        file_name
+                                                                        )["messages"]
+        return [normalize_message(message) for message in messages]
 
     @staticmethod
     def get_followers(path: str) -> List[Dict]:
@@ -0,0 +1,104 @@
+import numpy as np
+from typing import Tuple
+
+# largest exponent used by exponential_average. exp(600) is far from the float64 limit (about exp(709))
+MAX_EXPONENT = 600
+
+
+def dense_series(keys: np.ndarray, values: np.ndarray, first_key: int, last_key: int) -> np.ndarray:
+    """
+    Spreads a sparse series (for instance the output of Time_Bucketing.sum_by_key) over every key between first_key and
+    last_key, so that windows can be counted in rows
+    :param keys: sorted integer keys
+    :param values: value of every key
+    :param first_key: key of the first row
+    :param last_key: key of the last row
+    :return: array with a row for every key from first_key to last_key, 0 where the series has no value
+    """
+    dense = np.zeros(max(last_key - first_key + 1, 0), dtype=np.asarray(values).dtype)
+    in_range = (keys >= first_key) & (keys <= last_key)
+    dense[keys[in_range] - first_key] = values[in_range]
+    return dense
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    :param values: series with a row for every day (or any other step)
+    :param window: number of rows in the window
+    :return: sum of the window that ends at every row (the window is shorter for the first window - 1 rows),
+    computed as the difference of two cumulative sums
+    """
+    if window < 1: raise ValueError(f"window must be at least 1. {window} is not a valid window")
+    cumulative = np.concatenate(([0], np.cumsum(values)))
+    ends = np.arange(1, len(values) + 1)
+    return cumulative[ends] - cumulative[np.maximum(ends - window, 0)]
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    :param values: series with a row for every day (or any other step)
+    :param window: number of rows in the window
+    :return: mean of the window that ends at every row. The first window - 1 rows are averaged over the rows available
+    """
+    return rolling_sum(values, window) / np.minimum(np.arange(1, len(values) + 1), window)
+
+
+def rolling_distinct(rows: np.ndarray, ids: np.ndarray, number_of_rows: int, window: int) -> np.ndarray:
+    """
+    Counts distinct ids over a window, for instance the chats that were active during the last 7 days.
+
+    Each (row, id) pair covers the windows that end between its row and either the end of its window or the next pair
+    of the same id, whichever comes first. Those spans never overlap for the same id, so the count is a cumulative sum
+    of +1/-1 at the ends of the spans.
+    :param rows: row of every pair (for instance days since the first day)
+    :param ids: id of every pair (for instance chat ids). Repeated pairs are only counted once
+    :param number_of_rows: number of rows of the series
+    :param window: number of rows in the window
+    :return: number of distinct ids in the window that ends at every row
+    """
+    if window < 1: raise ValueError(f"window must be at least 1. {window} is not a valid window")
+    pairs = np.unique(np.stack([np.asarray(ids, dtype=np.int64), np.asarray(rows, dtype=np.int64)], axis=1), axis=0)
+    ids, rows = pairs[:, 0], pairs[:, 1]
+    next_rows = np.full(len(rows), np.iinfo(np.int64).max)
+    same_id = ids[1:] == ids[:-1]
+    next_rows[:-1][same_id] = rows[1:][same_id]
+    ends = np.minimum(np.minimum(rows + window, next_rows), number_of_rows)
+    changes = np.bincount(rows, minlength=number_of_rows + 1) - np.bincount(ends, minlength=number_of_rows + 1)
+    return np.cumsum(changes[:number_of_rows])
+
+
+def exponential_average(values: np.ndarray, span: int) -> np.ndarray:
+    """
+    Exponentially weighted moving average, with the same weights as pandas' ewm(span=span, adjust=False):
+    average[i] = alpha * values[i] + (1 - alpha) * average[i - 1], with alpha = 2 / (span + 1).
+
+    Unrolling the recurrence gives average[i] = (1 - alpha)^i * (values[0] + cumsum of alpha * values[k] / (1 - alpha)^k),
+    which is computed with cumulative sums over blocks short enough for (1 - alpha)^-k to fit in a float. Every block
+    starts from the last average of the block before it.
+    :param values: series with a row for every day (or any other step)
+    :param span: number of rows the average roughly spans (7 for a weekly trend...)
+    :return: average at every row
+    """
+    if span < 1: raise ValueError(f"span must be at least 1. {span} is not a valid span")
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0 or span == 1: return values.copy()
+    alpha = 2 / (span + 1)
+    decay = np.log1p(-alpha) # log(1 - alpha)
+    block = max(int(MAX_EXPONENT / -decay), 1)
+    averages = np.empty(len(values))
+    averages[0] = values[0]
+    for first in range(1, len(values), block):
+        chunk = values[first:first + block]
+        steps = np.arange(1, len(chunk) + 1)
+        averages[first:first + len(chunk)] = np.exp(decay * steps) * (averages[first - 1] + np.cumsum(alpha * chunk * np.exp(-decay * steps)))
+    return averages
+
+
+def daily_range(*day_keys: np.ndarray) -> Tuple[int, int]:
+    """
+    :param day_keys: arrays of day keys (see Time_Bucketing.bucket_keys with interval 2)
+    :return: (first day, last day) over every array, (0, -1) if they are all empty
+    """
+    non_empty = [keys for keys in day_keys if len(keys) > 0]
+    if len(non_empty) == 0: return 0, -1
+    return int(min(keys.min() for keys in non_empty)), int(max(keys.max() for keys in non_empty))
@@ -0,0 +1,58 @@
+import re
+import sys
+from typing import Dict
+
+memo_repaired_names = {} # dict used to memoize repair_name (maps the name as exported -> repaired and interned name)
+
+# "Reacted ❤️ to your message", "reacted 😂 to your message" ... once the text has been repaired
+REACTION_PATTERN = re.compile(r"reacted \S+ to your message", re.IGNORECASE)
+
+
+def repair_text(text: str) -> str:
+    """
+    Instagram writes UTF-8 bytes as if they were Latin-1 characters, so "café" is exported as "cafÃ©" and "❤️" as
+    "â\x9d¤ï¸\x8f". Encoding the text back to Latin-1 gives the original UTF-8 bytes.
+    :param text: text as exported
+    :return: repaired text. Text that isn't mojibake (it has characters outside of Latin-1, or its bytes aren't valid
+    UTF-8) is returned unchanged.
+    """
+    if text.isascii(): return text
+    try: return text.encode("latin-1").decode("utf-8")
+    except UnicodeError: return text
+
+
+def repair_name(name: str) -> str:
+    """
+    Same as repair_text, for strings that repeat a lot (sender names, chat titles). Every distinct name is only repaired
+    once, and the repaired names are interned so that comparing them is cheap.
+    """
+    repaired = memo_repaired_names.get(name)
+    if repaired is None:
+        repaired = sys.intern(repair_text(name))
+        memo_repaired_names[name] = repaired
+    return repaired
+
+
+def is_reaction(text: str) -> bool:
+    """
+    :param text: repaired text of a message
+    :return: True if the message is the notification Instagram sends when someone reacts to a message
+    """
+    return REACTION_PATTERN.fullmatch(text) is not None
+
+
+def normalize_message(message: Dict) -> Dict:
+    """
+    Repairs the text of a message dictionary in place (see InstagramDataRetreiver.get_messages for the format) and
+    adds an "is_reaction" flag to messages with text
+    :param message: message dictionary as exported
+    :return: the same dictionary
+    """
+    if "sender_name" in message: message["sender_name"] = repair_name(message["sender_name"])
+    if "content" in message:
+        message["content"] = repair_text(message["content"])
+        message["is_reaction"] = is_reaction(message["content"])
+    for reaction in message.get("reactions", ()):
+        if "reaction" in reaction: reaction["reaction"] = repair_name(reaction["reaction"])
+        if "actor" in reaction: reaction["actor"] = repair_name(reaction["actor"])
+    return message
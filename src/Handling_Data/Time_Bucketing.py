@@ -0,0 +1,143 @@
+import numpy as np
+from datetime import datetime, timezone
+from typing import List, Tuple
+from src.Handling_Data import utils
+from src.Handling_Data import Profiling
+
+# numpy datetime64 units for each interval value of utils.get_time_string
+INTERVAL_UNITS = ["Y", "M", "D", "h", "m"]
+
+
+def to_local_seconds(timestamps_ms: np.ndarray) -> np.ndarray:
+    """
+    Converts epoch timestamps to seconds in the local timezone (the same clock datetime.fromtimestamp uses).
+    The utc offset is only looked up once per distinct hour, since timezone changes happen on hour boundaries.
+    :param timestamps_ms: array of epoch timestamps in milliseconds
+    :return: int64 array of "local epoch" seconds, ready to be viewed as datetime64[s]
+    """
+    seconds = np.asarray(timestamps_ms, dtype=np.int64) // 1000
+    if len(seconds) == 0: return seconds
+    with Profiling.span("convert to local time", messages=len(seconds)):
+        hours, inverse = np.unique(seconds // 3600, return_inverse=True)
+        offsets = np.array([datetime.fromtimestamp(hour * 3600, timezone.utc).astimezone().utcoffset().total_seconds()
+                            for hour in hours.tolist()], dtype=np.int64)
+        return seconds + offsets[inverse.reshape(-1)]
+
+
+def bucket_keys(timestamps_ms: np.ndarray, interval: int = 2) -> np.ndarray:
+    """
+    Maps timestamps to integer bucket keys using datetime64 arithmetic
+    :param timestamps_ms: array of epoch timestamps in milliseconds
+    :param interval: an integer between 0 and 4 inclusive. See utils.get_time_string for the meaning of each value
+    :return: int64 array where each entry is the number of years/months/days/hours/minutes since 1970 (local time)
+    """
+    return bucket_keys_from_local_seconds(to_local_seconds(timestamps_ms), interval)
+
+
+def bucket_keys_from_local_seconds(local_seconds: np.ndarray, interval: int = 2) -> np.ndarray:
+    """
+    Same as bucket_keys, but takes the output of to_local_seconds so that the timezone lookup can be shared
+    """
+    utils.get_time_string(interval) # validates interval
+    with Profiling.span("bucket timestamps", interval=interval, messages=len(local_seconds)):
+        as_dates = local_seconds.astype("datetime64[s]")
+        return as_dates.astype(f"datetime64[{INTERVAL_UNITS[interval]}]").astype(np.int64)
+
+
+def keys_to_datetimes(keys: np.ndarray, interval: int = 2) -> List[datetime]:
+    """
+    Builds a datetime object (the start of the bucket) for each key. Call this on distinct keys only.
+    :param keys: keys returned by bucket_keys
+    :param interval: interval that was used to create the keys
+    :return: list of datetime objects
+    """
+    as_dates = np.asarray(keys, dtype=np.int64).astype(f"datetime64[{INTERVAL_UNITS[interval]}]")
+    return as_dates.astype("datetime64[s]").astype(datetime).tolist()
+
+
+def cycle_values(timestamps_ms: np.ndarray, time_specification: int) -> np.ndarray:
+    """
+    Gets the position of each timestamp inside a cycle
+    :param timestamps_ms: array of epoch timestamps in milliseconds
+    :param time_specification: Integer between 0 and 3
+    0 -> year (2018, 2019 ... 2022)
+    1 -> month (1, 2 ... 12)
+    2 -> day of week (0, 1, 2, 3 ... 6), monday is 0
+    3 -> hour of day (0, 1, ... 23)
+    :return: int64 array of the same length as timestamps_ms
+    """
+    if not(0 <= time_specification <= 3): raise ValueError(f"time_specification must be between 0 and 3. {time_specification} is not a valid value")
+    local = to_local_seconds(timestamps_ms)
+    return cycle_values_from_local_seconds(local, time_specification)
+
+
+def cycle_values_from_local_seconds(local_seconds: np.ndarray, time_specification: int) -> np.ndarray:
+    """
+    Same as cycle_values, but takes the output of to_local_seconds so that the timezone lookup can be shared
+    """
+    as_dates = local_seconds.astype("datetime64[s]")
+    if time_specification == 0: return as_dates.astype("datetime64[Y]").astype(np.int64) + 1970
+    if time_specification == 1: return as_dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    days = as_dates.astype("datetime64[D]").astype(np.int64)
+    if time_specification == 2: return (days + 3) % 7 # 1970-01-01 was a thursday
+    return (local_seconds - days * 86400) // 3600
+
+
+def sum_by_key(keys: np.ndarray, weights: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Groups values by key
+    :param keys: integer keys (for instance the output of bucket_keys)
+    :param weights: value of each entry. If None, every entry counts as 1
+    :return: (sorted distinct keys, sum of the weights for each key)
+    """
+    distinct, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    if weights is None: return distinct, np.bincount(inverse, minlength=len(distinct))
+    return distinct, np.bincount(inverse, weights=weights, minlength=len(distinct)).astype(np.int64)
+
+
+def to_local_second(date: datetime) -> int:
+    """
+    :param date: naive datetime in local time, like the ones returned by keys_to_datetimes
+    :return: the same moment as a "local epoch" second (see to_local_seconds)
+    """
+    return int(np.datetime64(date, "s").astype(np.int64))
+
+
+def key_starts(keys: np.ndarray, interval: int) -> np.ndarray:
+    """
+    :param keys: keys returned by bucket_keys
+    :param interval: interval that was used to create the keys
+    :return: first "local epoch" second (see to_local_seconds) of every bucket
+    """
+    return np.asarray(keys, dtype=np.int64).astype(f"datetime64[{INTERVAL_UNITS[interval]}]").astype("datetime64[s]").astype(np.int64)
+
+
+def key_bounds(interval: int, start: datetime = None, end: datetime = None) -> Tuple[int, int]:
+    """
+    :param interval: see utils.get_time_string
+    :param start: first moment of the range (local time), None to start at the first bucket
+    :param end: moment right after the range (local time), None to end after the last bucket
+    :return: (first key, key after the last one) of the buckets that start in [start, end), so that sorted keys can be
+    sliced with two binary searches. Missing bounds are the smallest and largest int64
+    """
+    first, stop = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+    if start is not None:
+        start_s = to_local_second(start)
+        first = int(bucket_keys_from_local_seconds(np.array([start_s], dtype=np.int64), interval)[0])
+        if key_starts(np.array([first]), interval)[0] < start_s: first += 1 # the bucket of 'start' starts before it
+    if end is not None: stop = int(bucket_keys_from_local_seconds(np.array([to_local_second(end) - 1], dtype=np.int64), interval)[0]) + 1
+    return first, stop
+
+
+def range_mask(keys: np.ndarray, interval: int, start: datetime = None, end: datetime = None) -> np.ndarray:
+    """
+    :param keys: keys returned by bucket_keys
+    :param interval: interval that was used to create the keys
+    :param start: first moment of the range (local time), None to start at the first bucket
+    :param end: moment right after the range (local time), None to end after the last bucket
+    :return: boolean mask selecting the buckets that start in [start, end)
+    """
+    first, stop = key_bounds(interval, start, end)
+    keys = np.asarray(keys, dtype=np.int64)
+    return (keys >= first) & (keys < stop)
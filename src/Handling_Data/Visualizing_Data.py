@@ -1,29 +1,37 @@
 import numpy as np
 from src.Handling_Data.Analyzing_Data import InstagramDataAnalyzer
-from src.GUI.popups import create_popup_message
+from src.GUI.popups import create_paged_popup
 import matplotlib.pyplot as plt
-from datetime import datetime
-from dateutil import parser
 from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
 from src.Handling_Data import utils
-from src.Handling_Data.Data_Viz_Utils import UtilsForDataViz
+from src.Handling_Data import Time_Bucketing
+from src.Handling_Data import Word_Counting
+from src.Handling_Data.Data_Viz_Utils import UtilsForDataViz, TREND_WINDOWS, TREND_STYLES
+from src.Handling_Data.Friendship_Rankings import ChatRankings, METRICS, top_chats
+from src.Handling_Data.Activity_Ranges import ActivityRanges
+from src.Handling_Data.Aggregation_Engine import MessageAggregates
+from src.Handling_Data.Activity_Pyramid import ActivityPyramid
+from src.Handling_Data.Pick_Index import PickIndex, PickedPoints, pack_names
+from datetime import datetime
 
 class InstagramDataVisualizer():
 
     @staticmethod
-    def visualize_logins(path: str) -> None:
+    def visualize_logins(path: str, start: datetime = None, end: datetime = None) -> None:
         """
         Visualizes number of logins over time
         :param path: path to root for user
+        :param start: only show the months from this date on (UTC). None to start at the first login
+        :param end: only show the months before this date (UTC). None to end at the last login
         :return: None
         """
-        counted = InstagramDataAnalyzer.count_year_and_months_for_login_activity(path)
+        counted = InstagramDataAnalyzer.count_year_and_months_for_login_activity(path, start, end)
         xs, ys = [], []
         for c in counted:
             xs.append(c)
             ys.append(counted[c])
 
-        xs.reverse()
+        xs.reverse() # months are ordered from most recent to oldest
         ys.reverse()
         plt.plot(xs, ys, label="login number")
         plt.xlabel("date (year-month)")
@@ -33,10 +41,32 @@ class InstagramDataVisualizer():
         plt.grid()
         plt.show()
 
+    @staticmethod
+    def visualize_logins_by_source(path: str, field: int = 0, how_many_to_display: int = 15, start: datetime = None, end: datetime = None) -> None:
+        """
+        Visualizes which IP addresses, user agents or languages were used to log in the most
+        :param path: path to root for user
+        :param field: see InstagramDataAnalyzer.count_logins_by (0 -> IP address, 1 -> user agent, 2 -> language)
+        :param how_many_to_display: number of values to graph
+        :param start: only count the logins from this date on (UTC). None to start at the first login
+        :param end: only count the logins before this date (UTC). None to end at the last login
+        :return: None
+        """
+        counted = InstagramDataAnalyzer.count_logins_by(path, field, start, end)[:how_many_to_display]
+        names = [value if len(value) <= 60 else value[:57] + "..." for value, count in counted]
+        fig, ax = plt.subplots()
+        ax.barh(names, [count for value, count in counted])
+        ax.invert_yaxis()
+        plt.xlabel("number of logins")
+        plt.title(f"Logins by {['IP address', 'user agent', 'language'][field]}\nNote: Currently displaying top {len(counted)} values. Tweak settings if you want to see more or less values graphed.")
+        plt.tight_layout()
+        plt.show()
+
     @staticmethod
     def visualize_message_length_over_time_in_chat(path: str,
                                                    chat_name: str,
-                                                   interval: int = 3) -> None:
+                                                   interval: int = 3,
+                                                   downsample: bool = True) -> None:
         """
         Visualizes message length over time for any given chat. Each user is plotted separately.
         :param path: path to root of download
@@ -49,29 +79,19 @@ class InstagramDataVisualizer():
         3 -> hourly interval
         4 -> Minute intervals (may misrepresent data since a long message will create extreme spikes)
         NOTE: Hourly intervals for chats that span a long period of time is not recommended.
+        :param downsample: if true, every line is downsampled to about the width of the plot in pixels, keeping its spikes
+        (see Downsampling.lttb_indexes). Set it to false to plot every point.
         :return: None
         """
-        time_string = UtilsForDataViz.get_time_string(interval)
-
-
         colors = ['red', 'blue', 'darkkhaki', 'green', 'orange', 'purple', 'brown', 'pink', 'teal', 'maroon', 'cyan', 'magenta', 'navy', 'lime', 'olive', 'lavender', 'mauve', 'umber', 'murk', 'black', 'gray']
-        to_plot = InstagramDataAnalyzer.get_message_length_over_time(path, chat_name)
+        to_plot = InstagramDataAnalyzer.get_message_pyramids_in_chat(path, chat_name)
+        pyramids, line_options = [], []
         for user_index, username in enumerate(to_plot):
-            days = {}
-            timestamps, messages = to_plot[username][1], to_plot[username][0]
-            for i in range(len(timestamps)):
-                timestamps[i] = datetime.fromtimestamp(int(timestamps[i])/1000)
-                cache = parser.parse(timestamps[i].strftime(time_string))
+            pyramids.append(to_plot[username][1]) # lengths of the messages
+            line_options.append({"label": username, "color": colors[user_index%len(colors)]})
 
-                if cache in days: days[cache] += messages[i]
-                else: days[cache] = messages[i]
-            x_axis, y_axis = [], []
-
-            for date in days:
-                x_axis.append(date)
-                y_axis.append(days[date])
-
-            plt.plot(x_axis, y_axis, label=username, color = colors[user_index%len(colors)])
+        #zooming in shows finer intervals (see UtilsForDataViz.plot_activity_pyramids)
+        UtilsForDataViz.plot_activity_pyramids(plt.gca(), pyramids, line_options, interval, downsample)
 
         plt.title(f"Message length over time with '{chat_name}'")
         plt.xlabel(UtilsForDataViz.get_x_axis_label(interval))
@@ -81,7 +101,7 @@ class InstagramDataVisualizer():
         plt.show()
 
     @staticmethod
-    def visualize_message_count_over_time(path: str, chat_name: str, interval: int) -> None:
+    def visualize_message_count_over_time(path: str, chat_name: str, interval: int, downsample: bool = True) -> None:
         """
         Vizualizes message count over time for a given chat.
         :param path: path to root
@@ -94,36 +114,23 @@ class InstagramDataVisualizer():
         2 -> daily intervals
         3 -> hourly interval
         4 -> Minute intervals (may misrepresent data since a long message will create extreme spikes)
+        :param downsample: if true, every line is downsampled to about the width of the plot in pixels, keeping its spikes
+        (see Downsampling.lttb_indexes). Set it to false to plot every point.
         :return: None
         """
 
         #todo: implement time strings to customize plot intervals on x axis
         colors = ['red', 'blue', 'darkkhaki', 'green', 'orange', 'purple', 'brown', 'pink', 'teal', 'maroon', 'cyan', 'magenta', 'navy', 'lime', 'olive', 'lavender', 'mauve', 'umber', 'murk', 'black', 'gray']
 
-        time_string = UtilsForDataViz.get_time_string(interval)
-
-
-        to_plot = InstagramDataAnalyzer.get_message_length_over_time(path, chat_name)
+        to_plot = InstagramDataAnalyzer.get_message_pyramids_in_chat(path, chat_name)
+        pyramids, line_options = [], []
         for user_index, username in enumerate(to_plot):
             #note: we need to keep track of the user_index because this function changes colors dynamically using the 'colors' list
-            days = {}
-            timestamps, messages = to_plot[username][1], to_plot[username][0]
-            for i in range(len(timestamps)):
-
-                #converting epoch timestamp to datetime object:
-                timestamps[i] = datetime.fromtimestamp(int(timestamps[i])/1000)
-                cache = parser.parse(timestamps[i].strftime(time_string))
-
+            pyramids.append(to_plot[username][0]) # number of messages
+            line_options.append({"label": username, "color": colors[user_index%len(colors)]})
 
-                if cache in days: days[cache] += 1
-                else: days[cache] = 1
-            x_axis, y_axis = [], []
-
-            for date in days:
-                x_axis.append(date)
-                y_axis.append(days[date])
-
-            plt.plot(x_axis, y_axis, label=username, color = colors[user_index%len(colors)])
+        #zooming in shows finer intervals (see UtilsForDataViz.plot_activity_pyramids)
+        UtilsForDataViz.plot_activity_pyramids(plt.gca(), pyramids, line_options, interval, downsample)
 
         plt.title(f"Number of messages over time with {chat_name}")
         plt.xlabel("date (year-month)")
@@ -144,16 +151,26 @@ class InstagramDataVisualizer():
         :return: None
         """
         words = InstagramDataAnalyzer.get_word_distribution(path, chat_name)
-        total = 0
-        a = {}
-        for word, v in sorted(words.items(), key=lambda item: item[1], reverse = True):
-            a[word] = v
-            total += v
-        UtilsForDataViz.pie_chart_for_word_frequency(a,
+        # pie_chart_for_word_frequency shows word_limit_in_pie + 1 words, only those have to be ordered
+        UtilsForDataViz.pie_chart_for_word_frequency(dict(Word_Counting.top_words(words, word_limit_in_pie + 1)),
                                                              word_limit_in_pie,
-                                                             total,
+                                                             sum(words.values()),
                                                              title = f"Word Usage in {chat_name}")
 
+    @staticmethod
+    def visualize_unique_words_in_every_chat(path: str, word_limit_in_pie: int = 10):
+        """
+        Vizualizes word count across every chat
+        :param path: path to root
+        :param word_limit_in_pie: number of top used words to go into pie (see InstagramDataVisualizer.visualize_unique_words)
+        :return: None
+        """
+        words = InstagramDataAnalyzer.get_word_distribution_in_every_chat(path)
+        UtilsForDataViz.pie_chart_for_word_frequency(dict(Word_Counting.top_words(words, word_limit_in_pie + 1)),
+                                                             word_limit_in_pie,
+                                                             sum(words.values()),
+                                                             title = "Word Usage in Every Chat")
+
 
     @staticmethod
     def visualize_mention_number_in_chat(path: str, chat_name: str):
@@ -164,18 +181,15 @@ class InstagramDataVisualizer():
         :return: None
         """
         words = InstagramDataAnalyzer.get_word_distribution(path, chat_name)
-        mentions = {}
-        for word in words:
-            if "@" == word[0]:
-                mentions[word] =  words[word]
-        sorted_mentions = {k: v for k, v in sorted(mentions.items(), key=lambda item: item[1], reverse = True)}
+        mentions = dict(Word_Counting.mentions(words))
+        sorted_mentions = dict(Word_Counting.top_words(mentions, len(mentions)))
 
         UtilsForDataViz.pie_chart_for_word_frequency(sorted_mentions,
                                                              len(sorted_mentions),
                                                              title = f"Number of mentions with {chat_name}")
 
     @staticmethod
-    def visualize_follower_gain_over_time(path: str, interval: int = 1):
+    def visualize_follower_gain_over_time(path: str, interval: int = 1, start: datetime = None, end: datetime = None):
         """
         Visualizes follower gain over time
         :param path: path to root
@@ -187,16 +201,20 @@ class InstagramDataVisualizer():
         2 -> daily intervals
         3 -> hourly interval
         4 -> Minute intervals (may misrepresent data since a long message will create extreme spikes)
+        :param start: only show the dates from this date on (local time). None to start at the first account
+        :param end: only show the dates before this date (local time). None to end at the last account
         :return: None
         """
         UtilsForDataViz.visualize_gains(
             path,
             InstagramDataRetreiver.get_followers,
             interval,
-            "follower"
+            "follower",
+            start,
+            end
         )
     @staticmethod
-    def visualize_following_gain_over_time(path: str, interval: int = 1):
+    def visualize_following_gain_over_time(path: str, interval: int = 1, start: datetime = None, end: datetime = None):
         """
         Visualizes follower gain over time
         :param path: path to root
@@ -208,19 +226,27 @@ class InstagramDataVisualizer():
         2 -> daily intervals
         3 -> hourly interval
         4 -> Minute intervals (may misrepresent data since a long message will create extreme spikes)
+        :param start: only show the dates from this date on (local time). None to start at the first account
+        :param end: only show the dates before this date (local time). None to end at the last account
         :return: None
         """
         UtilsForDataViz.visualize_gains(
             path,
             InstagramDataRetreiver.get_following,
             interval,
-            "Following"
+            "Following",
+            start,
+            end
         )
     @staticmethod
     def visualize_total_messages_sent_and_received_over_time_counting_every_chat(path: str,
                                                                                  interval: int = 1,
                                                                                  plot_sent: bool = True,
-                                                                                 plot_received: bool = True):
+                                                                                 plot_received: bool = True,
+                                                                                 downsample: bool = True,
+                                                                                 start: datetime = None,
+                                                                                 end: datetime = None,
+                                                                                 trends: bool = False):
         """
         The
         Visualizes the number of messages sent and received per day over time.
@@ -233,27 +259,34 @@ class InstagramDataVisualizer():
         4 -> Minute intervals (may misrepresent data since a long message will create extreme spikes)
         :param plot_sent: if true, the number of messages sent is plotted.
         :param plot_received: if true, the number of messages received is plotted.
+        :param downsample: if true, every line is downsampled to about the width of the plot in pixels, keeping its spikes
+        (see Downsampling.lttb_indexes). Set it to false to plot every point.
+        :param start: only show the activity from this date on (local time). None to start at the beginning
+        :param end: only show the activity before this date (local time). None to show everything after 'start'
+        :param trends: if true, the average number of messages per day over the last 7 and 30 days is overlaid
         :return: None
         """
         name_of_owner = InstagramDataRetreiver.get_name(path)
-        received, sent = InstagramDataAnalyzer.count_number_of_messages_per_day(path, interval)
-        sorted_received = sorted(received, key = lambda x: x)
-        sorted_sent = sorted(sent, key = lambda x: x)
-
-        yreceived = np.zeros((len(received), 1))
-        ysent = np.zeros((len(sent), 1))
-
-        if plot_received:
-            for i in range(len(sorted_received)):
-                yreceived[i] = received[sorted_received[i]]
-
+        received, sent = ActivityPyramid.messages(path)
+        pyramids, line_options = [], []
         if plot_sent:
-            for i in range(len(sorted_sent)):
-                ysent[i] = sent[sorted_sent[i]]
-
-
-        plt.plot(sorted_sent, ysent, label=f"number of messages sent by {name_of_owner}")
-        plt.plot(sorted_received, yreceived, label=f"number of messages received by {name_of_owner}")
+            pyramids.append(sent)
+            line_options.append({"label": f"number of messages sent by {name_of_owner}"})
+        if plot_received:
+            pyramids.append(received)
+            line_options.append({"label": f"number of messages received by {name_of_owner}"})
+
+        #zooming in shows finer intervals (see UtilsForDataViz.plot_activity_pyramids)
+        UtilsForDataViz.plot_activity_pyramids(plt.gca(), pyramids, line_options, interval, downsample, start, end)
+        ax = plt.gca()
+        if trends:
+            trend_lines = []
+            for window, style in zip(TREND_WINDOWS, TREND_STYLES):
+                days, received_trend, sent_trend = InstagramDataAnalyzer.count_messages_per_day_over_window(path, window)
+                if plot_sent: trend_lines.append((f"messages sent per day ({window}-day average)", days, sent_trend, style))
+                if plot_received: trend_lines.append((f"messages received per day ({window}-day average)", days, received_trend, style))
+            UtilsForDataViz.plot_trends(ax, interval, trend_lines, "messages per day", start, end)
+            plt.sca(ax) #twinx makes the trend axis the current one
 
         plt.title(f"Number of Messages Received and Sent in Total (counting every chat)")
         plt.xlabel(UtilsForDataViz.get_x_axis_label(interval))
@@ -264,7 +297,10 @@ class InstagramDataVisualizer():
 
     @staticmethod
     def visualize_active_chats(path: str,
-                               interval: int = 1
+                               interval: int = 1,
+                               start: datetime = None,
+                               end: datetime = None,
+                               trends: bool = False
                                ):
 
         """
@@ -281,54 +317,51 @@ class InstagramDataVisualizer():
         2 -> daily intervals
         3 -> hourly interval
         4 -> Minute intervals (may misrepresent data since a long message will create extreme spikes)
+        :param start: only show the activity from this date on (local time). None to start at the beginning
+        :param end: only show the activity before this date (local time). None to show everything after 'start'
+        :param trends: if true, the number of chats that were active during the last 7 and 30 days is overlaid
         :return: None
         """
         time_string = utils.get_time_string(interval) #required to properly put titles in the annotations
-        categorized_by_date = InstagramDataAnalyzer.count_number_of_active_dms(path, interval)
-        sorted_dates = sorted(categorized_by_date)
+        aggregates = MessageAggregates.get(path)
+        bucket_keys, chat_ids = InstagramDataAnalyzer.get_active_chats_per_bucket(path, interval, start, end)
 
+        #active_chats is sorted by bucket, so the chats of every date are a contiguous range:
+        distinct_keys = np.unique(bucket_keys)
+        starts = np.append(np.searchsorted(bucket_keys, distinct_keys), len(bucket_keys))
+        dates = Time_Bucketing.keys_to_datetimes(distinct_keys, interval)
+        name_data, name_offsets = pack_names([utils.fix_username(name) for name in aggregates.store.chat_names])
+        pick_index = PickIndex(name_data, name_offsets, starts, chat_ids)
 
         #plotting data:
-        xs, ys = [], []
-        names = []
         fig, ax = plt.subplots()
-
-        for date in sorted_dates:
-            xs.append(date)
-            ys.append(len(categorized_by_date[date]))
-            names.append("")
-            for person in categorized_by_date[date]:
-                names[-1] += person + "\n"
-
-        ax.plot_date(xs, ys, picker=5)
-        plt.plot(xs, ys)
-
-
+        ax.plot_date(dates, np.diff(starts), picker=5)
+        plt.plot(dates, np.diff(starts))
+        if trends:
+            trend_lines = []
+            for window, style in zip(TREND_WINDOWS, TREND_STYLES):
+                days, active = InstagramDataAnalyzer.count_active_dms_over_window(path, window)
+                trend_lines.append((f"chats active in the last {window} days", days, active, style))
+            UtilsForDataViz.plot_trends(ax, interval, trend_lines, "active chats in the window", start, end)
+            plt.sca(ax) #twinx makes the trend axis the current one
 
         # the following is taken from InstagramDataVisualizer.visualize_follower_gain_over_time
         # (with a few adjustments)
         def on_pick(event):
-            line = event.artist
-            xdata, ydata = line.get_data()
-            ind = event.ind
-            how_many = ydata[ind]
-            dates = xdata[ind]
-
-            for i in range(len(how_many)):
-                current_follower_num = how_many[i]
-                current_followers = ""
-                for person in categorized_by_date[dates[i]]:
-                    current_followers += f"{utils.fix_username(person)}\n"
-
-                popup_title = f"{current_follower_num} chat"
-                if current_follower_num > 1: popup_title += "s"
-                popup_title += f" active in the {['year', 'month', 'day', 'hour', 'minute'][interval]} of {dates[i].strftime(time_string)}:"
-
-                create_popup_message(
-                    message = current_followers,
-                    title_in_popup = popup_title,
-                    window_title = f"Chats That Were Active in the {['year', 'month', 'day', 'hour', 'minute'][interval]} of {dates[i].strftime(time_string)}")
-                break #todo: implement threads to create multiple windows when data points coincide
+            # points that coincide on screen are picked together and shown in the same popup
+            points = event.ind.tolist()
+            titles = []
+            for point in points:
+                current_chat_num = pick_index.count(point)
+                popup_title = f"{current_chat_num} chat"
+                if current_chat_num > 1: popup_title += "s"
+                popup_title += f" active in the {['year', 'month', 'day', 'hour', 'minute'][interval]} of {dates[point].strftime(time_string)}:"
+                titles.append(popup_title)
+
+            create_paged_popup(
+                lines = PickedPoints(pick_index, points, titles if len(points) > 1 else None),
+                title_in_popup = titles[0] if len(points) == 1 else f"{len(points)} dates:",
+                window_title = f"Chats That Were Active in the {['year', 'month', 'day', 'hour', 'minute'][interval]} of {dates[points[0]].strftime(time_string)}")
 
         fig.canvas.mpl_connect('pick_event', on_pick)
 
@@ -341,14 +374,18 @@ class InstagramDataVisualizer():
 
 
     @staticmethod
-    def visualize_most_active_year(path: str, bar_graph: bool = True):
+    def visualize_most_active_year(path: str, bar_graph: bool = True, start: datetime = None, end: datetime = None):
         """
         Creates a bar graph to visualize most active day for messages
         :param path: path to root
         :param bar_graph: True gives a bar graph, False gives a pie chart
+        :param start: only show the activity from this date on (local time). None to start at the beginning
+        :param end: only show the activity before this date (local time). None to show everything after 'start'
         :return: None
         """
         UtilsForDataViz.visualize_message_activity_in_cycle(path,
+                                                                    start = start,
+                                                                    end = end,
                                                                     graph_type = bar_graph,
                                                                     titles = ["Characters SENT in Each Year",
                                                                     "Number of SENT Message in Each Year",
@@ -361,14 +398,18 @@ class InstagramDataVisualizer():
                                                                     )
 
     @staticmethod
-    def visualize_most_active_month(path: str, bar_graph: bool = True):
+    def visualize_most_active_month(path: str, bar_graph: bool = True, start: datetime = None, end: datetime = None):
         """
         Creates a bar graph to visualize most active day for messages
         :param path: path to root
         :param bar_graph: True gives a bar graph, False gives a pie chart
+        :param start: only show the activity from this date on (local time). None to start at the beginning
+        :param end: only show the activity before this date (local time). None to show everything after 'start'
         :return: None
         """
         UtilsForDataViz.visualize_message_activity_in_cycle(path,
+                                                                    start = start,
+                                                                    end = end,
                                                                     graph_type = bar_graph,
                                                                     titles = ["Characters SENT For Each Month",
                                                                     "Number of SENT Message For Each Month",
@@ -379,14 +420,18 @@ class InstagramDataVisualizer():
                                                                     ylabels = ["Number of Characters", "Number of Messages"]*2,
                                                                     interval = 1)
     @staticmethod
-    def visualize_most_active_day(path: str, bar_graph: bool = True):
+    def visualize_most_active_day(path: str, bar_graph: bool = True, start: datetime = None, end: datetime = None):
         """
         Creates a bar graph to visualize most active day for messages
         :param path: path to root
         :param bar_graph: True gives a bar graph, False gives a pie chart
+        :param start: only show the activity from this date on (local time). None to start at the beginning
+        :param end: only show the activity before this date (local time). None to show everything after 'start'
         :return: None
         """
         UtilsForDataViz.visualize_message_activity_in_cycle(path,
+                                                                    start = start,
+                                                                    end = end,
                                                                     graph_type = bar_graph,
                                                                     titles = ["Characters SENT On Each Day of Week",
                                                                     "Number of SENT Message On Each Day of Week",
@@ -399,14 +444,18 @@ class InstagramDataVisualizer():
                                                                     )
 
     @staticmethod
-    def visualize_most_active_hours(path: str, bar_graph: bool = True):
+    def visualize_most_active_hours(path: str, bar_graph: bool = True, start: datetime = None, end: datetime = None):
         """
         Creates a bar graph to visualize most active day for messages
         :param path: path to root
         :param bar_graph: True gives a bar graph, False gives a pie chart
+        :param start: only show the activity from this date on (local time). None to start at the beginning
+        :param end: only show the activity before this date (local time). None to show everything after 'start'
         :return: None
         """
         UtilsForDataViz.visualize_message_activity_in_cycle(path,
+                                                                    start = start,
+                                                                    end = end,
                                                                     graph_type=bar_graph,
                                                                     titles=["Characters SENT On Each Hour Of Day",
                                                                             "Number of SENT Message On Each Hour Of Day",
@@ -420,14 +469,17 @@ class InstagramDataVisualizer():
                                                                     )
 
     @staticmethod
-    def visualize_friendship_ranking_histogram_by_number_of_messages_sent(path: str):
+    def visualize_friendship_ranking_histogram_by_number_of_messages_sent(path: str, start: datetime = None, end: datetime = None):
         """
         Creates a histogram by looking at how many messages each friend has sent
         :param path: path to root
+        :param start: only show the activity from this date on (local time). None to start at the beginning
+        :param end: only show the activity before this date (local time). None to show everything after 'start'
         :return:
         """
-        rankings, person_to_message_number = InstagramDataAnalyzer.friendship_rankings_by_messages_sent_to_user(path, method = 0)
-        data = [person_to_message_number[person] for person in person_to_message_number]
+        if start is None and end is None: messages_received = ChatRankings.get(path).metric("messages_received")
+        else: messages_received = ActivityRanges.get(path).per_chat("messages_received", start, end)
+        data = messages_received[messages_received > 0]
         plt.hist(data, bins = 10)
         plt.title("Distribution of how many messages were received for each chat")
         plt.ylabel("Number of chats")
@@ -435,20 +487,50 @@ class InstagramDataVisualizer():
         plt.show()
 
     @staticmethod
-    def friendship_rankings_by_total_length_of_messages_they_sent_you(path: str, how_many_to_display: int = 20):
-        sorted, mapped = InstagramDataAnalyzer.friendship_rankings_by_messages_sent_to_user(path, 1)
-        for i in range(10):
-            print(sorted[i], mapped[sorted[i]])
+    def friendship_rankings_by_total_length_of_messages_they_sent_you(path: str, how_many_to_display: int = 20, start: datetime = None, end: datetime = None):
+        if start is None and end is None: characters_received = ChatRankings.get(path).metric("characters_received")
+        else: characters_received = ActivityRanges.get(path).per_chat("characters_received", start, end)
+        top = top_chats(MessageAggregates.get(path).store.chat_names, characters_received, how_many_to_display)
+        for chat_name, total in top[:10]:
+            print(chat_name, total)
         fig, ax = plt.subplots()
-        how_many = min(len(sorted), how_many_to_display)
-        total_sent = [mapped[sorted[i]] for i in range(how_many)]
-        names = [str(i+1) + ") "+ utils.fix_username(sorted[i]) for i in range(how_many)]
+        how_many = len(top)
+        total_sent = [total for chat_name, total in top]
+        names = [str(i+1) + ") "+ utils.fix_username(top[i][0]) for i in range(how_many)]
         ax.barh(names, total_sent)
         ax.invert_yaxis()
         plt.yticks([i for i in range(how_many)])
         plt.xlabel("Number of characters sent")
         plt.ylabel("Name of Chat")
-        plt.title(f"Chats Ranked by How Many Characters They Have Sent You\nNote: Currently displaying top {how_many} chats out of {len(sorted)} people. Tweak settings if you want to see more or less people graphed.")
+        plt.title(f"Chats Ranked by How Many Characters They Have Sent You\nNote: Currently displaying top {how_many} chats out of {int(np.count_nonzero(characters_received))} people. Tweak settings if you want to see more or less people graphed.")
+        plt.show()
+
+    @staticmethod
+    def visualize_friendship_rankings(path: str, metric: int = 0, how_many_to_display: int = 20, start: datetime = None, end: datetime = None):
+        """
+        Ranks chats by one of the metrics of Friendship_Rankings.ChatRankings
+        :param path: path to root
+        :param metric: see InstagramDataAnalyzer.friendship_rankings
+        :param how_many_to_display: number of chats to graph
+        :param start: only show the activity from this date on (local time). None to start at the beginning
+        :param end: only show the activity before this date (local time). None to show everything after 'start'
+        :return:
+        """
+        top = InstagramDataAnalyzer.friendship_rankings(path, metric, how_many_to_display, start, end)
+        metric_name = METRICS[metric]
+        fig, ax = plt.subplots()
+        names = [str(i+1) + ") " + utils.fix_username(chat_name) for i, (chat_name, value) in enumerate(top)]
+        if metric_name == "last_contact_ms":
+            # the most recent contacts are drawn as the number of days since the last message
+            values = [(top[0][1] - value) / (24 * 60 * 60 * 1000) for chat_name, value in top] if top else []
+            plt.xlabel("Days before the most recent message")
+        else:
+            values = [value for chat_name, value in top]
+            plt.xlabel(metric_name.replace("_", " ").capitalize())
+        ax.barh(names, values)
+        ax.invert_yaxis()
+        plt.ylabel("Name of Chat")
+        plt.title(f"Chats Ranked by {metric_name.replace('_', ' ').capitalize()}\nNote: Currently displaying top {len(top)} chats. Tweak settings if you want to see more or less people graphed.")
         plt.show()
 
     @staticmethod
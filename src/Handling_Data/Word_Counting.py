@@ -0,0 +1,136 @@
+import re
+import sys
+import heapq
+import unicodedata
+import numpy as np
+from operator import itemgetter
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.Handling_Data.Progress import ScanProgress, ScanCancelled
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data.Message_Store import MessageStore, memo_message_store, MIN_CHATS_FOR_PARALLEL_INGEST
+from src.Handling_Data import Profiling
+
+_token_pattern: Optional[re.Pattern] = None # built by token_pattern the first time a text is tokenized
+
+
+def token_pattern() -> re.Pattern:
+    """
+    A token is a run of non-space characters that starts and ends with something other than punctuation, optionally
+    preceded by "@". Punctuation around a word is dropped ("(hello!)" -> "hello") but punctuation inside of it is kept
+    ("don't", "e-mail", "@emre.cenk99").
+    Punctuation is every unicode punctuation character except "@", which marks mentions. Characters outside of the first
+    two unicode planes are ignored. Finding them takes a scan over every code point, so the pattern is only built the
+    first time it is needed rather than when the module is imported.
+    :return: compiled pattern
+    """
+    global _token_pattern
+    if _token_pattern is None:
+        punctuation = re.escape("".join(character for character in map(chr, range(min(sys.maxunicode, 0x1FFFF) + 1))
+                                        if unicodedata.category(character).startswith("P") and character != "@"))
+        _token_pattern = re.compile(f"@?[^\\s{punctuation}](?:\\S*[^\\s{punctuation}])?")
+    return _token_pattern
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    :param text: text of a message
+    :return: lowercase words of the text, without the punctuation around them
+    """
+    return token_pattern().findall(text.lower())
+
+
+def count_words(texts: Iterable[str]) -> Counter:
+    """
+    :param texts: texts of messages
+    :return: Counter that maps words to how many times they were used
+    """
+    # tokens never contain whitespace, so the texts can be tokenized together
+    return Counter(tokenize("\n".join(texts)))
+
+
+def _count_words(texts: List[str]) -> Dict[str, int]:
+    # runs in a worker process
+    return dict(count_words(texts))
+
+
+def _counted_rows(store: MessageStore) -> np.ndarray:
+    # messages with text that aren't reactions (reacting to messages contaminates the word count)
+    return store.has_content & ~store.is_reaction
+
+
+def count_words_in_chat(path: str, chat_name: str) -> Counter:
+    """
+    :param path: path to root folder
+    :param chat_name: username, folder name or display title of the chat (see InstagramDataRetreiver.get_chat_folder)
+    :return: Counter that maps words to how many times they were used in the chat. Reactions are not counted.
+    """
+    chat_folder = InstagramDataRetreiver.get_chat_folder(path, chat_name)
+    with Profiling.span("count words", chat=chat_folder):
+        #if the whole export is already loaded (for instance by a batch report), the chat doesn't have to be read again
+        if path in memo_message_store:
+            store = memo_message_store[path]
+            return count_words(store.texts(store.chat_mask(chat_folder) & _counted_rows(store)))
+        return count_words(message["content"] for message in InstagramDataRetreiver.iter_messages(path, chat_folder)
+                           if "content" in message and not message["is_reaction"])
+
+
+def count_words_in_chats(path: str,
+                         chat_names: List[str],
+                         workers: int = 1,
+                         progress: ScanProgress = None) -> Counter:
+    """
+    Counts words across many chats, reading the text from the MessageStore. The chats are counted across a process pool
+    when workers is more than 1 and there are enough chats to be worth starting one.
+    :param path: path to root folder
+    :param chat_names: usernames, folder names or display titles of the chats to count
+    :param workers: number of worker processes
+    :param progress: advanced once per counted chat. Cancelling it stops the count by raising ScanCancelled
+    :return: Counter that maps words to how many times they were used in every chat combined
+    """
+    store = MessageStore.get(path)
+    if progress is not None: progress.start(len(chat_names), "Counting words")
+    # rows of every chat, found with a single sort instead of one mask per chat
+    chat_ids = np.array([store.chat_names.index(InstagramDataRetreiver.get_chat_folder(path, chat_name)) for chat_name in chat_names], dtype=np.int64)
+    rows = np.flatnonzero(_counted_rows(store) & np.isin(store.chat_id, chat_ids))
+    rows = rows[np.argsort(store.chat_id[rows], kind="stable")]
+    chat_starts = np.searchsorted(store.chat_id[rows], np.sort(chat_ids))
+    texts_by_chat = (store.texts(chat_rows) for chat_rows in np.split(rows, chat_starts[1:]))
+
+    counts = Counter()
+    if workers <= 1 or len(chat_names) < MIN_CHATS_FOR_PARALLEL_INGEST:
+        with Profiling.span("count words", chats=len(chat_names)):
+            for texts in texts_by_chat:
+                counts.update(count_words(texts))
+                if progress is not None: progress.advance()
+        return counts
+
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(chat_names)))
+    try:
+        for chat_counts in executor.map(_count_words, texts_by_chat):
+            counts.update(chat_counts)
+            if progress is not None: progress.advance()
+    except ScanCancelled:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    return counts
+
+
+def top_words(counts: Dict[str, int], k: int) -> List[Tuple[str, int]]:
+    """
+    :param counts: maps words to how many times they were used
+    :param k: number of words to return
+    :return: the k most used words and their counts, from most to least used. Only the top k are ordered, the rest of
+    the vocabulary is never sorted.
+    """
+    return heapq.nlargest(k, counts.items(), key=itemgetter(1))
+
+
+def mentions(counts: Dict[str, int]) -> Iterator[Tuple[str, int]]:
+    """
+    :param counts: maps words to how many times they were used
+    :return: (mention, count) pairs of the words that start with "@"
+    """
+    return ((word, count) for word, count in counts.items() if word.startswith("@"))
@@ -31,12 +31,13 @@ def get_time_string(interval: int = 3) -> str:
 def loop_through_every_message(path: str) -> (Dict, str):
     """
     Loops and yields every message that the user has sent and/or received
+    Messages are streamed chat by chat, from oldest to most recent.
     :param path: path to root folder
     :return:
     """
     chats = InstagramDataRetreiver.list_chats(path)
     for conversation_name in chats:
-        for message in InstagramDataRetreiver.get_messages(path, conversation_name):
+        for message in InstagramDataRetreiver.iter_messages(path, conversation_name):
             yield message, conversation_name
 
 def fix_username(username: str) -> str:
@@ -0,0 +1,41 @@
+"""
+Shared fixtures. Exports are generated with benchmarks.generate_export, so the tests run without a real export.
+
+Run the tests from the root of the repository with:
+    python -m pytest tests
+"""
+import pytest
+from typing import Dict, List, Tuple
+from benchmarks.generate_export import generate_export
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data import Message_Store
+
+
+@pytest.fixture(scope="session", autouse=True)
+def single_process():
+    # the exports are small, and starting worker processes would only make the tests slower
+    workers = Message_Store.DEFAULT_INGEST_WORKERS
+    Message_Store.DEFAULT_INGEST_WORKERS = 1
+    yield
+    Message_Store.DEFAULT_INGEST_WORKERS = workers
+
+
+@pytest.fixture(scope="session")
+def export_path(tmp_path_factory) -> str:
+    """
+    A small export with group chats and chats split into several message_N.json parts
+    """
+    path = str(tmp_path_factory.mktemp("exports") / "export")
+    generate_export(path, chats=20, messages_per_chat=150, group_chat_ratio=0.2, messages_per_part=100,
+                    followers=80, following=60, logins=100, seed=7)
+    return path
+
+
+@pytest.fixture(scope="session")
+def every_message(export_path) -> List[Tuple[Dict, str]]:
+    """
+    Every message of the export with the name of its chat, read straight from the json files like the analyzers used
+    to before the MessageStore (see utils.loop_through_every_message)
+    """
+    return [(message, chat_name) for chat_name in InstagramDataRetreiver.list_chats(export_path)
+            for message in InstagramDataRetreiver.get_messages(export_path, chat_name)]
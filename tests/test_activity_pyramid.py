@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from src.Handling_Data import Time_Bucketing
+from src.Handling_Data.Activity_Pyramid import ActivityPyramid
+
+
+@pytest.fixture(scope="module")
+def messages():
+    generator = np.random.default_rng(0)
+    return np.sort(generator.integers(1420070400, 1641772800, 5000)), generator.integers(1, 200, 5000)
+
+
+@pytest.mark.parametrize("interval", range(5))
+def test_every_level_matches_bucketing_the_messages(messages, interval):
+    local_seconds, lengths = messages
+    keys = Time_Bucketing.bucket_keys_from_local_seconds(local_seconds, interval)
+    counts, sums = ActivityPyramid(local_seconds), ActivityPyramid(local_seconds, lengths)
+    expected_keys, expected_counts = Time_Bucketing.sum_by_key(keys)
+    assert np.array_equal(counts.keys[interval], expected_keys) and np.array_equal(counts.sums[interval], expected_counts)
+    expected_keys, expected_sums = Time_Bucketing.sum_by_key(keys, lengths)
+    assert np.array_equal(sums.keys[interval], expected_keys) and np.array_equal(sums.sums[interval], expected_sums)
+    assert np.array_equal(np.diff(sums.prefix[interval]), sums.sums[interval])
+
+
+def test_visible_buckets_and_zoom_levels(messages):
+    local_seconds, lengths = messages
+    pyramid = ActivityPyramid(local_seconds)
+    start_s, end_s = 1500000000, 1500000000 + 40 * 86400
+    keys, sums = pyramid.visible(2, start_s, end_s)
+    starts = Time_Bucketing.key_starts(keys, 2)
+    # the buckets that overlap the range, plus one bucket on each side
+    inside = (starts < end_s) & (starts + 86400 > start_s)
+    assert inside[1:-1].all() and not inside[0] and not inside[-1]
+    assert sums.sum() == pyramid.sums[2][np.searchsorted(pyramid.keys[2], keys)].sum()
+
+    interval = pyramid.finest_interval(start_s, end_s, 100)
+    visible_keys = pyramid.visible(interval, start_s, end_s)[0]
+    assert len(visible_keys) <= 100 + 2
+    assert interval == 4 or len(pyramid.visible(interval + 1, start_s, end_s)[0]) > 100
+
+
+def test_empty_pyramid():
+    pyramid = ActivityPyramid(np.zeros(0, dtype=np.int64))
+    assert all(len(pyramid.keys[interval]) == 0 for interval in range(5))
+    assert len(pyramid.visible(2, 0, 86400)[0]) == 0
@@ -0,0 +1,139 @@
+"""
+The analyzers answer from the MessageStore, its aggregates and prefix sums. These tests compare them with the loops
+over every message that the analyzers used before (see the every_message fixture).
+"""
+import numpy as np
+import pytest
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from src.Handling_Data.Analyzing_Data import InstagramDataAnalyzer
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data.Word_Counting import tokenize
+
+TRUNCATE = [lambda date: date.replace(month=1, day=1, hour=0, minute=0, second=0),
+            lambda date: date.replace(day=1, hour=0, minute=0, second=0),
+            lambda date: date.replace(hour=0, minute=0, second=0),
+            lambda date: date.replace(minute=0, second=0),
+            lambda date: date.replace(second=0)]
+CYCLES = [lambda date: date.year, lambda date: date.month, datetime.weekday, lambda date: date.hour]
+
+
+def message_date(message) -> datetime:
+    return datetime.fromtimestamp(int(message["timestamp_ms"] / 1000))
+
+
+def in_range(date: datetime, start: datetime, end: datetime) -> bool:
+    return (start is None or date >= start) and (end is None or date < end)
+
+
+def random_ranges(seed: int, whole_hours: bool = False):
+    generator = np.random.default_rng(seed)
+    ranges = [(None, None), (None, datetime(2018, 3, 1)), (datetime(2019, 7, 15, 13), None)]
+    for i in range(15):
+        start, end = sorted(datetime(2014, 6, 1) + timedelta(seconds=int(seconds)) for seconds in generator.integers(0, 8 * 365 * 86400, 2))
+        if whole_hours: start, end = TRUNCATE[3](start), TRUNCATE[3](end)
+        ranges.append((start, end))
+    return ranges
+
+
+@pytest.fixture(scope="module")
+def name_of_owner(export_path):
+    return InstagramDataRetreiver.get_name(export_path)
+
+
+@pytest.mark.parametrize("interval", range(5))
+def test_messages_per_day(export_path, every_message, name_of_owner, interval):
+    for start, end in random_ranges(interval):
+        received, sent = defaultdict(int), defaultdict(int)
+        for message, chat_name in every_message:
+            bucket = TRUNCATE[interval](message_date(message))
+            if not in_range(bucket, start, end): continue
+            if message["sender_name"] == name_of_owner: sent[bucket] += 1
+            else: received[bucket] += 1
+        assert InstagramDataAnalyzer.count_number_of_messages_per_day(export_path, interval, start, end) == (received, sent)
+
+
+@pytest.mark.parametrize("interval", range(5))
+def test_active_dms(export_path, every_message, interval):
+    for start, end in random_ranges(interval + 10):
+        mapped = defaultdict(set)
+        for message, chat_name in every_message:
+            bucket = TRUNCATE[interval](message_date(message))
+            if in_range(bucket, start, end): mapped[bucket].add(chat_name)
+        assert InstagramDataAnalyzer.count_number_of_active_dms(export_path, interval, start, end) == mapped
+
+
+@pytest.mark.parametrize("time_specification", range(4))
+def test_count_msgs(export_path, every_message, name_of_owner, time_specification):
+    # ranges are rounded down to whole hours, so only whole hours are compared
+    for start, end in random_ranges(time_specification + 20, whole_hours=True):
+        sent_lengths, sent_counts, received_lengths, received_counts = defaultdict(int), defaultdict(int), defaultdict(int), defaultdict(int)
+        for message, chat_name in every_message:
+            if "content" not in message or not in_range(message_date(message), start, end): continue
+            position = CYCLES[time_specification](message_date(message))
+            if message["sender_name"] == name_of_owner:
+                sent_lengths[position] += len(message["content"])
+                sent_counts[position] += 1
+            else:
+                received_lengths[position] += len(message["content"])
+                received_counts[position] += 1
+        assert InstagramDataAnalyzer.count_msgs(export_path, time_specification, start, end) == (sent_lengths, sent_counts, received_lengths, received_counts)
+
+
+@pytest.mark.parametrize("method", [0, 1])
+def test_friendship_rankings(export_path, every_message, name_of_owner, method):
+    for start, end in random_ranges(method + 30, whole_hours=True):
+        points = defaultdict(int)
+        for message, chat_name in every_message:
+            if message["sender_name"] == name_of_owner or not in_range(message_date(message), start, end): continue
+            if method == 0: points[chat_name] += 1
+            elif "content" in message: points[chat_name] += len(message["content"])
+        people, counted = InstagramDataAnalyzer.friendship_rankings_by_messages_sent_to_user(export_path, method, start, end)
+        assert {chat_name: count for chat_name, count in counted.items() if count > 0} == {chat_name: count for chat_name, count in points.items() if count > 0}
+        assert [counted[chat_name] for chat_name in people] == sorted((counted[chat_name] for chat_name in people), reverse=True)
+
+
+def test_activity_between(export_path, every_message, name_of_owner):
+    for start, end in random_ranges(40, whole_hours=True):
+        selected = [(message, chat_name) for message, chat_name in every_message if in_range(message_date(message), start, end)]
+        sent = [message for message, chat_name in selected if message["sender_name"] == name_of_owner]
+        received = [message for message, chat_name in selected if message["sender_name"] != name_of_owner]
+        assert InstagramDataAnalyzer.count_activity_between(export_path, start, end) == {
+            "messages_received": len(received),
+            "messages_sent": len(sent),
+            "characters_received": sum(len(message.get("content", "")) for message in received),
+            "characters_sent": sum(len(message.get("content", "")) for message in sent),
+            "active_chats": len({chat_name for message, chat_name in selected})}
+
+
+def test_word_distribution(export_path, every_message):
+    every_chat = Counter()
+    for chat_name in InstagramDataRetreiver.list_chats(export_path):
+        counts = Counter()
+        for message, message_chat in every_message:
+            if message_chat == chat_name and "content" in message and not message["is_reaction"]: counts.update(tokenize(message["content"]))
+        assert InstagramDataAnalyzer.get_word_distribution(export_path, chat_name) == counts
+        every_chat += counts
+    assert InstagramDataAnalyzer.get_word_distribution_in_every_chat(export_path) == every_chat
+
+
+def test_top_chats_of_every_metric(export_path):
+    for metric in range(9):
+        everything = InstagramDataAnalyzer.friendship_rankings(export_path, metric, None)
+        assert InstagramDataAnalyzer.friendship_rankings(export_path, metric, 5) == everything[:5]
+        assert [value for chat_name, value in everything] == sorted((value for chat_name, value in everything), reverse=True)
+
+
+def test_rolling_windows(export_path, every_message):
+    days, received, sent = InstagramDataAnalyzer.count_messages_per_day_over_window(export_path, 7)
+    daily_received, daily_sent = InstagramDataAnalyzer.count_number_of_messages_per_day(export_path, 2)
+    for i in range(0, len(days), 97):
+        window = [days[i] - timedelta(days=offset) for offset in range(min(i + 1, 7))]
+        assert received[i] == pytest.approx(sum(daily_received[day] for day in window) / len(window))
+        assert sent[i] == pytest.approx(sum(daily_sent[day] for day in window) / len(window))
+
+    days, active = InstagramDataAnalyzer.count_active_dms_over_window(export_path, 30)
+    chats_per_day = InstagramDataAnalyzer.count_number_of_active_dms(export_path, 2)
+    for i in range(0, len(days), 97):
+        window = [days[i] - timedelta(days=offset) for offset in range(30)]
+        assert active[i] == len(set().union(*(chats_per_day.get(day, set()) for day in window)))
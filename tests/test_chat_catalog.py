@@ -0,0 +1,47 @@
+import os
+import json
+import shutil
+import pytest
+from src.Handling_Data.Chat_Catalog import ChatCatalog, INBOX_LAYERS
+from src.Handling_Data.Text_Normalization import repair_name
+
+
+def full_titles(path):
+    titles = {}
+    for folder_name in sorted(os.listdir(os.path.join(path, *INBOX_LAYERS))):
+        with open(os.path.join(path, *INBOX_LAYERS, folder_name, "message_1.json")) as file:
+            titles[folder_name] = json.load(file)["title"]
+    return titles
+
+
+def test_titles_read_from_the_end_of_the_file(export_path, tmp_path):
+    titles = full_titles(export_path)
+    catalog = ChatCatalog(export_path, 0)
+    assert {folder_name: catalog._read_title(folder_name) for folder_name in titles} == titles
+
+    # the same titles are read from a zip of the export
+    zip_path = shutil.make_archive(str(tmp_path / "export"), "zip", export_path)
+    zip_catalog = ChatCatalog(zip_path, 0)
+    assert {folder_name: zip_catalog._read_title(folder_name) for folder_name in titles} == titles
+
+
+def test_titles_written_before_the_messages(export_path, tmp_path):
+    path = str(tmp_path / "export")
+    shutil.copytree(export_path, path)
+    folder_name = sorted(os.listdir(os.path.join(path, *INBOX_LAYERS)))[0]
+    part = os.path.join(path, *INBOX_LAYERS, folder_name, "message_1.json")
+    with open(part) as file: data = json.load(file)
+    # the title comes first, and the last "title" in the file belongs to a message
+    data = {"title": data["title"], "participants": data["participants"], "messages": data["messages"]}
+    data["messages"][-1]["title"] = "not the title"
+    with open(part, "w") as file: json.dump(data, file)
+    assert ChatCatalog(path, 0)._read_title(folder_name) == data["title"]
+
+
+def test_find_by_title(export_path):
+    catalog = ChatCatalog.get(export_path)
+    for folder_name, title in full_titles(export_path).items():
+        found = catalog.find(repair_name(title))
+        assert found is not None
+        with open(os.path.join(export_path, *INBOX_LAYERS, found, "message_1.json")) as file:
+            assert json.load(file)["title"] == title
@@ -0,0 +1,94 @@
+import os
+import json
+import shutil
+import numpy as np
+import pytest
+from benchmarks.generate_export import generate_export
+from src.Handling_Data.Disk_Cache import AnalysisCache, combine_fingerprints, get_cache_directory
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+from src.Handling_Data.Message_Store import MessageStore
+from src.Handling_Data.Aggregation_Engine import MessageAggregates
+
+INBOX = ("your_instagram_activity", "messages", "inbox")
+
+
+@pytest.fixture()
+def export(tmp_path):
+    path = str(tmp_path / "export")
+    generate_export(path, chats=5, messages_per_chat=60, messages_per_part=25, seed=11)
+    return path
+
+
+def fingerprints(path):
+    cache = AnalysisCache(path)
+    chat_fingerprints = {chat_name: cache.chat_fingerprint(chat_name) for chat_name in InstagramDataRetreiver.list_chats(path)}
+    cache.save_manifest()
+    return chat_fingerprints
+
+
+def test_cache_directory():
+    assert get_cache_directory("/exports/emre.cenk99_20220110") == os.path.normpath("/exports/emre.cenk99_20220110_analysis_cache")
+    assert get_cache_directory("/exports/emre.cenk99_20220110.zip") == get_cache_directory("/exports/emre.cenk99_20220110")
+
+
+def test_fingerprints_are_stable(export, tmp_path):
+    first = fingerprints(export)
+    assert len(set(first.values())) == len(first)
+    assert fingerprints(export) == first
+    # touching a file without changing it keeps its fingerprint, and so does moving the export
+    part = os.path.join(export, *INBOX, sorted(first)[0], "message_1.json")
+    os.utime(part, ns=(1, 1))
+    assert fingerprints(export) == first
+    moved = str(tmp_path / "moved")
+    shutil.copytree(export, moved)
+    assert fingerprints(moved) == first
+
+
+def test_fingerprints_follow_changes(export):
+    first = fingerprints(export)
+    changed_chat, other_chats = sorted(first)[0], sorted(first)[1:]
+    part = os.path.join(export, *INBOX, changed_chat, "message_2.json")
+    with open(part) as file: data = json.load(file)
+    data["messages"][0]["content"] = "changed"
+    with open(part, "w") as file: json.dump(data, file)
+    second = fingerprints(export)
+    assert second[changed_chat] != first[changed_chat]
+    assert all(second[chat_name] == first[chat_name] for chat_name in other_chats)
+
+
+def test_combined_fingerprints_depend_on_order():
+    assert combine_fingerprints(["a", "b"]) == combine_fingerprints(["a", "b"])
+    assert combine_fingerprints(["a", "b"]) != combine_fingerprints(["b", "a"])
+
+
+def test_results_are_keyed(export):
+    cache = AnalysisCache(export)
+    cache.save_result("counts", "key", {"a": 1})
+    assert AnalysisCache(export).load_result("counts", "key") == {"a": 1}
+    assert AnalysisCache(export).load_result("counts", "other key") is None
+
+
+def test_cached_store_matches_a_parsed_one(export):
+    parsed = MessageStore.load(export, use_cache=False)
+    MessageStore.load(export)
+    cached = MessageStore.load(export)
+    assert cached.fingerprint is not None
+    assert cached.chat_names == parsed.chat_names and cached.name_of_owner == parsed.name_of_owner
+    for column in ("timestamp_ms", "sender_id", "chat_id", "content_length", "has_content", "is_reaction", "text_data", "text_offsets"):
+        assert np.array_equal(getattr(cached, column), getattr(parsed, column))
+
+
+def test_cached_aggregates(export):
+    computed = MessageAggregates(MessageStore.load(export))
+    computed.message_counts(3) # an interval that isn't computed up front is cached too
+    cached = MessageAggregates(MessageStore.load(export))
+    # the local time of every message is as big as the store, so it isn't cached and is only converted when needed
+    assert cached._local_seconds is None
+    assert len(AnalysisCache(export).load_result("message_aggregates", cached._cache_key())) == 3
+    for interval in range(5):
+        for cached_part, computed_part in zip(cached.message_counts(interval), computed.message_counts(interval)):
+            assert np.array_equal(cached_part, computed_part)
+    for time_specification in range(4):
+        for cached_part, computed_part in zip(cached.cycle_counts(time_specification), computed.cycle_counts(time_specification)):
+            assert np.array_equal(cached_part, computed_part)
+    assert np.array_equal(cached.local_seconds, computed.local_seconds)
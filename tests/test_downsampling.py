@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from src.Handling_Data.Downsampling import lttb_indexes
+
+
+def test_short_series_are_kept():
+    x = np.arange(10)
+    assert lttb_indexes(x, x, 10).tolist() == list(range(10))
+    assert lttb_indexes(x, x, 50).tolist() == list(range(10))
+    assert lttb_indexes(x, x, 2).tolist() == list(range(10))
+
+
+@pytest.mark.parametrize("n, threshold", [(100, 3), (1000, 50), (1001, 999), (12345, 300)])
+def test_one_point_per_bucket(n, threshold):
+    generator = np.random.default_rng(n)
+    x = np.cumsum(generator.integers(1, 5, n))
+    y = generator.normal(size=n)
+    indexes = lttb_indexes(x, y, threshold)
+    assert len(indexes) == threshold
+    assert indexes[0] == 0 and indexes[-1] == n - 1
+    assert np.all(np.diff(indexes) > 0)
+    # every point but the first and last comes from its own bucket
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    assert np.array_equal(np.searchsorted(edges, indexes[1:-1], side="right") - 1, np.arange(threshold - 2))
+
+
+def test_spikes_survive():
+    y = np.zeros(10000)
+    y[[1234, 5678, 9000]] = [50, -80, 120]
+    indexes = lttb_indexes(np.arange(10000), y, 100)
+    assert {1234, 5678, 9000} <= set(indexes.tolist())
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from src.Handling_Data.Message_Search import MessageIndex, encode_varints, decode_varints
+from src.Handling_Data.Message_Store import MessageStore
+from src.Handling_Data.Word_Counting import tokenize
+
+
+def test_varints_round_trip():
+    generator = np.random.default_rng(0)
+    values = np.concatenate(([0, 1, 127, 128, 16383, 16384, 2 ** 53 - 1],
+                             generator.integers(0, 200, 1000),
+                             generator.integers(0, 2 ** 53, 1000)))
+    encoded, byte_counts = encode_varints(values)
+    assert encoded.dtype == np.uint8
+    assert len(encoded) == byte_counts.sum()
+    assert byte_counts[:7].tolist() == [1, 1, 1, 2, 2, 3, 8]
+    assert np.array_equal(decode_varints(encoded), values)
+    # values can be decoded on their own from their slice of the bytes
+    starts = np.concatenate(([0], np.cumsum(byte_counts)))
+    assert decode_varints(encoded[starts[3]:starts[6]]).tolist() == [128, 16383, 16384]
+
+
+def test_empty_varints():
+    encoded, byte_counts = encode_varints(np.zeros(0, dtype=np.int64))
+    assert len(encoded) == 0 and len(byte_counts) == 0
+    assert len(decode_varints(encoded)) == 0
+
+
+@pytest.fixture(scope="module")
+def index(export_path):
+    return MessageIndex.build(MessageStore.get(export_path), workers=1)
+
+
+def rows_containing(store, matches):
+    return sorted(row for row, text in enumerate(store.texts(np.arange(len(store)))) if matches(tokenize(text)))
+
+
+@pytest.mark.parametrize("term", ["lol", "café", "güzel", "❤️", "reacted", "missing"])
+def test_terms_match_a_scan(export_path, index, term):
+    store = MessageStore.get(export_path)
+    assert sorted(index.message_rows[index.term_messages(term)].tolist()) == rows_containing(store, lambda tokens: term in tokens)
+
+
+def test_prefixes_and_phrases_match_a_scan(export_path, index):
+    store = MessageStore.get(export_path)
+    assert sorted(index.message_rows[index.prefix_messages("th")].tolist()) == rows_containing(store, lambda tokens: any(token.startswith("th") for token in tokens))
+    phrase = ["see", "you"]
+    assert sorted(index.message_rows[index.phrase_messages(phrase)].tolist()) == rows_containing(store, lambda tokens: any(tokens[i:i + 2] == phrase for i in range(len(tokens))))
+
+
+def test_arrays_round_trip(index):
+    copy = MessageIndex.from_arrays(index.to_arrays())
+    for term in ("lol", "see", "zzz"):
+        assert np.array_equal(copy.term_messages(term), index.term_messages(term))
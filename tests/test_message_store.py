@@ -0,0 +1,96 @@
+import os
+import json
+import random
+import shutil
+import numpy as np
+import pytest
+from benchmarks.generate_export import generate_export, generate_message
+from src.Handling_Data.Message_Store import MessageStore
+from src.Handling_Data.Aggregation_Engine import MessageAggregates
+
+INBOX = ("your_instagram_activity", "messages", "inbox")
+
+
+def sorted_messages(store: MessageStore):
+    texts = store.texts(np.arange(len(store)))
+    return sorted(zip(store.timestamp_ms.tolist(),
+                      [store.chat_names[i] for i in store.chat_id.tolist()],
+                      [store.sender_names[i] for i in store.sender_id.tolist()],
+                      store.content_length.tolist(),
+                      texts))
+
+
+def test_store_holds_every_message(export_path, every_message):
+    store = MessageStore.load(export_path, use_cache=False)
+    assert sorted_messages(store) == sorted((message["timestamp_ms"], chat_name, message["sender_name"],
+                                             len(message.get("content", "")), message.get("content", ""))
+                                            for message, chat_name in every_message)
+    assert store.has_content.sum() == sum("content" in message for message, chat_name in every_message)
+    assert store.is_reaction.sum() == sum(message.get("is_reaction", False) for message, chat_name in every_message)
+    assert store.is_owner.sum() == sum(message["sender_name"] == store.name_of_owner for message, chat_name in every_message)
+    # messages of a chat are contiguous and ordered from oldest to most recent
+    assert np.all(np.diff(store.chat_id) >= 0)
+    assert np.all(np.diff(store.timestamp_ms)[np.diff(store.chat_id) == 0] >= 0)
+
+
+@pytest.fixture()
+def exports(tmp_path):
+    """
+    An export and a newer export of the same account: some chats got new messages (a few of them sent at the same
+    millisecond as the last old message), and a chat was added
+    """
+    old, new = str(tmp_path / "old"), str(tmp_path / "new")
+    generate_export(old, chats=18, messages_per_chat=120, messages_per_part=50, seed=3)
+    shutil.copytree(old, new)
+    inbox = os.path.join(new, *INBOX)
+    generator = random.Random(1)
+    folders = sorted(os.listdir(inbox))
+    for folder in folders[:8]:
+        part = os.path.join(inbox, folder, "message_1.json")
+        with open(part) as file: data = json.load(file)
+        latest = data["messages"][0]["timestamp_ms"]
+        senders = [participant["name"].encode("latin-1").decode("utf-8") for participant in data["participants"]]
+        extra = [generate_message(generator, generator.choice(senders), latest + 1000 * i) for i in range(30, -1, -1)]
+        data["messages"] = extra + data["messages"]
+        with open(part, "w") as file: json.dump(data, file)
+    shutil.copytree(os.path.join(inbox, folders[0]), os.path.join(inbox, "brandnew_abcdefghij"))
+    return old, new
+
+
+def test_merged_store_holds_every_message_once(exports):
+    old, new = exports
+    previous = MessageStore.load(old)
+    merged, first_new_row = MessageStore.merge_export(previous, new)
+    loaded = MessageStore.load(new, use_cache=False)
+    assert first_new_row == len(previous)
+    assert np.array_equal(merged.timestamp_ms[:first_new_row], previous.timestamp_ms)
+    assert len(merged) == len(loaded)
+    assert sorted_messages(merged) == sorted_messages(loaded)
+
+    # merging the same export again adds nothing
+    again, first_new_row = MessageStore.merge_export(merged, new)
+    assert first_new_row == len(again) == len(merged)
+
+
+def test_merged_aggregates_match_a_fresh_load(exports):
+    old, new = exports
+    previous = MessageAggregates(MessageStore.load(old))
+    previous.message_counts(3) # an interval computed before the merge is updated by MessageAggregates.merge_rows
+    store, first_new_row = MessageStore.merge_export(previous.store, new)
+    previous.merge_rows(store, first_new_row)
+    loaded = MessageAggregates(MessageStore.load(new, use_cache=False))
+    for interval in range(5):
+        for merged_part, loaded_part in zip(previous.message_counts(interval), loaded.message_counts(interval)):
+            assert np.array_equal(merged_part, loaded_part)
+    for time_specification in range(4):
+        for merged_part, loaded_part in zip(previous.cycle_counts(time_specification), loaded.cycle_counts(time_specification)):
+            assert np.array_equal(merged_part, loaded_part)
+
+
+def test_merge_reloads_when_a_chat_disappears(exports):
+    old, new = exports
+    previous = MessageStore.load(old)
+    shutil.rmtree(os.path.join(new, *INBOX, previous.chat_names[-1]))
+    merged, first_new_row = MessageStore.merge_export(previous, new)
+    assert first_new_row is None
+    assert previous.chat_names[-1] not in merged.chat_names
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from src.Handling_Data import Rolling_Statistics
+
+
+def naive_rolling_sum(values, window):
+    return np.array([sum(values[max(0, i - window + 1):i + 1]) for i in range(len(values))])
+
+
+@pytest.mark.parametrize("window", [1, 3, 7, 50])
+def test_rolling_sum_and_mean_match_a_loop(window):
+    values = np.random.default_rng(window).integers(0, 20, 40)
+    expected = naive_rolling_sum(values.tolist(), window)
+    assert np.array_equal(Rolling_Statistics.rolling_sum(values, window), expected)
+    expected_mean = expected / np.minimum(np.arange(1, len(values) + 1), window)
+    assert np.allclose(Rolling_Statistics.rolling_mean(values, window), expected_mean)
+
+
+def test_rolling_distinct_matches_sets():
+    generator = np.random.default_rng(1)
+    rows, ids = generator.integers(0, 60, 300), generator.integers(0, 12, 300)
+    for window in (1, 2, 7, 30, 100):
+        expected = [len({i for r, i in zip(rows, ids) if row - window < r <= row}) for row in range(60)]
+        assert Rolling_Statistics.rolling_distinct(rows, ids, 60, window).tolist() == expected
+
+
+def test_rolling_distinct_of_nothing():
+    assert Rolling_Statistics.rolling_distinct(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 5, 3).tolist() == [0] * 5
+
+
+@pytest.mark.parametrize("span", [1, 2, 7, 30])
+def test_exponential_average_matches_the_recurrence(span):
+    # long enough to be split into several blocks (see Rolling_Statistics.MAX_EXPONENT)
+    values = np.random.default_rng(span).integers(0, 100, 5000).astype(np.float64)
+    alpha = 2 / (span + 1)
+    expected = [values[0]]
+    for value in values[1:]: expected.append(alpha * value + (1 - alpha) * expected[-1])
+    assert np.allclose(Rolling_Statistics.exponential_average(values, span), expected)
+
+
+def test_invalid_windows():
+    with pytest.raises(ValueError): Rolling_Statistics.rolling_sum(np.ones(3), 0)
+    with pytest.raises(ValueError): Rolling_Statistics.rolling_distinct(np.ones(3), np.ones(3), 3, 0)
+    with pytest.raises(ValueError): Rolling_Statistics.exponential_average(np.ones(3), 0)
+
+
+def test_dense_series_and_daily_range():
+    keys, values = np.array([3, 5, 9]), np.array([1, 2, 3])
+    assert Rolling_Statistics.dense_series(keys, values, 4, 9).tolist() == [0, 2, 0, 0, 0, 3]
+    assert Rolling_Statistics.daily_range(np.array([7, 4]), np.zeros(0, dtype=np.int64), np.array([12])) == (4, 12)
+    assert Rolling_Statistics.daily_range(np.zeros(0, dtype=np.int64)) == (0, -1)
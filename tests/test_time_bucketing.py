@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from src.Handling_Data import Time_Bucketing
+
+TRUNCATE = [lambda date: date.replace(month=1, day=1, hour=0, minute=0, second=0),
+            lambda date: date.replace(day=1, hour=0, minute=0, second=0),
+            lambda date: date.replace(hour=0, minute=0, second=0),
+            lambda date: date.replace(minute=0, second=0),
+            lambda date: date.replace(second=0)]
+
+
+@pytest.fixture(scope="module")
+def timestamps_ms():
+    return np.sort(np.random.default_rng(0).integers(1420070400000, 1641772800000, 2000))
+
+
+@pytest.mark.parametrize("interval", range(5))
+def test_buckets_match_datetime(timestamps_ms, interval):
+    keys = Time_Bucketing.bucket_keys(timestamps_ms, interval)
+    expected = [TRUNCATE[interval](datetime.fromtimestamp(timestamp // 1000)) for timestamp in timestamps_ms.tolist()]
+    distinct, index = np.unique(keys, return_inverse=True)
+    dates = Time_Bucketing.keys_to_datetimes(distinct, interval)
+    assert [dates[i] for i in index.reshape(-1)] == expected
+    assert Time_Bucketing.key_starts(distinct, interval).tolist() == [Time_Bucketing.to_local_second(date) for date in dates]
+
+
+@pytest.mark.parametrize("time_specification", range(4))
+def test_cycles_match_datetime(timestamps_ms, time_specification):
+    getters = [lambda date: date.year, lambda date: date.month, datetime.weekday, lambda date: date.hour]
+    expected = [getters[time_specification](datetime.fromtimestamp(timestamp // 1000)) for timestamp in timestamps_ms.tolist()]
+    assert Time_Bucketing.cycle_values(timestamps_ms, time_specification).tolist() == expected
+
+
+@pytest.mark.parametrize("interval", range(5))
+def test_range_mask_keeps_the_buckets_that_start_in_the_range(timestamps_ms, interval):
+    keys = np.unique(Time_Bucketing.bucket_keys(timestamps_ms, interval))
+    starts = Time_Bucketing.key_starts(keys, interval)
+    generator = np.random.default_rng(interval)
+    for i in range(200):
+        start, end = (datetime(2014, 6, 1) + timedelta(seconds=int(seconds)) for seconds in generator.integers(0, 8 * 365 * 86400, 2))
+        if i % 4 == 0: start = None
+        if i % 5 == 0: end = None
+        expected = np.ones(len(keys), dtype=bool)
+        if start is not None: expected &= starts >= Time_Bucketing.to_local_second(start)
+        if end is not None: expected &= starts < Time_Bucketing.to_local_second(end)
+        assert np.array_equal(Time_Bucketing.range_mask(keys, interval, start, end), expected)
+
+
+def test_key_bounds_on_bucket_edges():
+    assert Time_Bucketing.key_bounds(2, datetime(1970, 1, 3), datetime(1970, 1, 5)) == (2, 4)
+    assert Time_Bucketing.key_bounds(2, datetime(1970, 1, 3, 0, 0, 1), datetime(1970, 1, 5, 0, 0, 1)) == (3, 5)
+    assert Time_Bucketing.key_bounds(0) == (np.iinfo(np.int64).min, np.iinfo(np.int64).max)
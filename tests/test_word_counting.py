@@ -0,0 +1,38 @@
+from collections import Counter
+from benchmarks.generate_export import generate_export
+from src.Handling_Data import Word_Counting
+from src.Handling_Data.Message_Store import MessageStore, memo_message_store
+from src.Handling_Data.Analyzing_Data import InstagramDataAnalyzer
+from src.Handling_Data.Retreiving_Data import InstagramDataRetreiver
+
+
+def test_tokenize_drops_the_punctuation_around_words():
+    assert Word_Counting.tokenize('(Hello!) don\'t e-mail @emre.cenk99, Café... "naïve" 😂 ❤️ ok?!') == \
+           ["hello", "don't", "e-mail", "@emre.cenk99", "café", "naïve", "😂", "❤️", "ok"]
+    assert Word_Counting.tokenize(" ... !? ") == []
+
+
+def test_count_words_across_texts():
+    assert Word_Counting.count_words(["Hi hi", "hi, there", ""]) == Counter({"hi": 3, "there": 1})
+
+
+def test_top_words_and_mentions():
+    counts = {"a": 5, "b": 9, "@c": 2, "d": 7}
+    assert Word_Counting.top_words(counts, 2) == [("b", 9), ("d", 7)]
+    assert Word_Counting.top_words(counts, 10) == [("b", 9), ("d", 7), ("a", 5), ("@c", 2)]
+    assert list(Word_Counting.mentions(counts)) == [("@c", 2)]
+
+
+def test_chats_found_by_username_without_loading_the_store(tmp_path):
+    path = str(tmp_path / "export")
+    generate_export(path, chats=6, messages_per_chat=80, messages_per_part=30, seed=5)
+    folder_names = InstagramDataRetreiver.list_chats(path)
+    usernames = [folder_name.rsplit("_", 1)[0] for folder_name in folder_names]
+
+    # a single chat is streamed from its json files when the store isn't loaded
+    streamed = [InstagramDataAnalyzer.get_word_distribution(path, username) for username in usernames]
+    assert path not in memo_message_store
+    MessageStore.get(path)
+    assert [Word_Counting.count_words_in_chat(path, username) for username in usernames] == streamed
+    assert [Word_Counting.count_words_in_chat(path, folder_name) for folder_name in folder_names] == streamed
+    assert Word_Counting.count_words_in_chats(path, usernames) == sum(streamed, Counter())